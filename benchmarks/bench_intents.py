@@ -0,0 +1,106 @@
+# benchmarks/bench_intents.py - Compiled intent table vs the old if/in chain
+#
+#   python -m benchmarks.bench_intents --rounds 20000
+#
+# Times brain.intents.route_intent against the original plan_action chain on
+# a mix of action, canned-answer and free-form utterances, and lists the
+# utterances where the two disagree.
+import argparse
+import sys
+import time
+
+from benchmarks.common import REPO_ROOT, percentile
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from brain.intents import route_intent
+
+UTTERANCES = [
+    "open chrome",
+    "open notepad please",
+    "launch calculator",
+    "play lofi beats on youtube",
+    "search for cooking videos on youtube",
+    "open youtube",
+    "what time is it?",
+    "hey echo, what's the date today",
+    "help",
+    "hello there",
+    "good morning",
+    "tell me a joke about programmers",
+    "what should I cook for dinner tonight if I only have eggs and rice",
+    "summarise the plot of hamlet in three sentences",
+    "I had a long day at work and my manager kept changing the requirements " * 4,
+]
+
+
+def legacy_plan_action(user_input):
+    """plan_action as it was before the intent table"""
+    text = user_input.lower()
+
+    if "chrome" in text:
+        return {"agent": "windows", "app": "chrome"}
+
+    if "notepad" in text:
+        return {"agent": "windows", "app": "notepad"}
+
+    if "youtube" in text:
+        query = text.replace("play", "").replace("on youtube", "").strip()
+        return {
+            "agent": "browser",
+            "action": "youtube",
+            "query": query
+        }
+
+    return {"agent": "llm"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compiled intent table vs the old if/in chain")
+    parser.add_argument('--rounds', type=int, default=20000)
+    return parser.parse_args()
+
+
+def timed(fn, rounds, utterances=UTTERANCES):
+    samples = []
+    for n in range(rounds):
+        text = utterances[n % len(utterances)]
+        started = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def report(name, samples):
+    mean = sum(samples) / len(samples)
+    print(f"{name:<28} {mean:>10.2f} {percentile(samples, 50):>10.2f} {percentile(samples, 99):>10.2f}")
+
+
+def main():
+    args = parse_args()
+
+    print(f"{'µs per utterance':<28} {'mean':>10} {'p50':>10} {'p99':>10}")
+    report("legacy if/in chain", timed(legacy_plan_action, args.rounds))
+    report("compiled intent table", timed(route_intent, args.rounds))
+    
+    # What every message that goes on to the LLM pays
+    chat = [text for text in UTTERANCES if route_intent(text)['agent'] == 'llm']
+    print(f"\nFree-form messages only ({len(chat)} of {len(UTTERANCES)}):")
+    report("legacy if/in chain", timed(legacy_plan_action, args.rounds, chat))
+    report("compiled intent table", timed(route_intent, args.rounds, chat))
+
+    bypassed = sum(1 for text in UTTERANCES if route_intent(text)['agent'] != 'llm')
+    print(f"\nHandled without the LLM: {bypassed}/{len(UTTERANCES)} "
+          f"(legacy: {sum(1 for text in UTTERANCES if legacy_plan_action(text)['agent'] != 'llm')})")
+
+    print("\nDifferences:")
+    for text in UTTERANCES:
+        old, new = legacy_plan_action(text), route_intent(text)
+        new = {k: v for k, v in new.items() if k not in ('intent', 'response')}
+        if old != new:
+            print(f"  {text[:50]!r}: {old} -> {new}")
+
+
+if __name__ == '__main__':
+    main()
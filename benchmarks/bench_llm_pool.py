@@ -0,0 +1,88 @@
+# benchmarks/bench_llm_pool.py - LocalLLM throughput over 1..N stub Ollama backends
+#
+#   python -m benchmarks.bench_llm_pool --backends 4 --clients 16 --requests 200
+#
+# Starts N stub servers (benchmarks/ollama_stub.py, one request at a time
+# each, like one GPU box), then drives LocalLLM from many client threads with
+# per-client sessions. Runs once per pool size 1..N, then once more with N
+# backends while one of them is shut down mid-run to check failover.
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import REPO_ROOT, percentile
+from benchmarks.ollama_stub import StubOllama
+
+import sys
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from brain.local_llm import LocalLLM
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="LocalLLM throughput over stub Ollama backends")
+    parser.add_argument('--backends', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--prefill', type=float, default=0.05)
+    parser.add_argument('--token-delay', type=float, default=0.005)
+    parser.add_argument('--tokens', type=int, default=20)
+    return parser.parse_args()
+
+
+def run(llm, clients, requests, kill=None):
+    """Returns (seconds, latencies, errors)"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def one(n):
+        started = time.perf_counter()
+        try:
+            llm.generate(f"question {n}", session=f"user{n % clients}")
+            with lock:
+                latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+        if kill is not None and n == requests // 2:
+            kill()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(one, range(requests)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def report(label, seconds, latencies, errors, llm):
+    served = [b['served'] for b in llm.pool.stats()]
+    print(f"{label:<22} {len(latencies) / seconds:>8.1f} {percentile(latencies, 50) * 1000:>8.0f} "
+          f"{percentile(latencies, 99) * 1000:>8.0f} {len(errors):>7}   {served}")
+
+
+def main():
+    args = parse_args()
+    stubs = [StubOllama(prefill=args.prefill, token_delay=args.token_delay, tokens=args.tokens).start()
+             for _ in range(args.backends)]
+
+    print(f"{'pool':<22} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}   served per backend")
+    for size in range(1, args.backends + 1):
+        llm = LocalLLM(hosts=[s.url for s in stubs[:size]])
+        seconds, latencies, errors = run(llm, args.clients, args.requests)
+        report(f"{size} backend(s)", seconds, latencies, errors, llm)
+
+    # Failover: one backend disappears halfway through
+    llm = LocalLLM(hosts=[s.url for s in stubs])
+    seconds, latencies, errors = run(llm, args.clients, args.requests, kill=stubs[-1].stop)
+    report(f"{args.backends}, one killed", seconds, latencies, errors, llm)
+    for error in errors[:3]:
+        print(f"  error: {error!r}")
+
+    for stub in stubs[:-1]:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
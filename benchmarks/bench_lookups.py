@@ -0,0 +1,80 @@
+# benchmarks/bench_lookups.py - Indexed vs linear user and file lookups
+#
+#   python -m benchmarks.bench_lookups --users 100000 --files 10000
+#
+# Fills a scratch store with N users and one user owning M files, then times
+# the login lookup (username -> user) and per-file lookup ((user, file) ->
+# record) through the web_app indexes against the old linear scans.
+import argparse
+import random
+import secrets
+import time
+
+from benchmarks.common import load_web_app, percentile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Indexed vs linear user and file lookups")
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--scan-lookups', type=int, default=20, help="the linear scans are slow, time fewer")
+    parser.add_argument('--store', default='sqlite:///user_data/state.db')
+    return parser.parse_args()
+
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        result = fn(*args)
+        samples.append((time.perf_counter() - started) * 1e6)
+        assert result is not None
+    return samples
+
+
+def report(name, samples):
+    mean = sum(samples) / len(samples)
+    print(f"{name:<34} {mean:>12.1f} {percentile(samples, 50):>12.1f} {percentile(samples, 99):>12.1f}")
+
+
+def main():
+    args = parse_args()
+    web_app = load_web_app(args.store)
+    store = web_app.store
+
+    # ---- POPULATE ----
+    started = time.time()
+    users = {}
+    for n in range(args.users):
+        user_id = secrets.token_hex(16)
+        users[user_id] = {'id': user_id, 'username': f"user{n:06d}", 'password': 'x', 'preferences': {}}
+    store.put_many('users', list(users.items()))
+    store.put_many('usernames', [(u['username'], user_id) for user_id, u in users.items()])
+
+    owner = next(iter(users))
+    files = [{'id': secrets.token_hex(8), 'original_filename': f"doc{n}.txt", 'summary': ''}
+             for n in range(args.files)]
+    store.put('files', owner, files)
+    store.put_many('file', [(f"{owner}_{f['id']}", f) for f in files])
+    print(f"Populated {args.users} users and {args.files} files in {time.time() - started:.1f}s ({args.store})\n")
+
+    # ---- MEASURE ----
+    def scan_user(username):
+        return next((u for _, u in store.items('users') if u['username'] == username), None)
+
+    def scan_file(user_id, file_id):
+        return next((f for f in web_app.get_user_files(user_id) if f['id'] == file_id), None)
+
+    usernames = [(u['username'],) for u in random.choices(list(users.values()), k=args.lookups)]
+    file_keys = [(owner, f['id']) for f in random.choices(files, k=args.lookups)]
+
+    print(f"{'lookup (µs)':<34} {'mean':>12} {'p50':>12} {'p99':>12}")
+    report("username -> user (index)", timed(web_app.find_user_by_username, usernames))
+    report("username -> user (scan)", timed(scan_user, usernames[:args.scan_lookups]))
+    report("(user, file) -> record (index)", timed(web_app.get_user_file, file_keys))
+    report("(user, file) -> record (scan)", timed(scan_file, file_keys[:args.scan_lookups]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# benchmarks/bench_voice.py - STT real-time factor / WER and TTS time to first audio
+#
+#   python -m benchmarks.bench_voice
+#   python -m benchmarks.bench_voice --models tiny,base,small --compute int8,float32 --threads 2,4,8
+#   python -m benchmarks.bench_voice --wav clips/*.wav --skip-tts
+#
+# STT: every WAV fixture (default: out.wav and piper/test.wav) is decoded
+# with faster-whisper under each model / compute type / thread count, with
+# the same options as voice/stt_router.py and no microphone. Reports the real-time
+# factor (transcription time / audio length, lower is faster), latency to
+# the first segment and, for fixtures with a reference transcript next to
+# them (clip.wav -> clip.txt), the word error rate.
+#
+# TTS: a few phrases through each available voice/synth engine, reporting
+# time to the first audio chunk and to the whole clip.
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+import wave
+
+import numpy as np
+
+from benchmarks.common import REPO_ROOT, percentile
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+SAMPLE_RATE = 16000
+# As in voice/stt_router.py
+TRANSCRIBE_OPTIONS = {"language": "en", "vad_filter": True}
+
+PHRASES = [
+    "Opening browser.",
+    "Playing on YouTube.",
+    "Good evening Boss, here is a quick summary of what you asked me about earlier today.",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="STT real-time factor / WER and TTS time to first audio")
+    parser.add_argument('--wav', nargs='*', default=[os.path.join(REPO_ROOT, 'out.wav'),
+                                                    os.path.join(REPO_ROOT, 'piper', 'test.wav')])
+    parser.add_argument('--models', default="tiny,base,small")
+    parser.add_argument('--compute', default="int8,float32")
+    parser.add_argument('--threads', default="4", help="comma-separated cpu_threads values (0 = library default)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--tiered', default="tiny,small",
+                        help="fast,accurate pair to run through voice/stt_router (empty to skip)")
+    parser.add_argument('--skip-stt', action='store_true')
+    parser.add_argument('--skip-tts', action='store_true')
+    return parser.parse_args()
+
+
+def read_wav(path):
+    """Mono float32 at 16 kHz, like sounddevice hands to voice/stt.py"""
+    with wave.open(path, 'rb') as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        frames = w.readframes(w.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit PCM is supported")
+    audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(audio), rate / SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+def words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def wer(reference, hypothesis):
+    """Word error rate: word-level edit distance over reference length"""
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_fixtures(paths):
+    fixtures = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if not os.path.exists(path):
+                print(f"⚠️ {path} not found, skipped")
+                continue
+            reference = None
+            if os.path.exists(os.path.splitext(path)[0] + '.txt'):
+                with open(os.path.splitext(path)[0] + '.txt', encoding='utf-8') as f:
+                    reference = f.read().strip()
+            fixtures.append((os.path.relpath(path, REPO_ROOT), read_wav(path), reference))
+    return fixtures
+
+
+def bench_stt(args):
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError:
+        print("⚠️ faster-whisper not installed, skipping STT")
+        return
+
+    fixtures = load_fixtures(args.wav)
+    if not fixtures:
+        return
+    seconds = sum(len(audio) for _, audio, _ in fixtures) / SAMPLE_RATE
+    print(f"🎧 {len(fixtures)} fixture(s), {seconds:.1f}s of audio, {args.repeats} repeats\n")
+    print(f"{'model':<8} {'compute':<8} {'threads':>7} {'load s':>7} {'RTF p50':>8} {'RTF p95':>8} "
+          f"{'1st seg p50':>11} {'WER':>6}")
+
+    for model_size in args.models.split(','):
+        for compute_type in args.compute.split(','):
+            for threads in (int(t) for t in args.threads.split(',')):
+                started = time.perf_counter()
+                try:
+                    model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=threads)
+                except Exception as e:
+                    print(f"{model_size:<8} {compute_type:<8} {threads:>7}   could not load: {e}")
+                    continue
+                load = time.perf_counter() - started
+                # One untimed pass so lazy initialisation is not counted
+                list(model.transcribe(fixtures[0][1], **TRANSCRIBE_OPTIONS)[0])
+
+                rtfs, first_segment, errors = [], [], []
+                for _, audio, reference in fixtures:
+                    for _ in range(args.repeats):
+                        started = time.perf_counter()
+                        segments, _ = model.transcribe(audio, **TRANSCRIBE_OPTIONS)
+                        texts = []
+                        for segment in segments:
+                            if not texts:
+                                first_segment.append(time.perf_counter() - started)
+                            texts.append(segment.text.strip())
+                        rtfs.append((time.perf_counter() - started) / (len(audio) / SAMPLE_RATE))
+                    if reference is not None:
+                        errors.append(wer(reference, " ".join(texts)))
+
+                shown_wer = f"{sum(errors) / len(errors):.1%}" if errors else "-"
+                print(f"{model_size:<8} {compute_type:<8} {threads:>7} {load:>7.1f} {percentile(rtfs, 50):>8.3f} "
+                      f"{percentile(rtfs, 95):>8.3f} {percentile(first_segment, 50) * 1000:>9.0f}ms {shown_wer:>6}")
+                del model
+
+    if args.tiered:
+        bench_tiered(args, fixtures)
+
+
+def bench_tiered(args, fixtures):
+    """The fast-first cascade from voice/stt_router against its accurate model alone"""
+    from voice.stt_router import STTRouter
+
+    fast, accurate = args.tiered.split(',')
+    compute_type = args.compute.split(',')[0]
+    threads = int(args.threads.split(',')[0])
+    router = STTRouter(fast, accurate, compute_type, threads)
+    print(f"\n{'tiered ' + fast + ' -> ' + accurate:<26} {'RTF p50':>8} {'RTF p95':>8} {'WER':>6}")
+    for label, transcribe in (
+        (f"{accurate} only", lambda audio: router.transcribe_with(len(router.models) - 1, audio)),
+        ("cascade", router.transcribe),
+    ):
+        rtfs, errors = [], []
+        for _, audio, reference in fixtures:
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                text = transcribe(audio)
+                rtfs.append((time.perf_counter() - started) / (len(audio) / SAMPLE_RATE))
+            if reference is not None:
+                errors.append(wer(reference, text))
+        shown_wer = f"{sum(errors) / len(errors):.1%}" if errors else "-"
+        print(f"{label:<26} {percentile(rtfs, 50):>8.3f} {percentile(rtfs, 95):>8.3f} {shown_wer:>6}")
+    stats = router.stats()
+    print(f"escalated {stats['escalated_unsure']} unsure / {stats['escalated_upfront']} long "
+          f"of {stats['requests']} cascade transcriptions")
+
+
+def bench_tts(args):
+    from voice import synth
+
+    engines = synth.available_engines()
+    if not engines:
+        print("⚠️ No TTS engine available (install edge-tts or set ECHOMIND_PIPER_MODEL), skipping TTS")
+        return
+    print(f"\n{'engine':<8} {'phrase':<24} {'first audio p50':>16} {'whole clip p50':>15} {'bytes':>8}")
+    for engine in engines:
+        for phrase in PHRASES:
+            first, whole, size = [], [], 0
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                size = 0
+                try:
+                    for chunk in synth.stream(phrase, engine=engine):
+                        if not size:
+                            first.append(time.perf_counter() - started)
+                        size += len(chunk)
+                except Exception as e:
+                    print(f"{engine:<8} {phrase[:24]:<24}   failed: {e}")
+                    break
+                whole.append(time.perf_counter() - started)
+            if whole:
+                print(f"{engine:<8} {phrase[:24]:<24} {percentile(first, 50) * 1000:>14.0f}ms "
+                      f"{percentile(whole, 50) * 1000:>13.0f}ms {size:>8}")
+
+
+def main():
+    args = parse_args()
+    if not args.skip_stt:
+        bench_stt(args)
+    if not args.skip_tts:
+        bench_tts(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/bench_wake.py - Idle CPU with and without the wake-word front-end
+#
+#   python -m benchmarks.bench_wake
+#   python -m benchmarks.bench_wake --wav tv.wav --seconds 120 --model small
+#
+# Plays the same background audio to both listening strategies and
+# measures process CPU time (all threads) per second of audio:
+#
+#   always - the old loop: every 5 s window with a peak above 0.01 goes to Whisper
+#   wake   - voice/wake.py fed 30 ms blocks like the capture callback; Whisper
+#            would only run on its detections
+#
+# Scenarios: a quiet room (low noise) and background speech (the WAV fixtures
+# looped, standing in for a TV). The wake word comes from wake/ when one is
+# enrolled; otherwise a synthetic template of typical length is used, which
+# gives the same cost (but says nothing about accuracy).
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import REPO_ROOT
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.bench_voice import SAMPLE_RATE, TRANSCRIBE_OPTIONS, read_wav  # noqa: E402
+
+RECORD_SECONDS = 5  # as in voice/stt.py
+MIN_PEAK = 0.01
+BLOCK = 480
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Idle CPU with and without the wake-word front-end")
+    parser.add_argument('--wav', nargs='*', default=[os.path.join(REPO_ROOT, 'out.wav'),
+                                                    os.path.join(REPO_ROOT, 'piper', 'test.wav')])
+    parser.add_argument('--seconds', type=float, default=60.0, help="audio per scenario")
+    parser.add_argument('--model', default=os.environ.get("ECHOMIND_STT_MODEL", "small"),
+                        help="Whisper model the old loop ran on every window")
+    parser.add_argument('--compute', default="int8")
+    return parser.parse_args()
+
+
+def synthetic_template(seconds=0.6):
+    """A two-formant sweep about as long as a spoken wake word"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    phase = 2 * np.pi * np.cumsum(np.linspace(300, 900, len(t))) / SAMPLE_RATE
+    return (0.3 * (np.sin(phase) + 0.5 * np.sin(2 * phase)) * np.hanning(len(t))).astype(np.float32)
+
+
+def scenarios(args):
+    rng = np.random.default_rng(0)
+    samples = int(args.seconds * SAMPLE_RATE)
+    quiet = (0.003 * rng.standard_normal(samples)).astype(np.float32)
+    clips = [read_wav(p) for p in args.wav if os.path.exists(p)]
+    result = [("quiet room", quiet)]
+    if clips:
+        speech = np.concatenate(clips)
+        speech = np.tile(speech, samples // len(speech) + 1)[:samples]
+        result.append(("background speech", speech + quiet))
+    else:
+        print("⚠️ No WAV fixtures found, only the quiet scenario is run")
+    return result
+
+
+def always_on(audio, model):
+    """CPU seconds and Whisper passes for the transcribe-every-window loop"""
+    window = RECORD_SECONDS * SAMPLE_RATE
+    passes = 0
+    started = time.process_time()
+    for start in range(0, len(audio) - window + 1, window):
+        clip = audio[start:start + window]
+        if max(float(clip.max()), -float(clip.min())) < MIN_PEAK:
+            continue
+        passes += 1
+        if model is not None:
+            list(model.transcribe(clip, **TRANSCRIBE_OPTIONS)[0])
+    return time.process_time() - started, passes
+
+
+def wake_word(audio, spotter):
+    """CPU seconds, detections and DTW checks for the spotter alone"""
+    spotter.reset()
+    detections, checks = spotter.detections, spotter.checks
+    started = time.process_time()
+    for start in range(0, len(audio), BLOCK):
+        spotter.feed(audio[start:start + BLOCK])
+    return time.process_time() - started, spotter.detections - detections, spotter.checks - checks
+
+
+def main():
+    args = parse_args()
+    from voice.wake import WakeWordSpotter
+
+    spotter = WakeWordSpotter.from_dir()
+    if spotter is None:
+        print("ℹ️ No wake word enrolled (python -m voice.wake enroll), timing a synthetic template")
+        spotter = WakeWordSpotter([synthetic_template()])
+
+    model = None
+    try:
+        from faster_whisper import WhisperModel
+        model = WhisperModel(args.model, device="cpu", compute_type=args.compute)
+        list(model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), **TRANSCRIBE_OPTIONS)[0])
+    except ImportError:
+        print("⚠️ faster-whisper not installed: the always-on column counts Whisper passes only")
+
+    print(f"\n{'scenario':<18} {'mode':<7} {'CPU % of a core':>16} {'Whisper passes':>15} {'DTW checks':>11}")
+    for label, audio in scenarios(args):
+        seconds = len(audio) / SAMPLE_RATE
+        cpu, passes = always_on(audio, model)
+        shown = f"{cpu / seconds:>15.1%}" if model is not None else f"{'-':>15}"
+        print(f"{label:<18} {'always':<7} {shown} {passes:>16} {'-':>11}")
+        cpu, detections, checks = wake_word(audio, spotter)
+        print(f"{label:<18} {'wake':<7} {cpu / seconds:>15.1%} {detections:>16} {checks:>11}")
+
+
+if __name__ == '__main__':
+    main()
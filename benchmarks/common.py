@@ -0,0 +1,37 @@
+# benchmarks/common.py - Shared helpers for the benchmark and stress scripts
+import os
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_web_app(store_url=None, workdir=None):
+    """Import web_app inside a scratch directory so real user_data/ is never touched.
+    
+    The LLM is switched off and rate limits lifted so requests exercise the
+    web and storage paths only.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='echomind-bench-')
+    os.chdir(workdir)
+    if store_url:
+        os.environ['ECHOMIND_STORE'] = store_url
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    import web_app
+    web_app.ai_thread.join()
+    web_app.llm = None
+    web_app.ai_modules_loaded = False
+    # Scripted clients all come from 127.0.0.1
+    for limit in ('LOGIN_LIMIT_PER_IP', 'LOGIN_LIMIT_PER_ACCOUNT', 'REGISTER_LIMIT_PER_IP'):
+        web_app.app.config[limit] = (10 ** 9, 60)
+    return web_app
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
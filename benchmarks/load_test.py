@@ -0,0 +1,226 @@
+# benchmarks/load_test.py - Many simulated users against the web app over HTTP
+#
+#   python -m benchmarks.load_test --users 50 --duration 60
+#   python -m benchmarks.load_test --url http://127.0.0.1:5000 --users 50
+#
+# Without --url the app runs in this process on a local port (waitress, or
+# werkzeug's threaded server) with its LLM pointed at a stub Ollama server
+# (benchmarks/ollama_stub.py), so the numbers measure the web, scheduler
+# and storage paths with a predictable model. With --url it drives a server
+# you started yourself; point that at a stub with e.g.
+#
+#   python -m benchmarks.ollama_stub --port 11435 &
+#   ECHOMIND_OLLAMA_HOSTS=http://127.0.0.1:11435 python serve.py --workers 4
+#
+# Each user registers, logs in, uploads a text file, then until the run ends
+# chats, asks about the file now and then, and polls the dashboard the way
+# the page does (/api/status every 5s, /api/conversation every 30s). Prints
+# requests/s, p50/p99 latency and error rate per endpoint.
+import argparse
+import random
+import secrets
+import threading
+import time
+
+import httpx
+
+from benchmarks.common import load_web_app, percentile
+
+MESSAGES = [
+    "what's a good way to start learning python",
+    "summarize the plot of a heist movie in three sentences",
+    "give me a quick dinner idea with rice and eggs",
+    "explain why the sky is blue",
+    "how do I keep my focus while working from home",
+    "write a short motivational line for my monday",
+]
+QUESTIONS = ["what is this file about", "how many words are in it", "summarize it"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulated users against the EchoMind web app")
+    parser.add_argument('--url', help="drive an already running server instead of starting one")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=60, help="seconds of load after every user has started")
+    parser.add_argument('--ramp', type=float, default=5, help="seconds over which users start")
+    parser.add_argument('--think', type=float, default=3.0, help="mean seconds between a user's chat messages")
+    parser.add_argument('--ask-every', type=int, default=4, help="every Nth message is a question about the file")
+    parser.add_argument('--status-every', type=float, default=5.0)
+    parser.add_argument('--conversation-every', type=float, default=30.0)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    # In-process server only
+    parser.add_argument('--store', default='json://user_data')
+    parser.add_argument('--threads', type=int, default=32, help="server threads")
+    parser.add_argument('--llm-slots', type=int, default=1)
+    parser.add_argument('--backends', type=int, default=1, help="stub Ollama servers")
+    parser.add_argument('--prefill', type=float, default=0.3, help="stub seconds before the first token")
+    parser.add_argument('--token-delay', type=float, default=0.02, help="stub seconds between tokens")
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--parallel', type=int, default=1, help="generations each stub runs at once")
+    return parser.parse_args()
+
+
+class Recorder:
+    """Latency and outcome of every request, per endpoint"""
+
+    def __init__(self):
+        self.samples = {}  # endpoint -> [(seconds, status)]
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds, status):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, status))
+
+    def report(self, elapsed):
+        print(f"\n{'endpoint':<22} {'count':>7} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}   statuses")
+        total = errors = 0
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = [s for s, _ in samples]
+            statuses = {}
+            for _, status in samples:
+                statuses[status] = statuses.get(status, 0) + 1
+            failed = sum(n for status, n in statuses.items() if not isinstance(status, int) or status >= 400)
+            total += len(samples)
+            errors += failed
+            shown = ", ".join(f"{status}: {n}" for status, n in sorted(statuses.items(), key=lambda kv: -kv[1]))
+            print(f"{endpoint:<22} {len(samples):>7} {len(samples) / elapsed:>7.1f} "
+                  f"{percentile(latencies, 50) * 1000:>8.0f} {percentile(latencies, 99) * 1000:>8.0f} "
+                  f"{failed / len(samples):>7.1%}   {shown}")
+        print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+              f"{errors / total if total else 0:.1%} errors")
+
+
+class User(threading.Thread):
+    """One browser session"""
+
+    def __init__(self, number, args, base_url, recorder, stop_at, start_delay):
+        super().__init__(name=f"user-{number}", daemon=True)
+        self.args = args
+        self.recorder = recorder
+        self.stop_at = stop_at
+        self.start_delay = start_delay
+        self.username = f"load{secrets.token_hex(4)}"
+        self.client = httpx.Client(base_url=base_url, timeout=args.timeout)
+        self.random = random.Random(number)
+        self.file_id = None
+
+    def request(self, endpoint, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.client.request(method, path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.recorder.add(endpoint, time.perf_counter() - started, status)
+        return response
+
+    def run(self):
+        time.sleep(self.start_delay)
+        credentials = {'username': self.username, 'password': 'loadtest-password', 'email': f"{self.username}@example.com"}
+        self.request('register', 'POST', '/register', json=credentials)
+        self.request('login', 'POST', '/login', json=credentials)
+        self.request('dashboard', 'GET', '/dashboard')
+
+        text = " ".join(self.random.choice(MESSAGES) for _ in range(200))
+        response = self.request('upload', 'POST', '/api/files/upload',
+                                files={'files': (f"{self.username}.txt", text.encode(), 'text/plain')})
+        if response is not None and response.status_code == 200:
+            self.file_id = response.json()['files'][0]['id']
+
+        now = time.time()
+        next_message = now + self.random.expovariate(1 / self.args.think)
+        next_status = now
+        next_conversation = now + self.args.conversation_every
+        sent = 0
+        while True:
+            due = min(next_message, next_status, next_conversation)
+            if due >= self.stop_at:
+                break
+            time.sleep(max(0.0, due - time.time()))
+
+            if due == next_status:
+                self.request('status', 'GET', '/api/status')
+                next_status += self.args.status_every
+            elif due == next_conversation:
+                self.request('conversation', 'GET', '/api/conversation')
+                next_conversation += self.args.conversation_every
+            else:
+                sent += 1
+                if self.file_id and self.args.ask_every and sent % self.args.ask_every == 0:
+                    self.request('ask', 'POST', f'/api/files/{self.file_id}/ask',
+                                 json={'question': self.random.choice(QUESTIONS)})
+                else:
+                    self.request('chat', 'POST', '/api/chat', json={'message': self.random.choice(MESSAGES)})
+                # Think time starts once the answer is in
+                next_message = time.time() + self.random.expovariate(1 / self.args.think)
+        self.client.close()
+
+
+def start_local_server(args):
+    """web_app on a free port, its LLM on stub Ollama servers. Returns (url, stubs)"""
+    from benchmarks.ollama_stub import StubOllama
+
+    stubs = [StubOllama(prefill=args.prefill, token_delay=args.token_delay, tokens=args.tokens,
+                        parallel=args.parallel).start()
+             for _ in range(args.backends)]
+
+    web_app = load_web_app(args.store)
+    from brain.local_llm import BackendPool
+    from brain.router import ModelRouter
+
+    llm = ModelRouter(large_model=None)
+    pool = BackendPool([stub.url for stub in stubs])
+    for tier in llm.tiers:
+        tier.pool = pool
+    web_app.llm = llm
+    web_app.ai_modules_loaded = True
+    web_app.summarizer.start(llm)
+    web_app.app.config['LLM_SLOTS'] = args.llm_slots
+    web_app.summarizer.slots = args.llm_slots
+
+    try:
+        from waitress.server import create_server
+        server = create_server(web_app.app, host='127.0.0.1', port=0, threads=args.threads)
+        port = server.effective_port
+        serve = server.run
+        name = f"waitress, {args.threads} threads"
+    except ImportError:
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, web_app.app, threaded=True)
+        port = server.server_port
+        serve = server.serve_forever
+        name = "werkzeug threaded"
+    threading.Thread(target=serve, name="load-test-server", daemon=True).start()
+    print(f"🧪 web_app on http://127.0.0.1:{port} ({name}), {len(stubs)} stub Ollama backend(s), "
+          f"{args.llm_slots} LLM slot(s)")
+    return f"http://127.0.0.1:{port}", stubs
+
+
+def main():
+    args = parse_args()
+    stubs = []
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        base_url, stubs = start_local_server(args)
+
+    recorder = Recorder()
+    started = time.time()
+    stop_at = started + args.ramp + args.duration
+    users = [User(n, args, base_url, recorder, stop_at, args.ramp * n / max(1, args.users))
+             for n in range(args.users)]
+    print(f"👥 {args.users} users for {args.ramp + args.duration:.0f}s (think time ~{args.think}s)")
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    recorder.report(time.time() - started)
+
+    if stubs:
+        print(f"🤖 stub generations: {sum(stub.requests for stub in stubs)}")
+        for stub in stubs:
+            stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+# benchmarks/micro.py - Micro-benchmarks for the hot pure-Python paths
+#
+#   python -m benchmarks.micro                    # compare with benchmarks/baselines.json
+#   python -m benchmarks.micro -k extract         # only benchmarks whose name contains "extract"
+#   python -m benchmarks.micro --save             # record the current numbers as the baseline
+#   python -m benchmarks.micro --threshold 0.5    # allow 50% before calling it a regression
+#
+# Runs offline: web_app is imported in a scratch directory with the LLM off,
+# and fixture documents are generated there. Each benchmark is timed like
+# timeit (enough calls per repeat to take REPEAT_SECONDS, several repeats);
+# the median per-call time is compared with the checked-in baseline and the
+# script exits 1 when any benchmark is slower by more than the threshold.
+#
+# Baselines are only meaningful on the machine that recorded them; re-run
+# with --save on the reference box after changing hardware or Python.
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import secrets
+import statistics
+import struct
+import sys
+import time
+import zipfile
+import zlib
+
+from benchmarks.common import REPO_ROOT, load_web_app
+
+BASELINE_FILE = os.path.join(REPO_ROOT, 'benchmarks', 'baselines.json')
+THRESHOLD = float(os.environ.get('ECHOMIND_BENCH_THRESHOLD', '0.25'))
+REPEATS = 7
+REPEAT_SECONDS = 0.1
+
+WORDS = ("the quick brown fox jumps over a lazy dog while echo keeps notes about "
+         "meetings budgets travel plans recipes and the weekly report").split()
+
+BENCHMARKS = []
+
+
+class Skip(Exception):
+    pass
+
+
+def bench(name):
+    """Register a setup function; it returns the no-argument callable to time"""
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+def text_of(words, seed=0):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+# ---- fixture documents ----
+
+def write_docx(path, paragraphs):
+    """Smallest .docx docx2txt can read"""
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('[Content_Types].xml',
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/word/document.xml" ContentType="application/'
+                   'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        z.writestr('_rels/.rels',
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                   'relationships/officeDocument" Target="word/document.xml"/></Relationships>')
+        z.writestr('word/document.xml',
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                   f'<w:body>{body}</w:body></w:document>')
+
+
+def write_pdf(path, pages):
+    """Plain-text PDF, one content stream of text lines per page"""
+    objects = []
+    page_ids = []
+    font_id = 3
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(None)  # pages, filled in below
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for lines in pages:
+        text = "".join(f"({line}) Tj T* " for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {text}ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode())
+        page_ids.append(len(objects))
+    kids = " ".join(f"{n} 0 R" for n in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    with open(path, 'wb') as f:
+        f.write(out.getvalue())
+
+
+def write_png(path, width=400, height=100):
+    """Grey-striped image (OCR finds nothing, but the full pipeline runs)"""
+    rows = b"".join(b"\x00" + bytes((x // 8 % 2) * 255 for x in range(width)) for _ in range(height))
+    chunk = lambda kind, data: (struct.pack(">I", len(data)) + kind + data
+                                + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+    with open(path, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows)))
+        f.write(chunk(b"IEND", b""))
+
+
+# ---- benchmarks ----
+
+web_app = None
+
+
+def extract(filename, file_type, supported):
+    if not supported:
+        raise Skip("extractor not installed")
+    path = os.path.join('fixtures', filename)
+    return lambda: web_app.extract_text_from_file(path, filename, file_type)
+
+
+@bench("extract_text_from_file[txt 50k words]")
+def bench_extract_txt():
+    with open(os.path.join('fixtures', 'doc.txt'), 'w') as f:
+        f.write(text_of(50000))
+    return extract('doc.txt', 'text/plain', True)
+
+
+@bench("extract_text_from_file[pdf 20 pages]")
+def bench_extract_pdf():
+    write_pdf(os.path.join('fixtures', 'doc.pdf'),
+              [[text_of(12, seed=page * 60 + line) for line in range(60)] for page in range(20)])
+    return extract('doc.pdf', 'application/pdf', web_app.PDF_SUPPORT)
+
+
+@bench("extract_text_from_file[docx 500 paragraphs]")
+def bench_extract_docx():
+    write_docx(os.path.join('fixtures', 'doc.docx'), [text_of(40, seed=n) for n in range(500)])
+    return extract('doc.docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                   web_app.DOCX_SUPPORT)
+
+
+@bench("extract_text_from_file[png ocr]")
+def bench_extract_png():
+    write_png(os.path.join('fixtures', 'doc.png'))
+    return extract('doc.png', 'image/png', web_app.PIL_SUPPORT and web_app.TESSERACT_SUPPORT)
+
+
+@bench("build_chat_prompt[100-turn history]")
+def bench_prompt():
+    user_id = secrets.token_hex(16)
+    history = [
+        {'user': text_of(20, seed=n), 'assistant': text_of(60, seed=n + 1000),
+         'timestamp': f"2026-01-01T{n // 60:02d}:{n % 60:02d}:00"}
+        for n in range(100)
+    ]
+    web_app.save_user_conversation(user_id, history)
+    # As the summarizer leaves it: everything folded but the verbatim turns
+    until = history[-web_app.app.config['PROMPT_RECENT_TURNS'] - 1]['timestamp']
+    web_app.store.put('summaries', user_id, {'text': text_of(150), 'until': until, 'updated': time.time()})
+    memory = {'items': []}
+    for n in range(200):
+        web_app.update_memory(memory, f"I really like {text_of(4, seed=n)}")
+    web_app.save_user_memory(user_id, memory)
+    return lambda: web_app.build_chat_prompt(user_id, 'bench', 'what did we say about the weekly report', 'weekly report')
+
+
+@bench("plan_action[mixed utterances]")
+def bench_plan_action():
+    from brain.planner import plan_action
+    utterances = ["open chrome", "play lofi beats on youtube", "what time is it?", "hello there",
+                  "what should I cook for dinner tonight if I only have eggs and rice",
+                  text_of(60)]
+
+    def run():
+        for text in utterances:
+            plan_action(text)
+    return run
+
+
+@bench("generate_simple_answer[1MB, keyword missing]")
+def bench_simple_answer_miss():
+    content = text_of(180000)
+    info = {'file_type': 'text/plain', 'original_filename': 'big.txt', 'summary': ''}
+    return lambda: web_app.generate_simple_answer("where is the warranty paragraph", content, info)
+
+
+@bench("generate_simple_answer[1MB, word count]")
+def bench_simple_answer_count():
+    content = text_of(180000)
+    info = {'file_type': 'text/plain', 'original_filename': 'big.txt', 'summary': ''}
+    return lambda: web_app.generate_simple_answer("how many words does it have", content, info)
+
+
+@bench("add_to_history[100 turns]")
+def bench_add_to_history():
+    user_id = secrets.token_hex(16)
+    for n in range(100):
+        web_app.add_to_history(user_id, text_of(20, seed=n), text_of(60, seed=n))
+    return lambda: web_app.add_to_history(user_id, "one more question", "one more answer")
+
+
+@bench("save_user_conversation[100 turns]")
+def bench_save_conversation():
+    user_id = secrets.token_hex(16)
+    history = [{'user': text_of(20, seed=n), 'assistant': text_of(60, seed=n), 'timestamp': ''} for n in range(100)]
+    return lambda: web_app.save_user_conversation(user_id, history)
+
+
+def users_dir(count):
+    from web_ui.store import JSONFileStore
+    root = f"users_{count}"
+    if os.path.isdir(os.path.join(root, 'users')):
+        return root
+    store = JSONFileStore(root)
+    store.put_many('users', [
+        (f"{n:032x}", {'id': f"{n:032x}", 'username': f"user{n:06d}", 'password': 'scrypt$' + 'x' * 120,
+                       'email': f"user{n}@example.com", 'created_at': '2026-01-01T00:00:00', 'preferences': {}})
+        for n in range(count)
+    ])
+    return root
+
+
+@bench("user record load[10k users]")
+def bench_users_load():
+    from web_ui.store import JSONFileStore
+    store = JSONFileStore(users_dir(10000))
+    return lambda: store.get('users', f"{1:032x}")
+
+
+@bench("user record save[10k users]")
+def bench_users_save():
+    from web_ui.store import JSONFileStore
+    store = JSONFileStore(users_dir(10000))
+    user = store.get('users', f"{1:032x}")
+    return lambda: store.put('users', user['id'], user)
+
+
+# ---- runner ----
+
+def measure(fn, repeats=REPEATS, repeat_seconds=REPEAT_SECONDS):
+    """Per-call seconds for each repeat"""
+    fn()  # warm caches and lazy imports
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= repeat_seconds or number >= 1 << 20:
+            break
+        number *= 2 if elapsed < repeat_seconds / 10 else max(2, int(repeat_seconds / elapsed) + 1)
+    samples = [elapsed / number]
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return samples
+
+
+def load_baselines(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'results': {}}
+
+
+def fmt(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks with checked-in baselines")
+    parser.add_argument('-k', dest='filter', help="only benchmarks whose name contains this")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="slowdown over the baseline median that counts as a regression (0.25 = 25%%)")
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--save', action='store_true', help="write the results as the new baseline")
+    return parser.parse_args()
+
+
+def main():
+    global web_app
+    args = parse_args()
+    web_app = load_web_app('json://user_data')
+    os.makedirs('fixtures', exist_ok=True)
+
+    baselines = load_baselines(args.baseline)
+    previous = baselines.get('results', {})
+    results = {}
+    regressions = []
+
+    print(f"{'benchmark':<46} {'median':>10} {'min':>10} {'baseline':>10} {'change':>8}")
+    for name, setup in BENCHMARKS:
+        if args.filter and args.filter not in name:
+            continue
+        try:
+            fn = setup()
+        except Skip as e:
+            print(f"{name:<46} {'skipped: ' + str(e):>40}")
+            continue
+        samples = measure(fn, args.repeats)
+        median = statistics.median(samples)
+        results[name] = {'median': median, 'min': min(samples)}
+
+        base = previous.get(name)
+        if base:
+            change = median / base['median'] - 1
+            flag = " ❌" if change > args.threshold else ""
+            if flag:
+                regressions.append((name, change))
+            print(f"{name:<46} {fmt(median):>10} {fmt(min(samples)):>10} {fmt(base['median']):>10} {change:>+8.0%}{flag}")
+        else:
+            print(f"{name:<46} {fmt(median):>10} {fmt(min(samples)):>10} {'-':>10} {'new':>8}")
+
+    if args.save:
+        baselines = {
+            'machine': f"{platform.system()} {platform.machine()}, {platform.processor() or 'unknown cpu'}",
+            'python': platform.python_version(),
+            'recorded': time.strftime('%Y-%m-%d'),
+            'results': dict(previous, **results),
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n💾 Saved {len(results)} baselines to {args.baseline}")
+        return
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: "
+              + ", ".join(f"{name} ({change:+.0%})" for name, change in regressions))
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+# benchmarks/ollama_stub.py - Minimal Ollama-compatible server for load tests
+#
+#   python -m benchmarks.ollama_stub --port 11435 --prefill 0.3 --token-delay 0.02
+#
+# Serves /api/chat (streamed NDJSON or a single JSON reply), /api/generate,
+# /api/tags, /api/ps and /api/version well enough for the ollama client.
+# Each reply waits `prefill` seconds plus `per_prompt_char` per prompt
+# character, then emits `tokens` tokens `token_delay` apart. At most
+# `parallel` requests generate at once, like one GPU box; the rest queue.
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = "sure thing boss here is a quick answer that keeps going for a while".split()
+
+
+class StubOllama:
+    """One fake Ollama instance on its own thread"""
+
+    def __init__(self, host="127.0.0.1", port=0, prefill=0.2, token_delay=0.02, tokens=30,
+                 per_prompt_char=0.0, parallel=1, model="phi3"):
+        self.prefill = prefill
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.per_prompt_char = per_prompt_char
+        self.model = model
+        self.loaded = set()
+        self.requests = 0
+        self.stopped = False
+        self._slots = threading.Semaphore(parallel)
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle_one_request(self):
+                if stub.stopped:
+                    self.close_connection = True
+                    return
+                super().handle_one_request()
+
+            def do_GET(self):
+                stub._get(self)
+
+            def do_HEAD(self):
+                stub._send_json(self, {})
+
+            def do_POST(self):
+                stub._post(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    # ---- lifecycle ----
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name=f"ollama-stub-{self.url}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # Kept-alive connections outlive shutdown(); their handlers drop requests
+        self.stopped = True
+        self.server.shutdown()
+        self.server.server_close()
+
+    # ---- handlers ----
+
+    def _send_json(self, handler, body, status=200):
+        data = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _get(self, handler):
+        if handler.path == "/api/version":
+            self._send_json(handler, {"version": "0.0.0-stub"})
+        elif handler.path == "/api/tags":
+            self._send_json(handler, {"models": [{"name": self.model, "model": self.model}]})
+        elif handler.path == "/api/ps":
+            with self._lock:
+                loaded = sorted(self.loaded)
+            self._send_json(handler, {"models": [{"name": m, "model": m, "size_vram": 0} for m in loaded]})
+        else:
+            self._send_json(handler, {"error": "not found"}, 404)
+
+    def _post(self, handler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(handler.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(handler, {"error": "bad json"}, 400)
+
+        if handler.path not in ("/api/chat", "/api/generate"):
+            return self._send_json(handler, {"error": "not found"}, 404)
+
+        model = body.get("model", self.model)
+        if handler.path == "/api/chat":
+            messages = body.get("messages") or []
+            prompt = "".join(m.get("content", "") for m in messages)
+        else:
+            prompt = body.get("prompt", "")
+
+        with self._lock:
+            self.requests += 1
+        if not self._slots.acquire(timeout=600):
+            return self._send_json(handler, {"error": "busy"}, 503)
+        try:
+            self._reply(handler, handler.path, model, prompt, body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away, stop generating
+        finally:
+            self._slots.release()
+
+    def _reply(self, handler, path, model, prompt, body):
+        started = time.time()
+        keep_alive = body.get("keep_alive")
+        with self._lock:
+            if keep_alive in (0, "0", "0s"):
+                self.loaded.discard(model)
+            else:
+                self.loaded.add(model)
+
+        time.sleep(self.prefill + self.per_prompt_char * len(prompt))
+        # An empty prompt only loads the model
+        tokens = self.tokens if prompt else 0
+        now = lambda: datetime.now(timezone.utc).isoformat()
+
+        def chunk(text, done):
+            data = {"model": model, "created_at": now(), "done": done}
+            if path == "/api/chat":
+                data["message"] = {"role": "assistant", "content": text}
+            else:
+                data["response"] = text
+            if done:
+                data.update({
+                    "done_reason": "stop",
+                    "total_duration": int((time.time() - started) * 1e9),
+                    "prompt_eval_count": len(prompt.split()),
+                    "eval_count": tokens,
+                })
+            return data
+
+        if not body.get("stream", True):
+            time.sleep(self.token_delay * tokens)
+            text = " ".join(WORDS[n % len(WORDS)] for n in range(tokens))
+            return self._send_json(handler, chunk(text, True))
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def write(data):
+            line = (json.dumps(data) + "\n").encode()
+            handler.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            handler.wfile.flush()
+
+        for n in range(tokens):
+            if n:
+                time.sleep(self.token_delay)
+            write(chunk(WORDS[n % len(WORDS)] + " ", False))
+        write(chunk("", True))
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Minimal Ollama-compatible server for load tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--prefill', type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument('--per-prompt-char', type=float, default=0.0, help="extra prefill seconds per prompt character")
+    parser.add_argument('--token-delay', type=float, default=0.02, help="seconds between tokens")
+    parser.add_argument('--tokens', type=int, default=30)
+    parser.add_argument('--parallel', type=int, default=1, help="requests generating at once")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    stub = StubOllama(args.host, args.port, args.prefill, args.token_delay, args.tokens,
+                      args.per_prompt_char, args.parallel)
+    print(f"🧪 Ollama stub on {stub.url} (prefill {args.prefill}s, {args.tokens} tokens every {args.token_delay}s)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
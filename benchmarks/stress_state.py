@@ -0,0 +1,144 @@
+# benchmarks/stress_state.py - Hammer web_app's per-user state from many threads
+#
+#   python -m benchmarks.stress_state --users 20 --threads-per-user 3 --rounds 20
+#
+# Users register concurrently, two clients racing for every name. Then every
+# user is driven by several threads at once (chat, upload, profile, delete).
+# Afterwards exactly one registration per name must have won, the username
+# index must point at it, each user's history, file list and profile must
+# hold what was written and every JSON file must parse. Exits 1 on any lost
+# update.
+import argparse
+import io
+import json
+import os
+import threading
+import time
+
+from benchmarks.common import load_web_app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--threads-per-user', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=15)
+    parser.add_argument('--store', default='json://user_data')
+    return parser.parse_args()
+
+
+def register_all(web_app, usernames, racers=2):
+    """Register every name from `racers` clients at once; {username: [(client, status)]}"""
+    attempts = {username: [] for username in usernames}
+
+    def register(username):
+        client = web_app.app.test_client()
+        response = client.post('/register', json={'username': username, 'password': 'password1'})
+        attempts[username].append((client, response.status_code))
+
+    threads = [threading.Thread(target=register, args=(username,))
+               for username in usernames for _ in range(racers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return attempts
+
+
+def worker(web_app, client, thread_no, rounds, errors):
+    try:
+        for i in range(rounds):
+            response = client.post('/api/chat', json={'message': f"t{thread_no} message {i}"})
+            if response.status_code != 200:
+                errors.append(f"chat {response.status_code}")
+            response.close()
+
+            data = {'files': (io.BytesIO(f"thread {thread_no} round {i}".encode()), f"t{thread_no}_{i}.txt")}
+            response = client.post('/api/files/upload', data=data, content_type='multipart/form-data')
+            if response.status_code != 200:
+                errors.append(f"upload {response.status_code}")
+                continue
+
+            # Delete every other upload again
+            if i % 2:
+                file_id = response.json['files'][0]['id']
+                if client.delete(f'/api/files/{file_id}').status_code != 200:
+                    errors.append("delete")
+
+            client.put('/api/user/profile', json={'preferences': {'thread': thread_no, 'round': i}})
+    except Exception as e:
+        errors.append(repr(e))
+
+
+def main():
+    args = parse_args()
+    web_app = load_web_app(args.store)
+    # Let every thread chat at once; this is a storage test, not an LLM test
+    web_app.app.config['LLM_SLOTS'] = args.users * args.threads_per_user
+
+    usernames = [f"user{n:04d}" for n in range(args.users)]
+    errors = []
+    clients = []
+    for username, attempts in register_all(web_app, usernames).items():
+        winners = [client for client, status in attempts if status == 200]
+        if len(winners) != 1:
+            errors.append(f"{username} registered {len(winners)} times")
+        clients.extend(winners[:1])
+
+    threads = []
+    for user_no, client in enumerate(clients):
+        for t in range(args.threads_per_user):
+            thread_no = user_no * args.threads_per_user + t
+            threads.append(threading.Thread(target=worker, args=(web_app, client, thread_no, args.rounds, errors)))
+
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    # ---- VERIFY ----
+    if len(web_app.store.keys('users')) != len(usernames):
+        errors.append(f"{len(web_app.store.keys('users'))} user records, expected {len(usernames)}")
+    expected_messages = min(100, args.threads_per_user * args.rounds)
+    expected_files = args.threads_per_user * (args.rounds - args.rounds // 2)
+    for client in clients:
+        profile = client.get('/api/user/profile').json
+        user_id = web_app.store.get('usernames', profile['username'])
+        if user_id != profile['id']:
+            errors.append(f"username index for {profile['username']} points at {user_id}")
+        if not web_app.store.get('users', profile['id'], {}).get('password'):
+            errors.append(f"{profile['username']} lost its password")
+        # The last write wins, and it is some thread's last round
+        if profile['preferences'].get('round') != args.rounds - 1:
+            errors.append(f"profile holds {profile['preferences']}, expected a final round")
+
+        history = client.get('/api/conversation').json
+        files = client.get('/api/files').json
+        if len(history) != expected_messages:
+            errors.append(f"history has {len(history)} entries, expected {expected_messages}")
+        if len(files) != expected_files:
+            errors.append(f"file list has {len(files)} entries, expected {expected_files}")
+
+    for root, _, names in os.walk('user_data'):
+        for name in names:
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(root, name)) as f:
+                        json.load(f)
+                except ValueError:
+                    errors.append(f"corrupt {name}")
+            if name.endswith('.tmp'):
+                errors.append(f"leftover temp file {name}")
+
+    operations = len(threads) * args.rounds * 4
+    print(f"{len(threads)} threads, {operations} operations in {elapsed:.1f}s ({operations / elapsed:.0f} ops/s)")
+    if errors:
+        print(f"❌ {len(errors)} problems, first: {errors[:5]}")
+        raise SystemExit(1)
+    print("✅ No lost updates, all JSON intact")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+# brain/intents.py - Declarative intent table matched in one regex pass
+#
+# A keyword prefilter (one byte-table translate and a set intersection)
+# finds which intents could apply; their patterns are then tried as one
+# alternation, compiled once per keyword set. Text with no trigger word -
+# most chat messages - never reaches a regex.
+import re
+import string
+import time
+
+HELP_TEXT = """I can help you with:
+• Answering questions
+• Opening websites (try: open youtube)
+• Playing videos (try: play music)
+• Opening applications (try: open notepad)
+• Uploading and analyzing files
+• Voice conversations
+• Remembering our conversations"""
+
+
+def _utterance(*bodies):
+    """Whole-utterance pattern: optional "hey echo", one of the bodies, optional "please"/"now" """
+    return (
+        r"^\s*(?:(?:hey|hi|ok|okay)\s+echo[,\s]+)?"
+        r"(?:" + "|".join(bodies) + r")"
+        r"(?:[,\s]+(?:please|now|right\s+now|echo|boss))*[\s?.!]*$"
+    )
+
+
+def _answer_time(slots, name):
+    return f"The current time is {time.strftime('%I:%M %p')}."
+
+
+def _answer_date(slots, name):
+    return f"Today is {time.strftime('%B %d, %Y')}."
+
+
+def _answer_help(slots, name):
+    return HELP_TEXT
+
+
+def _answer_greeting(slots, name):
+    return f"Hello {name}! How can I help you today?"
+
+
+# Checked in order - the first intent that matches wins. An intent is only
+# tried when one of its keywords occurs as a word in the input.
+#   kind "action": "plan" is filled with the slots and handed to an agent
+#   kind "answer": "answer" builds the reply, no LLM needed
+INTENTS = [
+    {
+        "name": "open_app",
+        "kind": "action",
+        "keywords": {"open", "launch", "start", "chrome", "notepad"},
+        "patterns": [
+            r"\b(?:open|launch|start)\s+(?:the\s+)?(?P<app>notepad|calculator|chrome|edge)\b",
+            r"\b(?P<app>chrome|notepad)\b",
+        ],
+        "plan": {"agent": "windows", "app": "{app}"},
+    },
+    {
+        "name": "open_site",
+        "kind": "action",
+        "keywords": {"open", "go", "launch"},
+        "patterns": [
+            r"^(?:please\s+)?(?:open|go\s+to|launch)\s+(?P<site>youtube|google|github|wikipedia)(?:\.com)?[\s?.!]*$",
+        ],
+        "plan": {"agent": "browser", "action": "open_url", "url": "https://www.{site}.com"},
+    },
+    {
+        "name": "youtube",
+        "kind": "action",
+        "keywords": {"youtube"},
+        "patterns": [
+            r"^(?:(?:play|search(?:\s+for)?|find)\s+)?(?P<query>.*?)\s*(?:\bon\s+)?\byoutube\b\s*(?P<tail>.*)$",
+        ],
+        "plan": {"agent": "browser", "action": "youtube", "query": "{query} {tail}"},
+    },
+    {
+        "name": "time",
+        "kind": "answer",
+        "keywords": {"time"},
+        "patterns": [
+            _utterance(
+                r"what(?:'s|\s+is)\s+the\s+(?:current\s+)?time",
+                r"what\s+time\s+is\s+it",
+                r"(?:tell\s+me\s+)?the\s+time",
+                r"current\s+time",
+                r"time",
+            ),
+        ],
+        "answer": _answer_time,
+    },
+    {
+        "name": "date",
+        "kind": "answer",
+        "keywords": {"date", "day", "today"},
+        "patterns": [
+            _utterance(
+                r"what(?:'s|\s+is)\s+(?:the|today'?s)\s+date(?:\s+today)?",
+                r"what\s+day\s+is\s+(?:it|today)(?:\s+today)?",
+                r"what(?:'s|\s+is)\s+today",
+                r"today'?s\s+date",
+                r"date",
+            ),
+        ],
+        "answer": _answer_date,
+    },
+    {
+        "name": "help",
+        "kind": "answer",
+        "keywords": {"help", "do"},
+        "patterns": [
+            _utterance(
+                r"help(?:\s+me)?",
+                r"what\s+can\s+you\s+do",
+                r"what\s+can\s+you\s+help(?:\s+me)?\s+with",
+            ),
+        ],
+        "answer": _answer_help,
+    },
+    {
+        "name": "greeting",
+        "kind": "answer",
+        "keywords": {"hi", "hello", "hey", "good"},
+        "patterns": [
+            _utterance(
+                r"(?:hi|hello|hey)(?:\s+there)?",
+                r"good\s+(?:morning|afternoon|evening)",
+            ),
+        ],
+        "answer": _answer_greeting,
+    },
+]
+
+
+def compile_intents(intents):
+    """Index the intents by trigger word and turn every pattern into an anchored alternative.
+
+    Slot groups are renamed per pattern so alternatives can reuse slot names.
+    Unanchored patterns get a lazy prefix, so matching at the start of the
+    text finds the same leftmost occurrence a search would.
+    """
+    alternatives = []
+    by_keyword = {}
+    for i, intent in enumerate(intents):
+        parts = []
+        for j, pattern in enumerate(intent["patterns"]):
+            group = f"i{i}p{j}"
+            slot_names = re.findall(r"\(\?P<(\w+)>", pattern)
+            body = re.sub(r"\(\?P<(\w+)>", lambda m: f"(?P<{group}__{m.group(1)}>", pattern)
+            if not body.startswith("^"):
+                body = r"[\s\S]*?(?:" + body + ")"
+            parts.append((group, body, [(f"{group}__{name}", name) for name in slot_names]))
+        alternatives.append((intent, parts))
+        for keyword in intent["keywords"]:
+            by_keyword.setdefault(keyword, []).append(i)
+    return alternatives, {keyword: tuple(found) for keyword, found in by_keyword.items()}
+
+
+def _combine(found):
+    """One regex over the patterns of every intent the found words trigger, in registry order"""
+    candidates = sorted({i for word in found for i in _BY_KEYWORD[word.decode()]})
+    parts = []
+    groups = {}
+    for i in candidates:
+        intent, alternatives = _ALTERNATIVES[i]
+        for group, body, slots in alternatives:
+            parts.append(f"(?P<{group}>{body})")
+            groups[group] = (intent, slots)
+    if len(_COMBINED) >= 1024:
+        _COMBINED.clear()
+    combined = _COMBINED[found] = (re.compile("|".join(parts)).match, groups)
+    return combined
+
+
+_ALTERNATIVES, _BY_KEYWORD = compile_intents(INTENTS)
+# The prefilter works on UTF-8 bytes: one table lowercases ASCII and blanks
+# punctuation, which is much cheaper than str.lower() plus str.translate()
+_KEYWORDS = frozenset(keyword.encode() for keyword in _BY_KEYWORD)
+_WORDS = bytes(
+    ord(" ") if chr(c) in string.punctuation else ord(chr(c).lower()) if c < 128 else c
+    for c in range(256)
+)
+# Found keywords -> (match, groups), filled on first use; real inputs hit only a handful of sets
+_COMBINED = {}
+
+
+def match_intent(text: str):
+    """Returns (intent, slots) for the first matching intent, or (None, {})
+
+    One pass over the words picks the intents whose trigger words occur,
+    then one regex match tries their patterns. Matching always starts at
+    the beginning of the text, where an alternation takes its alternatives
+    in order, so the first intent in the registry wins - not the one whose
+    words come first.
+    """
+    found = _KEYWORDS.intersection(text.encode().translate(_WORDS).split())
+    if not found:
+        return None, {}
+    match, groups = _COMBINED.get(found) or _combine(found)
+    m = match(text.lower().strip())
+    if m is None:
+        return None, {}
+    intent, slots = groups[m.lastgroup]
+    return intent, {name: (m.group(group) or "") for group, name in slots}
+
+
+def _plan_template(plan):
+    """(key, value, templated) per plan entry, so constants are not formatted on every call"""
+    return [(key, value, "{" in value) for key, value in plan.items()]
+
+
+for _intent in INTENTS:
+    if "plan" in _intent:
+        _intent["_plan"] = _plan_template(_intent["plan"])
+
+
+def route_intent(text: str, name="Boss"):
+    """
+    Plan for the text:
+      action intents -> the filled "plan" dict
+      answer intents -> {"agent": "answer", "response": ...}
+      nothing        -> {"agent": "llm"}
+    """
+    intent, slots = match_intent(text)
+    if intent is None:
+        return {"agent": "llm"}
+
+    if intent["kind"] == "answer":
+        return {"agent": "answer", "intent": intent["name"], "response": intent["answer"](slots, name)}
+
+    plan = {"intent": intent["name"]}
+    for key, value, templated in intent["_plan"]:
+        plan[key] = " ".join(value.format(**slots).split()) if templated else value
+    return plan
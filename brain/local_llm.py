@@ -1,28 +1,423 @@
-from ollama import chat
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from datetime import datetime
+
+import httpx
+from ollama import Client, AsyncClient, ResponseError
+
+from echomind import metrics
+
+
+# Comma-separated Ollama URLs, e.g. "http://gpu1:11434,http://gpu2:11434".
+# Empty means the single default endpoint (OLLAMA_HOST or localhost).
+OLLAMA_HOSTS = [h.strip() for h in os.environ.get("ECHOMIND_OLLAMA_HOSTS", "").split(",") if h.strip()]
+HEALTH_INTERVAL = float(os.environ.get("ECHOMIND_OLLAMA_HEALTH_INTERVAL", "10"))
+HEALTH_TIMEOUT = 2
+
+# Hours (local time, "start-end", e.g. "8-23" or "22-6") during which the
+# model is pinned in memory. Outside them Ollama unloads it after IDLE_KEEP_ALIVE.
+KEEP_ALIVE_HOURS = os.environ.get("ECHOMIND_KEEP_ALIVE_HOURS", "")
+IDLE_KEEP_ALIVE = os.environ.get("ECHOMIND_IDLE_KEEP_ALIVE", "5m")
+# How often the keeper checks residency and re-warms the model
+KEEPER_INTERVAL = float(os.environ.get("ECHOMIND_KEEPER_INTERVAL", "60"))
+
+# A session stays on its backend unless that one has this many more
+# requests in flight than the least busy healthy backend
+AFFINITY_SLACK = 2
+AFFINITY_SESSIONS = 10000
+
+
+# One event loop per process runs every async generation, so request
+# threads only wait on a Future and can cancel it at any time
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-loop", daemon=True).start()
+        return _loop
+
+
+def pinned_now(hours=KEEP_ALIVE_HOURS, now=None):
+    """Is the current hour inside the keep-alive window?"""
+    if not hours:
+        return False
+    try:
+        start, end = (int(h) for h in hours.split("-"))
+    except ValueError:
+        return False
+    hour = (now or datetime.now()).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end  # window across midnight
+
+
+def _same_model(a, b):
+    tag = lambda name: name if ":" in name else f"{name}:latest"
+    return tag(a) == tag(b)
+
+
+def _retryable(error):
+    """Errors that another backend might not have"""
+    if isinstance(error, (ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, ResponseError):
+        # 404: model not pulled on that box, 5xx: box in trouble
+        return error.status_code == 404 or error.status_code >= 500
+    return False
+
+
+class Backend:
+    """One Ollama endpoint and its load counters"""
+
+    def __init__(self, host=None):
+        self.host = host
+        self.client = Client(host=host)
+        self.health_client = Client(host=host, timeout=HEALTH_TIMEOUT)
+        self._async_client = None
+        self.healthy = True
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0
+
+    @property
+    def async_client(self):
+        # Created on first use from the llm loop
+        if self._async_client is None:
+            self._async_client = AsyncClient(host=self.host)
+        return self._async_client
+
+    @property
+    def name(self):
+        return self.host or os.environ.get("OLLAMA_HOST", "default")
+
+
+class BackendPool:
+    """
+    Spreads requests over several Ollama endpoints: least outstanding
+    requests wins, a session sticks to its previous backend while that is
+    not much busier (keeps the prompt cache warm), and failing backends are
+    skipped until the health check sees them answer again.
+    """
+
+    def __init__(self, hosts=None, health_interval=HEALTH_INTERVAL):
+        self.backends = [Backend(host) for host in (hosts or [None])]
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._affinity = OrderedDict()  # session -> Backend
+        self._next = 0
+        self._health_thread = None
+
+    def acquire(self, session=None, exclude=()):
+        """Pick a backend and count the request against it; None if all excluded"""
+        self._start_health_checks()
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            if not candidates:
+                return None
+            # If every backend looks down, try them anyway rather than fail outright
+            healthy = [b for b in candidates if b.healthy] or candidates
+
+            least = min(b.outstanding for b in healthy)
+            backend = self._affinity.get(session) if session is not None else None
+            if backend not in healthy or backend.outstanding > least + AFFINITY_SLACK:
+                # Rotate among the least loaded so ties spread out
+                idle = [b for b in healthy if b.outstanding == least]
+                backend = idle[self._next % len(idle)]
+                self._next += 1
+
+            if session is not None:
+                self._affinity[session] = backend
+                self._affinity.move_to_end(session)
+                while len(self._affinity) > AFFINITY_SESSIONS:
+                    self._affinity.popitem(last=False)
+
+            backend.outstanding += 1
+            return backend
+
+    def release(self, backend, error=None):
+        with self._lock:
+            backend.outstanding -= 1
+            if error is None:
+                backend.served += 1
+                backend.healthy = True
+            else:
+                backend.failures += 1
+                if isinstance(error, (ConnectionError, httpx.TransportError)):
+                    backend.healthy = False
+
+    def check(self):
+        """Probe every backend once"""
+        for backend in self.backends:
+            try:
+                backend.health_client.ps()
+                healthy = True
+            except Exception:
+                healthy = False
+            with self._lock:
+                if healthy != backend.healthy:
+                    print(f"{'✅' if healthy else '⚠️'} Ollama backend {backend.name} is {'up' if healthy else 'down'}")
+                backend.healthy = healthy
+
+    def _start_health_checks(self):
+        if self._health_thread is not None or len(self.backends) < 2:
+            return
+        with self._lock:
+            if self._health_thread is not None:
+                return
+            self._health_thread = threading.Thread(target=self._health_loop, name="llm-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            self.check()
+
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    'host': b.name,
+                    'healthy': b.healthy,
+                    'outstanding': b.outstanding,
+                    'served': b.served,
+                    'failures': b.failures,
+                }
+                for b in self.backends
+            ]
+
+
+_default_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool over ECHOMIND_OLLAMA_HOSTS"""
+    global _default_pool
+    with _pool_lock:
+        if _default_pool is None:
+            _default_pool = BackendPool(OLLAMA_HOSTS)
+        return _default_pool
 
 
 class LocalLLM:
-    def __init__(self, model_name="phi3"):
+    def __init__(self, model_name="phi3", hosts=None):
         self.model_name = model_name
+        self.options = {
+            "num_thread": 8,
+            "num_ctx": 2048,
+        }
+        self.pool = BackendPool(hosts) if hosts else get_pool()
+
+        # Readiness: "cold" until the model is seen in memory on some backend
+        self.state = "cold"
+        self.resident = {}  # backend name -> model loaded?
+        self.checked_at = None
+        self._pinned = False
+        self._keeper = None
+
+    # ---- warm-up / keep-alive ----
+
+    def keep_alive(self):
+        """keep_alive to send with every request: pinned inside the window"""
+        return -1 if pinned_now() else IDLE_KEEP_ALIVE
+
+    def warm_up(self):
+        """Load the model on every reachable backend with a one-token generation"""
+        self.state = "loading"
+        keep_alive = self.keep_alive()
+        for backend in self.pool.backends:
+            started = time.time()
+            try:
+                backend.client.generate(
+                    model=self.model_name,
+                    prompt="hi",
+                    options=dict(self.options, num_predict=1),
+                    keep_alive=keep_alive,
+                )
+                print(f"🔥 {self.model_name} warm on {backend.name} ({time.time() - started:.1f}s)")
+            except Exception as e:
+                print(f"⚠️ Could not warm {self.model_name} on {backend.name}: {e}")
+        self._pinned = keep_alive == -1
+        self.state = "cold"
+        self.check_residency()
+
+    def check_residency(self):
+        """Ask every backend whether the model is actually loaded"""
+        resident = {}
+        reachable = False
+        for backend in self.pool.backends:
+            try:
+                models = backend.health_client.ps().models
+                reachable = True
+            except Exception:
+                resident[backend.name] = False
+                continue
+            resident[backend.name] = any(_same_model(m.model or m.name or "", self.model_name) for m in models)
+
+        self.resident = resident
+        self.checked_at = time.time()
+        if any(resident.values()):
+            self.state = "ready"
+        else:
+            self.state = "cold" if reachable else "unavailable"
+        return resident
+
+    def readiness(self):
+        return {
+            'model': self.model_name,
+            'state': self.state,
+            'ready': self.state == "ready",
+            'resident': dict(self.resident),
+            'pinned': self._pinned,
+            'checked_at': datetime.fromtimestamp(self.checked_at).isoformat() if self.checked_at else None,
+        }
+
+    def start_keeper(self):
+        """Warm up now, then keep the model resident during KEEP_ALIVE_HOURS"""
+        if self._keeper is None:
+            self._keeper = threading.Thread(target=self._keep, name=f"llm-keeper-{self.model_name}", daemon=True)
+            self._keeper.start()
+
+    def _keep(self):
+        self.warm_up()
+        while True:
+            time.sleep(KEEPER_INTERVAL)
+            try:
+                pinned = pinned_now()
+                resident = self.check_residency()
+                if pinned and not all(resident.values()):
+                    print(f"🔄 {self.model_name} was unloaded, warming it again")
+                    self.warm_up()
+                elif pinned and not self._pinned:
+                    self.warm_up()  # window opened: pin it
+                elif self._pinned and not pinned:
+                    # Window closed: hand the model back to Ollama's idle timer
+                    for backend in self.pool.backends:
+                        try:
+                            backend.client.generate(model=self.model_name, prompt="", keep_alive=IDLE_KEEP_ALIVE)
+                        except Exception:
+                            pass
+                    self._pinned = False
+                    print(f"🌙 {self.model_name} no longer pinned, Ollama unloads it after {IDLE_KEEP_ALIVE} idle")
+            except Exception as e:
+                print(f"⚠️ LLM keeper error: {e}")
+
+    def _observe(self, started, first_token, done):
+        """Time to first token, generation speed and prompt size of one reply"""
+        if first_token is None:
+            return
+        metrics.LLM_TTFT_SECONDS.observe(first_token - started, self.model_name)
+        if done is None:
+            return
+        if done.eval_count and done.eval_duration:
+            metrics.LLM_TOKENS_PER_SECOND.observe(done.eval_count / (done.eval_duration / 1e9), self.model_name)
+        elif done.eval_count:
+            elapsed = time.perf_counter() - first_token
+            if elapsed > 0:
+                metrics.LLM_TOKENS_PER_SECOND.observe(done.eval_count / elapsed, self.model_name)
+        if done.prompt_eval_count is not None:
+            metrics.LLM_PROMPT_TOKENS.observe(done.prompt_eval_count, self.model_name)
+
+    def _failed(self, backend, error, tried):
+        self.pool.release(backend, error)
+        if not _retryable(error):
+            raise error
+        tried.append(backend)
+        print(f"⚠️ Ollama backend {backend.name} failed ({error}), trying another")
+
+    def generate(self, prompt: str, session=None) -> str:
+        """
+        Blocking full response (safe, stable).
+        Fails over to another backend if one drops out.
+        """
+        tried = []
+        while True:
+            backend = self.pool.acquire(session, exclude=tried)
+            if backend is None:
+                raise ConnectionError("No Ollama backend could serve the request")
+
+            response = ""
+            started, first_token, done = time.perf_counter(), None, None
+            try:
+                for chunk in backend.client.chat(
+                    model=self.model_name,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    stream=True,
+                    options=self.options,
+                    keep_alive=self.keep_alive()
+                ):
+                    token = chunk["message"]["content"]
+                    response += token
+                    if first_token is None and token:
+                        first_token = time.perf_counter()
+                    if chunk.done:
+                        done = chunk
+            except Exception as e:
+                self._failed(backend, e, tried)
+                continue
+
+            self.pool.release(backend)
+            if metrics.ENABLED:
+                self._observe(started, first_token, done)
+            self.state = "ready"
+            return response
+
+    async def agenerate(self, prompt: str, session=None) -> str:
+        """
+        Async full response. Cancelling the task closes the stream,
+        which makes Ollama stop generating.
+        """
+        tried = []
+        while True:
+            backend = self.pool.acquire(session, exclude=tried)
+            if backend is None:
+                raise ConnectionError("No Ollama backend could serve the request")
+
+            response = ""
+            started, first_token, done = time.perf_counter(), None, None
+            try:
+                async for chunk in await backend.async_client.chat(
+                    model=self.model_name,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    stream=True,
+                    options=self.options,
+                    keep_alive=self.keep_alive()
+                ):
+                    token = chunk["message"]["content"]
+                    response += token
+                    if first_token is None and token:
+                        first_token = time.perf_counter()
+                    if chunk.done:
+                        done = chunk
+            except asyncio.CancelledError:
+                self.pool.release(backend)
+                raise
+            except Exception as e:
+                self._failed(backend, e, tried)
+                continue
+
+            self.pool.release(backend)
+            if metrics.ENABLED:
+                self._observe(started, first_token, done)
+            self.state = "ready"
+            return response
 
-    def generate(self, prompt: str) -> str:
+    def submit(self, prompt: str, session=None):
         """
-        Blocking full response (safe, stable)
+        Start agenerate on the background loop.
+        Returns a concurrent.futures.Future - call cancel() to stop it.
         """
-        response = ""
-
-        for chunk in chat(
-            model=self.model_name,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            stream=True,
-            options={
-                "num_thread": 8,
-                "num_ctx": 2048,
-            }
-        ):
-            token = chunk["message"]["content"]
-            response += token
-
-        return response
\ No newline at end of file
+        return asyncio.run_coroutine_threadsafe(self.agenerate(prompt, session), _get_loop())
@@ -1,18 +1,323 @@
 import json
+import math
 import os
+import re
+import secrets
+import time
 
+# Snapshot of the whole memory, plus a journal of changes made since
 MEMORY_FILE = "memory.json"
+JOURNAL_FILE = "memory.journal.jsonl"
+# Fold the journal into a new snapshot once it grows past this
+COMPACT_BYTES = 256 * 1024
+
+# Most memories kept; the weakest are forgotten first
+MAX_ITEMS = 200
+# Memories put into a prompt
+RECALL_K = 5
+# Longest memory text kept
+MAX_TEXT = 160
+
+# kind -> (importance, half-life in days)
+KINDS = {
+    "fact": (1.0, 90),
+    "preference": (0.7, 30),
+    "topic": (0.2, 7),
+}
+
+# Two memories of the same kind sharing this much of their words are one memory
+DUPLICATE_OVERLAP = 0.6
+
+STOPWORDS = set("""
+a about after again all also am an and any are as at be because been before being but by can
+could did do does doing don't for from had has have having he her here hers him his how i i'm
+if in into is it it's its just me more most my no not now of on once only or other our out over
+own really same she should so some such than that the their them then there these they this
+those through to too under until up very was we were what when where which while who why will
+with would you your yours hey hello okay yeah yes echo boss please thanks thank like
+""".split())
+
+FACT_PATTERNS = [
+    re.compile(r"\bmy name is (?P<x>[\w' -]+)", re.I),
+    re.compile(r"\bcall me (?P<x>[\w' -]+)", re.I),
+    re.compile(r"\bi (?:live|work|study) (?:in|at|for) (?P<x>[\w' ,-]+)", re.I),
+    re.compile(r"\bmy (?P<x>(?:favou?rite \w+|birthday|job|hometown|dog|cat|pet|wife|husband|partner|"
+               r"son|daughter|brother|sister|mom|dad|mother|father|best friend)'?s? (?:name )?(?:is|are) [\w' ,-]+)", re.I),
+]
+# "Remember that ..." - the rest is kept as said
+REMEMBER_PATTERN = re.compile(r"^\s*(?:(?:hey )?echo,? )?(?:please )?remember (?:that )?(?P<x>[^?]+)$", re.I)
+PREFERENCE_PATTERN = re.compile(
+    r"\bi (?:really |do(?:n't| not) |also )?(?P<verb>like|love|enjoy|prefer|hate|dislike|can't stand) (?P<x>[^.!?]+)", re.I
+)
+
+
+def _tokens(text):
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    return {w.rstrip("s") if len(w) > 4 else w for w in words if len(w) > 2 and w not in STOPWORDS}
+
+
+def _strength(item, now):
+    """Importance, reinforced by repeats, halved every half-life since last seen"""
+    half_life = KINDS.get(item["kind"], KINDS["topic"])[1] * 86400
+    decay = 0.5 ** ((now - item["last_used"]) / half_life)
+    return item["importance"] * (1 + 0.3 * math.log1p(item["hits"] - 1)) * decay
+
+
+def _new_memory():
+    return {"items": []}
+
+
+def migrate(memory):
+    """Bring an old-format memory dict (plain lists / last_topics) to the item list"""
+    memory = memory or {}
+    if "items" in memory:
+        return memory
+    migrated = _new_memory()
+    # Old "preferences" were any utterance containing "like"; re-read them
+    prefs = memory.get("preferences")
+    for text in (prefs if isinstance(prefs, list) else []):
+        update_memory(migrated, text)
+    for text in memory.get("interests", []):
+        remember(migrated, text, "preference")
+    for text in memory.get("last_topics", []):
+        remember(migrated, text, "topic")
+    return migrated
+
+
+def merge(theirs, ours):
+    """Combine two copies of one memory (e.g. saved by different processes).
+
+    Items are matched by id, since remember() rewrites a reinforced item's
+    text; the more recently seen copy wins. Items from before ids existed
+    are matched by kind and text.
+    """
+    merged = {}
+    by_text = {}
+    everything = migrate(theirs)["items"] + migrate(ours)["items"]
+    # Items with an id first, so legacy copies can find them by text
+    for item in sorted(everything, key=lambda item: "id" not in item):
+        text_key = (item["kind"], item["text"].lower())
+        key = ("id", item["id"]) if "id" in item else by_text.get(text_key, text_key)
+        if key not in merged or item["last_used"] >= merged[key]["last_used"]:
+            if key in merged and "id" not in item and "id" in merged[key]:
+                item = dict(item, id=merged[key]["id"])
+            merged[key] = item
+        by_text.setdefault(text_key, key)
+    items = list(merged.values())
+    if len(items) > MAX_ITEMS:
+        now = time.time()
+        items = sorted(items, key=lambda item: _strength(item, now), reverse=True)[:MAX_ITEMS]
+    return {"items": items}
+
+
+def remember(memory, text, kind="fact", importance=None, now=None):
+    """Add a memory or reinforce its duplicate.
+
+    Returns True if an item was added or its text or importance changed.
+    Reinforcing alone (hits, last_used) does not count: those bumps are
+    saved along with the next real change.
+    """
+    text = " ".join(text.split())[:MAX_TEXT].strip(" ,.")
+    tokens = _tokens(text)
+    if not tokens:
+        return False
+    now = now or time.time()
+    items = memory.setdefault("items", [])
+
+    for item in items:
+        if item["kind"] != kind:
+            continue
+        other = _tokens(item["text"])
+        if len(tokens & other) / len(tokens | other) >= DUPLICATE_OVERLAP:
+            item["hits"] += 1
+            item["last_used"] = now
+            changed = item["text"] != text
+            item["text"] = text  # latest wording wins
+            if importance is not None and importance > item["importance"]:
+                item["importance"] = importance
+                changed = True
+            return changed
+
+    items.append({
+        "id": secrets.token_hex(6),
+        "text": text,
+        "kind": kind,
+        "importance": importance if importance is not None else KINDS.get(kind, KINDS["topic"])[0],
+        "created": now,
+        "last_used": now,
+        "hits": 1,
+    })
+    if len(items) > MAX_ITEMS:
+        weakest = min(items, key=lambda item: _strength(item, now))
+        items.remove(weakest)
+    return True
+
+
+def update_memory(memory, user_input):
+    """Pick facts, preferences and topics out of what the user said.
+
+    Returns True if anything new was remembered, so callers can skip saving
+    when the message only reinforced what was already known.
+    """
+    text = user_input
+    changed = False
+
+    for pattern in FACT_PATTERNS:
+        m = pattern.search(text)
+        if m:
+            changed |= remember(memory, m.group(0), "fact")
+
+    m = REMEMBER_PATTERN.search(text)
+    if m:
+        changed |= remember(memory, m.group("x"), "fact", importance=1.2)
+
+    m = PREFERENCE_PATTERN.search(text)
+    if m:
+        changed |= remember(memory, m.group(0), "preference")
+
+    # Longer content words hint at what the user is into lately
+    words = {w for w in re.findall(r"[a-z0-9']+", text.lower()) if len(w) > 4 and w not in STOPWORDS}
+    for word in sorted(words, key=len, reverse=True)[:3]:
+        changed |= remember(memory, word, "topic")
+
+    return changed
+
+
+def recall(memory, query, k=RECALL_K, now=None):
+    """The k memories most relevant to the query, strongest first.
+
+    Relevance is shared words; facts fill any remaining places.
+    """
+    now = now or time.time()
+    items = memory.get("items", [])
+    query_tokens = _tokens(query)
+
+    scored = []
+    for item in items:
+        overlap = len(query_tokens & _tokens(item["text"]))
+        if overlap:
+            scored.append((overlap + _strength(item, now), item))
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    chosen = [item for _, item in scored[:k]]
+
+    if len(chosen) < k:
+        facts = sorted((item for item in items if item["kind"] == "fact" and item not in chosen),
+                       key=lambda item: _strength(item, now), reverse=True)
+        chosen += facts[:k - len(chosen)]
+    return chosen
+
+
+def format_memories(items):
+    """One line per memory for the prompt"""
+    if not items:
+        return "nothing yet"
+    return "; ".join(item["text"] for item in items)
+
+
+# ---- persistence: snapshot + append-only journal ----
+
+# id -> item JSON as last written, to work out what a save has to append
+_persisted = {}
+
+
+def _item_json(item):
+    return json.dumps(item, sort_keys=True)
+
+
+def _ensure_ids(memory):
+    """Give items from before the journal an id; True if any were missing"""
+    missing = False
+    for item in memory.get("items", []):
+        if "id" not in item:
+            item["id"] = secrets.token_hex(6)
+            missing = True
+    return missing
+
+
+def _replay(memory, path):
+    """Apply journal entries. A torn last line from a crash is cut off so
+    later appends start on a clean line."""
+    if not os.path.exists(path):
+        return
+    items = {item["id"]: item for item in memory["items"]}
+    good = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            if entry["op"] == "put":
+                items[entry["item"]["id"]] = entry["item"]
+            elif entry["op"] == "del":
+                items.pop(entry["id"], None)
+            good += len(line)
+    if good < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good)
+    memory["items"] = list(items.values())
+
 
 def load_memory():
-    if not os.path.exists(MEMORY_FILE):
-        return {}
-    with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Snapshot, then every change journaled after it"""
+    global _persisted
+    memory = _new_memory()
+    upgraded = False
+    if os.path.exists(MEMORY_FILE):
+        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        memory = migrate(raw)
+        upgraded = "items" not in raw
+    upgraded |= _ensure_ids(memory)
+    _replay(memory, JOURNAL_FILE)
+    if upgraded:
+        # Pin the new ids in a snapshot before journaling against them
+        compact_memory(memory)
+    _persisted = {item["id"]: _item_json(item) for item in memory["items"]}
+    return memory
 
-def save_memory(memory):
-    with open(MEMORY_FILE, "w", encoding="utf-8") as f:
+
+def _write_snapshot(memory):
+    tmp_path = f"{MEMORY_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(memory, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, MEMORY_FILE)
 
-def update_memory(memory, user_input):
-    if "like" in user_input.lower():
-        memory.setdefault("preferences", []).append(user_input)
+
+def compact_memory(memory):
+    """Write a fresh snapshot and start an empty journal"""
+    _write_snapshot(memory)
+    # A crash before this truncate only replays changes the snapshot already has
+    with open(JOURNAL_FILE, "w", encoding="utf-8") as f:
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def save_memory(memory):
+    """Append what changed since the last save; nothing changed, nothing written"""
+    global _persisted
+    _ensure_ids(memory)
+    current = {item["id"]: _item_json(item) for item in memory["items"]}
+
+    lines = [
+        json.dumps({"op": "put", "item": item})
+        for item in memory["items"]
+        if _persisted.get(item["id"]) != current[item["id"]]
+    ]
+    lines += [json.dumps({"op": "del", "id": item_id}) for item_id in _persisted if item_id not in current]
+    if not lines:
+        return False
+
+    with open(JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    _persisted = current
+
+    if os.path.getsize(JOURNAL_FILE) > COMPACT_BYTES:
+        compact_memory(memory)
+    return True
@@ -1,19 +1,11 @@
 # brain/planner.py
-def plan_action(user_input: str):
-    text = user_input.lower()
+from brain.intents import route_intent
 
-    if "chrome" in text:
-        return {"agent": "windows", "app": "chrome"}
 
-    if "notepad" in text:
-        return {"agent": "windows", "app": "notepad"}
-
-    if "youtube" in text:
-        query = text.replace("play", "").replace("on youtube", "").strip()
-        return {
-            "agent": "browser",
-            "action": "youtube",
-            "query": query
-        }
-
-    return {"agent": "llm"}
+def plan_action(user_input: str, name="Boss"):
+    """
+    Decide who handles the input: an agent ("windows"/"browser"),
+    a canned answer ("answer") or the LLM ("llm").
+    The intent table lives in brain/intents.py.
+    """
+    return route_intent(user_input, name)
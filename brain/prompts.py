@@ -52,3 +52,19 @@ Pacing:
 Your goal is not to help.
 Your goal is to keep the user company while being useful when needed.
 """
+
+SUMMARY_PROMPT = """
+You keep a running summary of a conversation between a user and their assistant.
+
+Current summary:
+{summary}
+
+New exchanges:
+{turns}
+
+Rewrite the summary so it also covers the new exchanges.
+Keep names, facts, decisions, open questions and what the user cares about.
+Drop small talk. Write plain sentences, at most {max_words} words.
+
+Summary:
+"""
@@ -1,11 +1,231 @@
-# brain/router.py
-from brain.local_llm import generate as local_generate
-# from brain.cloud_llm import generate as cloud_generate  # optional
+# brain/router.py - Small model first, larger model only when needed
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from brain.local_llm import LocalLLM, _get_loop
+
+SMALL_MODEL = os.environ.get("ECHOMIND_SMALL_MODEL", "phi3")
+LARGE_MODEL = os.environ.get("ECHOMIND_LARGE_MODEL", "llama3.1:8b")
+# Warm and keep the large model resident too, so an escalation does not pay its load time
+KEEP_LARGE = os.environ.get("ECHOMIND_KEEP_LARGE", "1") != "0"
+
+# Queries scoring at least this go straight to the large model
+ESCALATE_SCORE = 2
+
+REASONING_WORDS = re.compile(
+    r"\b(?:explain|why|how\s+does|compare|difference\s+between|analy[sz]e|prove|derive|"
+    r"calculate|solve|step\s+by\s+step|pros\s+and\s+cons|algorithm|debug|refactor|"
+    r"write\s+(?:a\s+)?(?:code|function|script|program|essay|story))\b"
+)
+CODE_OR_MATH = re.compile(r"```|\bdef\s|\bclass\s|[{};]|\d+\s*[-+*/^=]\s*\d+")
+HEDGES = re.compile(
+    r"\b(?:i'?m\s+not\s+(?:sure|certain)|i\s+am\s+not\s+(?:sure|certain)|i\s+don'?t\s+know|"
+    r"i\s+do\s+not\s+know|i\s+can'?t\s+(?:answer|help\s+with)|i\s+cannot\s+(?:answer|help\s+with)|"
+    r"no\s+idea|hard\s+to\s+say)\b"
+)
+
+# Latency samples kept per tier
+SAMPLES = 1000
+
+
+def complexity(query: str) -> int:
+    """Cheap guess at how hard the query is - higher means harder"""
+    text = query.lower()
+    words = len(text.split())
+    score = 0
+    if words > 40:
+        score += 1
+    if words > 120:
+        score += 1
+    score += min(2, len(REASONING_WORDS.findall(text)))
+    if CODE_OR_MATH.search(text):
+        score += 1
+    if text.count("?") >= 2:
+        score += 1
+    return score
+
+
+def unsure(response: str) -> bool:
+    """Does the answer look like the model could not handle the query?"""
+    text = response.strip().lower()
+    if not text:
+        return True
+    if HEDGES.search(text):
+        return True
+    # Small models sometimes get stuck repeating themselves
+    words = text.split()
+    if len(words) > 40 and len(set(words)) / len(words) < 0.3:
+        return True
+    return False
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class ModelRouter:
+    """
+    Same interface as LocalLLM (generate / agenerate / submit), but each
+    query goes to the small model first and only moves to the large one when
+    it looks complex up front or the small model's answer looks unsure.
+    """
+
+    def __init__(self, small_model=SMALL_MODEL, large_model=LARGE_MODEL):
+        self.tiers = [LocalLLM(model_name=small_model)]
+        if large_model and large_model != small_model:
+            self.tiers.append(LocalLLM(model_name=large_model))
+
+        self._lock = threading.Lock()
+        self._latency = [deque(maxlen=SAMPLES) for _ in self.tiers]
+        self._calls = [0 for _ in self.tiers]
+        self._failures = [0 for _ in self.tiers]
+        self.requests = 0
+        self.escalated_upfront = 0
+        self.escalated_unsure = 0
+
+    @property
+    def model_name(self):
+        return self.tiers[0].model_name
+
+    # ---- readiness ----
+
+    def start_keeper(self, keep_large=KEEP_LARGE):
+        """Warm up and keep resident the small model, and the large one unless keep_large is off"""
+        for llm in self.tiers if keep_large else self.tiers[:1]:
+            llm.start_keeper()
+
+    def readiness(self):
+        """Ready once the small model is resident; the large model's state is reported alongside"""
+        readiness = self.tiers[0].readiness()
+        if len(self.tiers) > 1:
+            readiness['large'] = self.tiers[-1].readiness()
+        return readiness
+
+    # ---- bookkeeping ----
+
+    def _first_tier(self, query):
+        with self._lock:
+            self.requests += 1
+            if len(self.tiers) > 1 and complexity(query) >= ESCALATE_SCORE:
+                self.escalated_upfront += 1
+                return len(self.tiers) - 1
+        return 0
+
+    def _record(self, tier, seconds, ok=True):
+        with self._lock:
+            self._calls[tier] += 1
+            if ok:
+                self._latency[tier].append(seconds)
+            else:
+                self._failures[tier] += 1
+
+    def _escalate(self, tier, last, response):
+        if tier >= last or not unsure(response):
+            return False
+        if tier == 0:
+            with self._lock:
+                self.escalated_unsure += 1
+        return True
+
+    def _failed(self, tier, error, response):
+        if response is None:
+            raise error
+        print(f"⚠️ {self.tiers[tier].model_name} failed ({error}), keeping the smaller model's answer")
+        return response
+
+    def stats(self):
+        """Per-tier latency and escalation rate"""
+        with self._lock:
+            escalated = self.escalated_upfront + self.escalated_unsure
+            return {
+                'requests': self.requests,
+                'escalation_rate': round(escalated / self.requests, 3) if self.requests else 0.0,
+                'escalated_upfront': self.escalated_upfront,
+                'escalated_unsure': self.escalated_unsure,
+                'tiers': [
+                    {
+                        'model': llm.model_name,
+                        'calls': self._calls[i],
+                        'failures': self._failures[i],
+                        'latency_p50': round(_percentile(self._latency[i], 50), 3),
+                        'latency_p95': round(_percentile(self._latency[i], 95), 3),
+                    }
+                    for i, llm in enumerate(self.tiers)
+                ],
+                'backends': self.tiers[0].pool.stats(),
+            }
+
+    # ---- generation ----
+
+    def generate(self, prompt: str, query: str = None, session=None) -> str:
+        """
+        Blocking cascade. `query` is the user's own words, used for the
+        complexity check; defaults to the whole prompt. `session` keeps a
+        user on the same Ollama backend.
+        """
+        tier = self._first_tier(query or prompt)
+        last = len(self.tiers) - 1
+        response = None
+        while True:
+            started = time.time()
+            try:
+                answer = self.tiers[tier].generate(prompt, session)
+            except Exception as e:
+                self._record(tier, time.time() - started, ok=False)
+                if response is not None or tier == 0:
+                    return self._failed(tier, e, response)
+                # A missing/broken large model falls back to the small one
+                print(f"⚠️ {self.tiers[tier].model_name} failed ({e}), using {self.tiers[0].model_name}")
+                last, tier = tier - 1, 0
+                continue
+            self._record(tier, time.time() - started)
+            response = answer
+            if not self._escalate(tier, last, response):
+                return response
+            tier += 1
+
+    async def agenerate(self, prompt: str, query: str = None, session=None) -> str:
+        """Async cascade, cancelled the same way as LocalLLM.agenerate"""
+        tier = self._first_tier(query or prompt)
+        last = len(self.tiers) - 1
+        response = None
+        while True:
+            started = time.time()
+            try:
+                answer = await self.tiers[tier].agenerate(prompt, session)
+            except Exception as e:
+                self._record(tier, time.time() - started, ok=False)
+                if response is not None or tier == 0:
+                    return self._failed(tier, e, response)
+                # A missing/broken large model falls back to the small one
+                print(f"⚠️ {self.tiers[tier].model_name} failed ({e}), using {self.tiers[0].model_name}")
+                last, tier = tier - 1, 0
+                continue
+            self._record(tier, time.time() - started)
+            response = answer
+            if not self._escalate(tier, last, response):
+                return response
+            tier += 1
+
+    def submit(self, prompt: str, query: str = None, session=None):
+        """Start agenerate on the background loop; returns a cancellable Future"""
+        return asyncio.run_coroutine_threadsafe(self.agenerate(prompt, query, session), _get_loop())
+
+
+_default_router = None
 
-USE_LOCAL = True
 
 def route(prompt, system_prompt=None):
-    if USE_LOCAL:
-        return local_generate(prompt, system_prompt)
-    else:
-        return cloud_generate(prompt, system_prompt)
+    """Blocking one-off generation through a shared router"""
+    global _default_router
+    if _default_router is None:
+        _default_router = ModelRouter()
+    full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+    return _default_router.generate(full_prompt, query=prompt)
@@ -0,0 +1,159 @@
+# echomind/metrics.py - Latency histograms in the Prometheus text format
+#
+# Off unless ECHOMIND_METRICS=1. When off, observe() returns straight away
+# and the web app does not register its request hooks or the /metrics route.
+#
+# Counts are kept per process: under gunicorn each worker reports its own.
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+ENABLED = os.environ.get("ECHOMIND_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SLOW_SECONDS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+RATE = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150)
+TOKENS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+RATIO = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4)
+
+_registry = []
+_NULL = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+
+    def __init__(self, name, help, buckets=SECONDS, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        if not ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *label_values):
+        """Context manager observing the seconds spent inside it"""
+        if not ENABLED:
+            return _NULL
+        return _Timer(self, label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for label_values, counts, total in sorted(series):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = ",".join(pairs + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {cumulative}")
+            suffix = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Monotonic total, one series per label combination"""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, *label_values):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, total in series:
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values)]
+            suffix = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}{suffix} {total}")
+        return "\n".join(lines)
+
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render():
+    """Every histogram and counter, ready to serve at /metrics"""
+    return "\n".join(h.render() for h in _registry) + "\n"
+
+
+# ---- web ----
+
+REQUEST_SECONDS = Histogram(
+    "echomind_http_request_seconds", "Time from request start until the response is fully sent",
+    SECONDS, ("route", "method", "status"))
+QUEUE_WAIT_SECONDS = Histogram(
+    "echomind_llm_queue_wait_seconds", "Time a chat request waited for an LLM slot", SECONDS)
+PROMPT_BUILD_SECONDS = Histogram(
+    "echomind_prompt_build_seconds", "Time to assemble the chat prompt (history, summary, memories)", SECONDS)
+EXTRACTION_SECONDS = Histogram(
+    "echomind_extraction_seconds", "Time to extract text from an uploaded file", SECONDS, ("type",))
+FLUSH_SECONDS = Histogram(
+    "echomind_write_behind_flush_seconds", "Time to write one batch of buffered state to the store",
+    SECONDS, ("kind",))
+FLUSH_SYNCS = Counter(
+    "echomind_write_behind_syncs_total", "Durable writes made by write-behind flushes (fsyncs, or SQLite commits)",
+    ("kind",))
+
+# ---- llm ----
+
+LLM_TTFT_SECONDS = Histogram(
+    "echomind_llm_time_to_first_token_seconds", "Time from sending a prompt to the first streamed token",
+    SLOW_SECONDS, ("model",))
+LLM_TOKENS_PER_SECOND = Histogram(
+    "echomind_llm_tokens_per_second", "Generation speed after the first token", RATE, ("model",))
+LLM_PROMPT_TOKENS = Histogram(
+    "echomind_llm_prompt_eval_tokens", "Prompt tokens Ollama had to evaluate", TOKENS, ("model",))
+
+# ---- voice ----
+
+STT_REAL_TIME_FACTOR = Histogram(
+    "echomind_stt_real_time_factor", "Transcription time divided by audio length", RATIO, ("model",))
+TTS_FIRST_AUDIO_SECONDS = Histogram(
+    "echomind_tts_time_to_first_audio_seconds", "Time from speak() until playback starts",
+    SLOW_SECONDS, ("engine",))
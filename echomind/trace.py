@@ -0,0 +1,259 @@
+# echomind/trace.py - Per-turn span timeline for the voice loop
+#
+#   python -m echomind.trace report [--file trace.jsonl] [--outcome llm] [--last 500]
+#
+# main.py opens a turn per loop iteration and wraps each stage (wait for
+# TTS, listen, transcribe, plan, memory, prompt, generate, speak) in a span.
+# Finished turns are appended as one JSON line each to a rotating file:
+#
+#   {"turn": "...", "started": <epoch>, "duration": 7.31, "outcome": "llm",
+#    "spans": [{"name": "listen", "start": 0.82, "duration": 5.0}, ...]}
+#
+# Span start is seconds since the turn began. ECHOMIND_TRACE=0 turns it off.
+import argparse
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+ENABLED = os.environ.get("ECHOMIND_TRACE", "1").lower() not in ("0", "false", "no", "off")
+TRACE_FILE = os.environ.get("ECHOMIND_TRACE_FILE", "trace.jsonl")
+# Rotated to trace.jsonl.1 .. .N once it grows past MAX_BYTES
+MAX_BYTES = 5 * 1024 * 1024
+BACKUPS = 3
+
+# Time inside a turn not covered by any span
+UNTRACED = "(untraced)"
+
+_NULL = nullcontext()
+
+
+class Turn:
+    """One pass through the loop and the spans recorded in it"""
+
+    def __init__(self):
+        self.id = secrets.token_hex(6)
+        self.started = time.time()
+        self.outcome = "unknown"
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            record = {"name": name, "start": round(start - self._t0, 4),
+                      "duration": round(time.perf_counter() - start, 4)}
+            if self._depth:
+                record["nested"] = True
+            self.spans.append(record)
+
+    def to_json(self):
+        return {
+            "turn": self.id,
+            "started": round(self.started, 3),
+            "duration": round(time.perf_counter() - self._t0, 4),
+            "outcome": self.outcome,
+            "spans": sorted(self.spans, key=lambda s: s["start"]),
+        }
+
+
+class Tracer:
+    """Hands out turns and writes finished ones to the trace file"""
+
+    def __init__(self, path=TRACE_FILE, max_bytes=MAX_BYTES, backups=BACKUPS, enabled=ENABLED):
+        self.enabled = enabled
+        self.current = None
+        self._log = None
+        if enabled:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log = logging.getLogger(f"echomind.trace.{path}")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            self._log.addHandler(handler)
+
+    def start_turn(self):
+        self.current = Turn() if self.enabled else None
+        return self.current
+
+    def end_turn(self):
+        turn, self.current = self.current, None
+        if turn is not None:
+            self._log.info(json.dumps(turn.to_json()))
+
+    def span(self, name):
+        """Span in the current turn; does nothing between turns or when disabled"""
+        if self.current is None:
+            return _NULL
+        return self.current.span(name)
+
+    def set_outcome(self, outcome):
+        if self.current is not None:
+            self.current.outcome = outcome
+
+
+_tracer = None
+
+
+def get_tracer():
+    """The process-wide tracer writing to ECHOMIND_TRACE_FILE"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def span(name):
+    """Span in the current turn of the process-wide tracer, for code below main.py"""
+    if _tracer is None:
+        return _NULL
+    return _tracer.span(name)
+
+
+# ---- analysis ----
+
+def read_turns(path=TRACE_FILE, backups=BACKUPS):
+    """Every turn in the trace file and its rotated copies, oldest first"""
+    paths = [f"{path}.{n}" for n in range(backups, 0, -1)] + [path]
+    turns = []
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    turns.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line
+    turns.sort(key=lambda t: t["started"])
+    return turns
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def critical_path(turn):
+    """The chain of top-level spans that decided when the turn ended.
+
+    Walks back from the end of the turn, each time taking the span that
+    finished last before the current point; gaps count as untraced.
+    Returns [(name, seconds)] in time order.
+    """
+    spans = [s for s in turn["spans"] if not s.get("nested")]
+    path = []
+    cursor = turn["duration"]
+    while True:
+        before = [s for s in spans if s["start"] < cursor]
+        if not before:
+            break
+        last = max(before, key=lambda s: s["start"] + s["duration"])
+        end = min(cursor, last["start"] + last["duration"])
+        if cursor - end > 0.001:
+            path.append((UNTRACED, cursor - end))
+        path.append((last["name"], end - last["start"]))
+        cursor = last["start"]
+        spans.remove(last)
+    if cursor > 0.001:
+        path.append((UNTRACED, cursor))
+    return path[::-1]
+
+
+def report(turns, out=print):
+    if not turns:
+        out("No turns traced yet.")
+        return
+
+    first = datetime.fromtimestamp(turns[0]["started"]).strftime("%Y-%m-%d %H:%M")
+    last = datetime.fromtimestamp(turns[-1]["started"]).strftime("%Y-%m-%d %H:%M")
+    out(f"📈 {len(turns)} turns, {first} -> {last}\n")
+
+    by_outcome = {}
+    for turn in turns:
+        by_outcome.setdefault(turn["outcome"], []).append(turn)
+
+    out(f"{'outcome':<14} {'turns':>6} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}")
+    for outcome, group in sorted(by_outcome.items(), key=lambda item: -len(item[1])):
+        durations = [t["duration"] for t in group]
+        out(f"{outcome:<14} {len(group):>6} {percentile(durations, 50):>8.2f} "
+            f"{percentile(durations, 95):>8.2f} {percentile(durations, 99):>8.2f}")
+
+    # Per stage: how long it takes when it runs, and how much of all turn
+    # time it accounts for on the critical path
+    stage_times = {}
+    on_path = {}
+    slowest = {}
+    order = {}
+    for turn in turns:
+        for s in turn["spans"]:
+            stage_times.setdefault(s["name"], []).append(s["duration"])
+            order.setdefault(s["name"], []).append(s["start"])
+        path = critical_path(turn)
+        for name, seconds in path:
+            on_path[name] = on_path.get(name, 0.0) + seconds
+        if path:
+            name = max(path, key=lambda step: step[1])[0]
+            slowest[name] = slowest.get(name, 0) + 1
+    total = sum(t["duration"] for t in turns) or 1.0
+
+    out(f"\n{'stage':<14} {'count':>6} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'path %':>7} {'slowest':>8}")
+    names = sorted(stage_times, key=lambda n: percentile(order[n], 50))
+    if UNTRACED in on_path:
+        names.append(UNTRACED)
+    for name in names:
+        times = stage_times.get(name, [])
+        out(f"{name:<14} {len(times):>6} {percentile(times, 50):>8.3f} {percentile(times, 95):>8.3f} "
+            f"{percentile(times, 99):>8.3f} {on_path.get(name, 0.0) / total:>7.0%} {slowest.get(name, 0):>8}")
+
+    # Typical critical path of the most common outcome that reached the LLM,
+    # else of the most common outcome
+    outcome = "llm" if "llm" in by_outcome else max(by_outcome, key=lambda o: len(by_outcome[o]))
+    group = by_outcome[outcome]
+    steps = {}
+    for turn in group:
+        for name, seconds in critical_path(turn):
+            steps.setdefault(name, []).append(seconds)
+    if steps:
+        ordered = [n for n in names if n in steps]
+        chain = " -> ".join(f"{n} {percentile(steps[n], 50):.3f}s" for n in ordered)
+        out(f"\nCritical path ({outcome} turns, p50 per step): {chain}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m echomind.trace", description="Analyze voice loop traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_parser = commands.add_parser("report", help="p50/p95/p99 per stage and the critical path")
+    report_parser.add_argument('--file', default=TRACE_FILE, help="trace file (rotated copies are read too)")
+    report_parser.add_argument('--outcome', help="only turns with this outcome, e.g. llm, answer, silence")
+    report_parser.add_argument('--last', type=int, help="only the most recent N turns")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    turns = read_turns(args.file)
+    if args.outcome:
+        turns = [t for t in turns if t["outcome"] == args.outcome]
+    if args.last:
+        turns = turns[-args.last:]
+    report(turns)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,49 +2,66 @@
 import time
 from datetime import datetime
 
-from brain.local_llm import LocalLLM
+from brain.router import ModelRouter
 from brain.prompts import JARVIS_SYSTEM_PROMPT
-from brain.memory import load_memory, update_memory, save_memory
+from brain.memory import load_memory, update_memory, save_memory, recall, format_memories
 from brain.mood import get_mood
 from brain.planner import plan_action
 
-from voice.stt import listen_and_transcribe
-from voice.tts import speak, is_speaking, get_last_speech_end_time, wait_until_finished
+from voice.capture import get_capture
+from voice.stt import listen_and_transcribe, router as stt_router, spotter as wake_spotter
+from voice.tts import speak, speak_filler, warm_phrases, is_speaking, get_last_speech_end_time, wait_until_finished
 
 from agents import browser_agent, windows_agent
 
+from echomind.trace import get_tracer
+
 def main():
     # ---- INIT ----
-    llm = LocalLLM(model_name="phi3")
+    llm = ModelRouter()
+    llm.start_keeper()  # loads the model while the rest starts up
+    get_capture()  # the microphone stays open for the whole session
+    # Fixed replies are synthesized once, in the background, and then played from disk
+    warm_phrases([f"Opening {app}." for app in windows_agent.APP_PATHS if app != "chrome_x86"])
     system_prompt = JARVIS_SYSTEM_PROMPT.strip()
     memory = load_memory()
+    tracer = get_tracer()  # one JSONL line per turn, see python -m echomind.trace report
     
     print("🟢 Echo is alive. Say 'exit' to quit.\n")
-    print("Voice: Edge TTS (en-US-AriaNeural)\n")
+    print("Voice: Edge TTS (en-US-AriaNeural)")
+    print(f"Models: {' -> '.join(tier.model_name for tier in llm.tiers)}")
+    if wake_spotter:
+        print(f"Wake word: on ({len(wake_spotter.templates)} recordings)\n")
+    else:
+        print("Wake word: off (python -m voice.wake enroll)\n")
     
     while True:
+        tracer.start_turn()
         try:
             # ---- WAIT FOR TTS TO FINISH ----
-            wait_until_finished()
-            
-            # Wait additional time after speech
-            last_end = get_last_speech_end_time()
-            current_time = time.time()
-            
-            if last_end > 0:
-                time_since_speech = current_time - last_end
-                if time_since_speech < 0.8:  # Wait at least 0.8 seconds after speech
-                    wait_time = 0.8 - time_since_speech
-                    time.sleep(wait_time)
+            with tracer.span("wait_tts"):
+                wait_until_finished()
+                
+                # Wait additional time after speech
+                last_end = get_last_speech_end_time()
+                current_time = time.time()
+                
+                if last_end > 0:
+                    time_since_speech = current_time - last_end
+                    if time_since_speech < 0.8:  # Wait at least 0.8 seconds after speech
+                        wait_time = 0.8 - time_since_speech
+                        time.sleep(wait_time)
             
             # ---- LISTEN ----
             print("\n" + "="*50)
-            print("🎤 READY - SPEAK NOW")
+            print("🎤 READY - SAY THE WAKE WORD" if wake_spotter else "🎤 READY - SPEAK NOW")
             print("="*50)
             
+            # Spans for listen and transcribe are recorded inside
             user_input = listen_and_transcribe()
             
             if not user_input:
+                tracer.set_outcome("silence")
                 time.sleep(0.3)
                 continue
             
@@ -53,86 +70,133 @@ def main():
             
             # ---- EXIT ----
             if user_input.lower() in {"exit", "quit", "stop", "goodbye"}:
-                speak("Goodbye Boss. See you next time.")
+                tracer.set_outcome("exit")
+                speak("Goodbye Boss. See you next time.", cache=True)
                 wait_until_finished()
                 break
             
             # ---- PLAN ACTION ----
-            plan = plan_action(user_input)
+            with tracer.span("plan"):
+                plan = plan_action(user_input)
+            
+            if plan.get("agent") == "answer":
+                tracer.set_outcome("answer")
+                print(f"\n🤖 Echo: {plan['response']}")
+                with tracer.span("speak"):
+                    speak(plan["response"])
+                time.sleep(0.1)
+                continue
             
             if plan.get("agent") == "browser":
+                tracer.set_outcome("action")
                 if plan.get("action") == "youtube":
-                    browser_agent.play_youtube(plan.get("query", ""))
-                    speak("Playing on YouTube.")
-                    wait_until_finished()
+                    with tracer.span("action"):
+                        browser_agent.play_youtube(plan.get("query", ""))
+                    with tracer.span("speak"):
+                        speak("Playing on YouTube.", cache=True)
+                        wait_until_finished()
                     time.sleep(1)
                     continue
                 
                 if plan.get("action") == "open_url":
-                    browser_agent.open_url(plan.get("url", ""))
-                    speak("Opening browser.")
-                    wait_until_finished()
+                    with tracer.span("action"):
+                        browser_agent.open_url(plan.get("url", ""))
+                    with tracer.span("speak"):
+                        speak("Opening browser.", cache=True)
+                        wait_until_finished()
                     time.sleep(1)
                     continue
             
             if plan.get("agent") == "windows":
+                tracer.set_outcome("action")
                 try:
-                    windows_agent.open_app(plan.get("app", ""))
-                    speak(f"Opening {plan.get('app')}.")
+                    with tracer.span("action"):
+                        windows_agent.open_app(plan.get("app", ""))
+                    speak(f"Opening {plan.get('app')}.", cache=True)
                 except Exception as e:
                     print(f"Error opening app: {e}")
-                    speak("I couldn't open that application.")
-                wait_until_finished()
+                    speak("I couldn't open that application.", cache=True)
+                with tracer.span("speak"):
+                    wait_until_finished()
                 time.sleep(1)
                 continue
             
             # ---- MEMORY ----
-            update_memory(memory, user_input)
-            save_memory(memory)
+            tracer.set_outcome("llm")
+            with tracer.span("memory"):
+                if update_memory(memory, user_input):
+                    save_memory(memory)
             
             # ---- MOOD + TIME ----
-            mood = get_mood()
-            hour = datetime.now().hour
-            
-            time_of_day = (
-                "late night" if hour < 6 else
-                "morning" if hour < 12 else
-                "afternoon" if hour < 18 else
-                "evening"
-            )
-            
-            # ---- PROMPT ----
-            prompt = f"""
+            with tracer.span("prompt"):
+                mood = get_mood()
+                hour = datetime.now().hour
+                
+                time_of_day = (
+                    "late night" if hour < 6 else
+                    "morning" if hour < 12 else
+                    "afternoon" if hour < 18 else
+                    "evening"
+                )
+                
+                # ---- PROMPT ----
+                prompt = f"""
 {system_prompt}
 
 Mood: {mood}
 Time: {time_of_day}
-Memory: {memory}
+Memory: {format_memories(recall(memory, user_input))}
 
 User: {user_input}
 Echo:
 """.strip()
             
             # ---- GENERATE ----
+            # A cached "One moment." covers the prefill (ECHOMIND_TTS_FILLER=1)
+            filler = speak_filler()
             print("\n🤖 Echo: ", end="", flush=True)
-            response = llm.generate(prompt)
+            with tracer.span("generate"):
+                response = llm.generate(prompt, query=user_input)
             print(response)
+            if filler:
+                wait_until_finished()
             
             # ---- SPEAK ----
-            speak(response)
+            # Playback runs on after speak() returns; the next turn's
+            # wait_tts span covers the rest of it
+            with tracer.span("speak"):
+                speak(response)
             
             # Wait for speech to start
             time.sleep(0.1)
             
         except KeyboardInterrupt:
+            tracer.set_outcome("interrupted")
             print("\n🛑 Interrupted by user.")
-            speak("Goodbye!")
+            speak("Goodbye!", cache=True)
             wait_until_finished()
             break
             
         except Exception as e:
+            tracer.set_outcome("error")
             print(f"\n❌ Error: {e}")
             time.sleep(1)
+        
+        finally:
+            tracer.end_turn()
+    
+    # ---- ROUTER STATS ----
+    stats = llm.stats()
+    print(f"\n📊 {stats['requests']} LLM requests, {stats['escalation_rate']:.0%} escalated to the larger model")
+    for tier in stats['tiers']:
+        print(f"   {tier['model']}: {tier['calls']} calls, p50 {tier['latency_p50']}s, p95 {tier['latency_p95']}s")
+    
+    stats = stt_router.stats()
+    print(f"🎤 {stats['requests']} transcriptions, {stats['escalation_rate']:.0%} needed the larger Whisper model")
+    for tier in stats['tiers']:
+        print(f"   {tier['model']}: {tier['calls']} calls, p50 {tier['latency_p50']}s, p95 {tier['latency_p95']}s")
+    if wake_spotter:
+        print(f"👂 Wake word: {wake_spotter.detections} detections in {wake_spotter.checks} checks")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
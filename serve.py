@@ -0,0 +1,89 @@
+# serve.py - Production entry point for the EchoMind web UI
+import argparse
+import os
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the EchoMind web UI with several worker processes")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per core)")
+    parser.add_argument('--threads', type=int, default=4, help="threads per worker")
+    parser.add_argument('--store', default=os.environ.get('ECHOMIND_STORE', 'sqlite:///user_data/state.db'),
+                        help="state store URL: sqlite:///<path> or json://<dir>")
+    parser.add_argument('--import-json', metavar='DIR',
+                        help="copy users, conversations, files and memory from an old user_data/ directory first")
+    return parser.parse_args()
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class EchoMindApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{args.host}:{args.port}")
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('worker_class', 'gthread')
+            # LLM calls can take minutes on CPU
+            self.cfg.set('timeout', 300)
+            # Each worker imports web_app itself so it gets its own AI loader thread
+            self.cfg.set('preload_app', False)
+
+        def load(self):
+            from web_app import app
+            return app
+
+    EchoMindApplication().run()
+
+
+def run_waitress(args):
+    from waitress import serve
+    from web_app import app
+
+    serve(app, host=args.host, port=args.port, threads=args.workers * args.threads)
+
+
+def main():
+    args = parse_args()
+    os.environ['ECHOMIND_STORE'] = args.store
+
+    from web_ui.store import open_store, load_secret_key, JSONFileStore
+    store = open_store(args.store)
+
+    if args.import_json and not store.keys('users'):
+        count = store.import_from(JSONFileStore(args.import_json, migrate=False),
+                                  ['users', 'conversations', 'files', 'memory', 'file_contents'])
+        print(f"✓ Imported {count} records from {args.import_json}")
+
+    if args.workers > 1 and not store.shared:
+        print(f"⚠️ {args.store} cannot be shared between processes, using 1 worker")
+        args.workers = 1
+
+    # Create the signing key once so every worker reads the same one
+    os.makedirs('user_data', exist_ok=True)
+    if not os.environ.get('SECRET_KEY'):
+        load_secret_key('user_data/secret_key')
+
+    print("=" * 50)
+    print("🌐 EchoMind Web UI (production)")
+    print("=" * 50)
+    print(f"📡 Server: http://{args.host}:{args.port}")
+    print(f"⚙️  Workers: {args.workers} x {args.threads} threads")
+    print(f"💾 State store: {args.store}")
+    print("=" * 50)
+
+    try:
+        import gunicorn.app.base  # noqa: F401
+    except ImportError:
+        # gunicorn needs fork(); on Windows fall back to one multi-threaded process
+        if args.workers > 1:
+            print("⚠️ gunicorn not available, serving with waitress in a single process")
+        run_waitress(args)
+    else:
+        run_gunicorn(args)
+
+
+if __name__ == '__main__':
+    main()
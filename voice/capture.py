@@ -0,0 +1,150 @@
+# voice/capture.py - One always-open microphone stream shared by every consumer
+#
+# The input stream writes into a preallocated float32 ring buffer from the
+# audio callback. Every sample is stored twice (at i and i + capacity), so
+# any window up to `capacity` samples long is one contiguous slice: record(),
+# latest() and window() hand out NumPy views into the ring, never copies.
+#
+# A view stays valid until the ring wraps over it, RING_SECONDS later.
+# Consumers that keep audio longer than that must copy it (overwritten()
+# tells whether that happened).
+import os
+import threading
+import time
+
+import numpy as np
+import sounddevice as sd
+
+SAMPLE_RATE = 16000
+RING_SECONDS = float(os.environ.get("ECHOMIND_CAPTURE_SECONDS", "30"))
+BLOCK = 480  # 30 ms per callback
+
+
+class AudioCapture:
+    """Single input stream + ring buffer; readers get zero-copy views"""
+
+    def __init__(self, samplerate=SAMPLE_RATE, seconds=RING_SECONDS, blocksize=BLOCK, device=None):
+        self.samplerate = samplerate
+        self.capacity = int(seconds * samplerate)
+        self.blocksize = blocksize
+        self.device = device
+        # Mirrored: sample k lives at k % capacity and k % capacity + capacity
+        self._ring = np.zeros(2 * self.capacity, dtype=np.float32)
+        self.written = 0  # samples ever written
+        self.level = 0.0  # peak of the last block, for meters
+        self.overflows = 0
+        self._cond = threading.Condition()
+        self._stream = None
+
+    # ---- lifecycle ----
+
+    def start(self):
+        if self._stream is None:
+            self._stream = sd.InputStream(
+                samplerate=self.samplerate,
+                blocksize=self.blocksize,
+                channels=1,
+                dtype='float32',
+                device=self.device,
+                callback=self._callback,
+            )
+            self._stream.start()
+        return self
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    # ---- producer ----
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        self.write(indata[:, 0])
+
+    def write(self, block):
+        """Append samples (called from the audio thread; also handy for feeding files)"""
+        total = len(block)
+        ring, cap = self._ring, self.capacity
+        start = self.written
+        if total > cap:
+            # Only the newest `cap` samples fit
+            start, block = start + total - cap, block[-cap:]
+        n = len(block)
+        p = start % cap
+        first = min(n, cap - p)
+        rest = n - first
+        ring[p:p + first] = block[:first]
+        ring[p + cap:p + cap + first] = block[:first]
+        if rest:
+            ring[:rest] = block[first:]
+            ring[cap:cap + rest] = block[first:]
+        if n:
+            # Two reductions instead of np.abs(), which would allocate
+            self.level = max(float(block.max()), -float(block.min()))
+        with self._cond:
+            self.written += total
+            self._cond.notify_all()
+
+    # ---- consumers ----
+
+    def window(self, start, end):
+        """Samples [start, end) as a view. They must still be in the ring."""
+        if end - start > self.capacity:
+            raise ValueError("window longer than the ring buffer")
+        if start < self.written - self.capacity:
+            raise ValueError("window already overwritten")
+        p = start % self.capacity
+        return self._ring[p:p + (end - start)]
+
+    def wait_until(self, position, timeout=None):
+        """Block until `position` samples have been captured; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.written < position:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def record(self, seconds, timeout=None, start=None):
+        """The next `seconds` of audio (or from `start`), as a view; None if the stream stalls"""
+        if start is None:
+            start = self.written
+        end = start + int(seconds * self.samplerate)
+        if not self.wait_until(end, timeout if timeout is not None else seconds + 2):
+            return None
+        return self.window(start, end)
+
+    def latest(self, seconds):
+        """The most recent `seconds` of audio, as a view"""
+        end = self.written
+        start = max(0, end - int(seconds * self.samplerate))
+        return self.window(start, end)
+
+    def overwritten(self, start):
+        """Has sample `start` been written over since it was captured?"""
+        return start < self.written - self.capacity
+
+
+def peak(audio):
+    """Peak amplitude without the temporary np.abs() makes"""
+    if not len(audio):
+        return 0.0
+    return max(float(audio.max()), -float(audio.min()))
+
+
+_capture = None
+_capture_lock = threading.Lock()
+
+
+def get_capture():
+    """The process-wide capture, started on first use"""
+    global _capture
+    with _capture_lock:
+        if _capture is None:
+            _capture = AudioCapture().start()
+        return _capture
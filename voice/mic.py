@@ -1,14 +1,9 @@
-import sounddevice as sd
-import numpy as np
-
-SAMPLE_RATE = 16000
+from voice.capture import get_capture, SAMPLE_RATE
 
 def record_audio(duration=5):
-    audio = sd.rec(
-        int(duration * SAMPLE_RATE),
-        samplerate=SAMPLE_RATE,
-        channels=1,
-        dtype=np.float32
-    )
-    sd.wait()
-    return np.squeeze(audio)
+    """The next `duration` seconds from the shared capture stream.
+    
+    Returns a view into its ring buffer; copy it to keep it longer than
+    the ring (ECHOMIND_CAPTURE_SECONDS).
+    """
+    return get_capture().record(duration)
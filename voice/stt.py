@@ -1,56 +1,63 @@
 # stt.py
 import time
-import sounddevice as sd
-import numpy as np
-from faster_whisper import WhisperModel
 from voice.tts import is_speaking
+from voice.capture import get_capture, peak
+from voice.stt_router import STTRouter
+from voice.wake import load_spotter
+from echomind import trace
 
 SAMPLE_RATE = 16000
 RECORD_SECONDS = 5
 
-model = WhisperModel("small", device="cpu", compute_type="int8")
+# Tiny model for short commands, small one when tiny is unsure or the
+# utterance is long (ECHOMIND_STT_FAST_MODEL / ECHOMIND_STT_MODEL)
+router = STTRouter()
+
+# Whisper only runs once the wake word is heard (python -m voice.wake enroll);
+# None when nothing is enrolled, and every utterance is transcribed
+spotter = load_spotter()
+WAKE_TIMEOUT = 5
 
 def listen_and_transcribe():
     """Simple listen and transcribe"""
     
     # Wait for TTS to finish
-    if is_speaking():
-        print("⏳ Waiting for TTS to finish...")
-        while is_speaking():
-            time.sleep(0.1)
-    
-    # Extra delay to ensure audio device is free
-    time.sleep(0.3)
+    with trace.span("settle"):
+        if is_speaking():
+            print("⏳ Waiting for TTS to finish...")
+            while is_speaking():
+                time.sleep(0.1)
     
-    print("🎤 Listening...")
-    
-    # Record
+    # Record from the shared, always-open stream: no device reopen, and
+    # the audio is a view into its ring buffer rather than a new array
     try:
-        audio = sd.rec(
-            int(RECORD_SECONDS * SAMPLE_RATE),
-            samplerate=SAMPLE_RATE,
-            channels=1,
-            dtype='float32'
-        )
-        sd.wait()
+        capture = get_capture()
+        start = None
+        if spotter is not None:
+            with trace.span("wake"):
+                start = spotter.listen(capture, WAKE_TIMEOUT)
+            if start is None:
+                return None
+        
+        print("🎤 Listening...")
+        with trace.span("listen"):
+            audio = capture.record(RECORD_SECONDS, start=start)
     except Exception as e:
         print(f"Recording error: {e}")
         return None
     
+    if audio is None:
+        print("Recording error: no audio from the microphone")
+        return None
+    
     # Quick volume check
-    if np.max(np.abs(audio)) < 0.01:
+    if peak(audio) < 0.01:
         return None
     
     # Transcribe
     try:
-        audio_flat = audio.flatten()
-        segments, info = model.transcribe(
-            audio_flat,
-            language="en",
-            vad_filter=True
-        )
-        
-        text = " ".join([segment.text.strip() for segment in segments]).strip()
+        with trace.span("transcribe"):
+            text = router.transcribe(audio)
         
         if len(text) < 2:
             return None
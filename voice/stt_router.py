@@ -0,0 +1,161 @@
+# voice/stt_router.py - Fast Whisper model first, accurate one only when needed
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from faster_whisper import WhisperModel
+
+from echomind import metrics, trace
+
+SAMPLE_RATE = 16000
+
+FAST_MODEL = os.environ.get("ECHOMIND_STT_FAST_MODEL", "tiny")  # empty: one model only
+ACCURATE_MODEL = os.environ.get("ECHOMIND_STT_MODEL", "small")
+COMPUTE_TYPE = os.environ.get("ECHOMIND_STT_COMPUTE", "int8")
+CPU_THREADS = int(os.environ.get("ECHOMIND_STT_THREADS", "0"))  # 0: faster-whisper's default
+
+TRANSCRIBE_OPTIONS = {"language": "en", "vad_filter": True}
+
+# Utterances with more speech than this go straight to the accurate model
+SHORT_SPEECH_SECONDS = 3.0
+# The fast model's answer is kept only if it is this confident
+MIN_AVG_LOGPROB = -0.7
+MAX_NO_SPEECH_PROB = 0.5
+MAX_COMPRESSION_RATIO = 2.4  # above this Whisper is usually looping
+
+# Speech-length estimate: 30 ms frames louder than this RMS
+FRAME = 480
+SPEECH_RMS = 0.01
+
+SAMPLES = 1000
+
+
+def speech_seconds(audio):
+    """Rough amount of speech in the clip, from frame energy"""
+    frames = len(audio) // FRAME
+    if not frames:
+        return 0.0
+    blocks = audio[:frames * FRAME].reshape(frames, FRAME)
+    rms = np.sqrt(np.einsum('ij,ij->i', blocks, blocks) / FRAME)
+    return float(np.count_nonzero(rms > SPEECH_RMS)) * FRAME / SAMPLE_RATE
+
+
+def confidence(segments):
+    """Duration-weighted avg_logprob, mean no_speech_prob and worst compression ratio"""
+    if not segments:
+        return None
+    weights = [max(s.end - s.start, 0.01) for s in segments]
+    total = sum(weights)
+    return {
+        'avg_logprob': sum(s.avg_logprob * w for s, w in zip(segments, weights)) / total,
+        'no_speech_prob': sum(s.no_speech_prob * w for s, w in zip(segments, weights)) / total,
+        'compression_ratio': max(s.compression_ratio for s in segments),
+    }
+
+
+def unsure(segments):
+    """Does the transcript look like the model could not make it out?"""
+    score = confidence(segments)
+    if score is None:
+        # The VAD found no speech; it would find none for the other model either
+        return False
+    return (score['avg_logprob'] < MIN_AVG_LOGPROB
+            or score['no_speech_prob'] > MAX_NO_SPEECH_PROB
+            or score['compression_ratio'] > MAX_COMPRESSION_RATIO)
+
+
+def _text(segments):
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class STTRouter:
+    """
+    Keeps a fast and an accurate Whisper model loaded. Short utterances (most
+    voice commands) are transcribed by the fast one; its result is kept
+    unless the segments look unsure, in which case the accurate model
+    transcribes the same audio. Long utterances go to the accurate model
+    directly.
+    """
+
+    def __init__(self, fast_model=FAST_MODEL, accurate_model=ACCURATE_MODEL,
+                 compute_type=COMPUTE_TYPE, cpu_threads=CPU_THREADS, num_workers=1):
+        """`num_workers` > 1 lets that many threads transcribe at once on the same models"""
+        self.names = [accurate_model]
+        if fast_model and fast_model != accurate_model:
+            self.names.insert(0, fast_model)
+        self.models = [WhisperModel(name, device="cpu", compute_type=compute_type,
+                                    cpu_threads=cpu_threads, num_workers=num_workers)
+                       for name in self.names]
+
+        self._lock = threading.Lock()
+        self._latency = [deque(maxlen=SAMPLES) for _ in self.models]
+        self._calls = [0 for _ in self.models]
+        self.requests = 0
+        self.escalated_upfront = 0
+        self.escalated_unsure = 0
+
+    def _first_tier(self, audio):
+        with self._lock:
+            self.requests += 1
+            if len(self.models) > 1 and speech_seconds(audio) > SHORT_SPEECH_SECONDS:
+                self.escalated_upfront += 1
+                return len(self.models) - 1
+        return 0
+
+    def _run(self, tier, audio):
+        started = time.perf_counter()
+        with trace.span(f"stt_{self.names[tier]}"):
+            segments, _ = self.models[tier].transcribe(audio, **TRANSCRIBE_OPTIONS)
+            # Segments are decoded lazily; list() does the work
+            segments = list(segments)
+        elapsed = time.perf_counter() - started
+        if len(audio):
+            metrics.STT_REAL_TIME_FACTOR.observe(elapsed / (len(audio) / SAMPLE_RATE), self.names[tier])
+        with self._lock:
+            self._calls[tier] += 1
+            self._latency[tier].append(elapsed)
+        return segments
+
+    def transcribe(self, audio):
+        """Text of a mono float32 16 kHz clip"""
+        if not len(audio):
+            return ""
+        tier = self._first_tier(audio)
+        segments = self._run(tier, audio)
+        if tier < len(self.models) - 1 and unsure(segments):
+            with self._lock:
+                self.escalated_unsure += 1
+            segments = self._run(len(self.models) - 1, audio)
+        return _text(segments)
+
+    def transcribe_with(self, tier, audio):
+        """Text from one particular model, bypassing the cascade"""
+        return _text(self._run(tier, audio))
+
+    def stats(self):
+        with self._lock:
+            escalated = self.escalated_upfront + self.escalated_unsure
+            return {
+                'requests': self.requests,
+                'escalation_rate': round(escalated / self.requests, 3) if self.requests else 0.0,
+                'escalated_upfront': self.escalated_upfront,
+                'escalated_unsure': self.escalated_unsure,
+                'tiers': [
+                    {
+                        'model': name,
+                        'calls': self._calls[i],
+                        'latency_p50': round(_percentile(self._latency[i], 50), 3),
+                        'latency_p95': round(_percentile(self._latency[i], 95), 3),
+                    }
+                    for i, name in enumerate(self.names)
+                ],
+            }
@@ -0,0 +1,186 @@
+# voice/synth.py - Text to audio bytes for each TTS engine, without playing anything
+#
+# Engines:
+#   edge  - Microsoft Edge online voices (edge_tts), MP3 chunks as they arrive
+#   piper - local piper binary with an .onnx voice, WAV (16-bit mono PCM)
+#
+# voice/tts.py plays the result; benchmarks and the web app use it directly.
+import asyncio
+import json
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+
+try:
+    import edge_tts
+    EDGE_SUPPORT = True
+except ImportError:
+    EDGE_SUPPORT = False
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ENGINE = os.environ.get("ECHOMIND_TTS_ENGINE", "edge")
+EDGE_VOICE = "en-US-AriaNeural"
+EDGE_VOICES = (
+    "en-US-AriaNeural",      # Female, expressive
+    "en-US-GuyNeural",       # Male, clear
+    "en-US-JennyNeural",     # Female, friendly
+    "en-GB-SoniaNeural",     # British female
+    "en-GB-RyanNeural",      # British male
+)
+# Path to a piper voice, e.g. voices/en_US-amy-medium.onnx (its .onnx.json next to it)
+PIPER_MODEL = os.environ.get("ECHOMIND_PIPER_MODEL", "")
+PIPER_BINARY = (os.environ.get("ECHOMIND_PIPER")
+                or shutil.which("piper")
+                or os.path.join(REPO_ROOT, "piper", "piper.exe"))
+
+MIMETYPES = {"edge": "audio/mpeg", "piper": "audio/wav"}
+CHUNK_BYTES = 4096
+
+
+def default_voice(engine):
+    return EDGE_VOICE if engine == "edge" else PIPER_MODEL
+
+
+def voices(engine):
+    """Voices a client may ask the engine for; piper only has the configured model"""
+    if engine == "edge":
+        return EDGE_VOICES
+    return (PIPER_MODEL,) if engine == "piper" and PIPER_MODEL else ()
+
+
+def available_engines():
+    engines = []
+    if EDGE_SUPPORT:
+        engines.append("edge")
+    if PIPER_MODEL and os.path.exists(PIPER_MODEL) and PIPER_BINARY and os.path.exists(PIPER_BINARY):
+        engines.append("piper")
+    return engines
+
+
+def _piper_sample_rate(model):
+    try:
+        with open(f"{model}.json", "r", encoding="utf-8") as f:
+            return json.load(f)["audio"]["sample_rate"]
+    except (OSError, ValueError, KeyError):
+        return 22050
+
+
+def wav_header(sample_rate, channels=1, bits=16):
+    """Header for a WAV of unknown length, so it can be streamed"""
+    byte_rate = sample_rate * channels * bits // 8
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, channels * bits // 8, bits)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+
+def _piper(text, model):
+    process = subprocess.Popen(
+        [PIPER_BINARY, "--model", model, "--output_raw"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        process.stdin.write(text.encode("utf-8") + b"\n")
+        process.stdin.close()
+        # The header goes out with the first PCM, so a piper that fails
+        # before producing audio raises instead of yielding a valid-looking start
+        header = wav_header(_piper_sample_rate(model))
+        while True:
+            chunk = process.stdout.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            if header:
+                chunk, header = header + chunk, None
+            yield chunk
+        if process.wait() != 0:
+            raise RuntimeError(f"piper exited with code {process.returncode}")
+        if header:
+            raise RuntimeError("piper produced no audio")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+
+async def _edge(text, voice):
+    communicate = edge_tts.Communicate(text, voice)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            yield chunk["data"]
+
+
+def _check(engine):
+    if engine not in MIMETYPES:
+        raise ValueError(f"Unknown TTS engine {engine!r}")
+    if engine not in available_engines():
+        raise RuntimeError(f"TTS engine {engine!r} is not available")
+
+
+async def astream(text, voice=None, engine=None):
+    """Audio bytes for the text, chunk by chunk as the engine produces them"""
+    engine = engine or DEFAULT_ENGINE
+    _check(engine)
+    voice = voice or default_voice(engine)
+    if engine == "edge":
+        async for chunk in _edge(text, voice):
+            yield chunk
+        return
+    loop = asyncio.get_running_loop()
+    chunks = _piper(text, voice)
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        chunks.close()
+
+
+def stream(text, voice=None, engine=None):
+    """Blocking version of astream, for threads without an event loop"""
+    engine = engine or DEFAULT_ENGINE
+    _check(engine)
+    voice = voice or default_voice(engine)
+    if engine == "piper":
+        yield from _piper(text, voice)
+        return
+
+    # Edge only has an async client: run it on its own loop and hand chunks over
+    chunks = queue.Queue(maxsize=64)
+    stopped = threading.Event()
+    done = object()
+
+    async def produce():
+        try:
+            async for chunk in _edge(text, voice):
+                if stopped.is_set():
+                    return
+                chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(done)
+
+    threading.Thread(target=asyncio.run, args=(produce(),), name="tts-edge", daemon=True).start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        stopped.set()
+        # Unblock the producer if it is waiting on a full queue
+        while not chunks.empty():
+            chunks.get_nowait()
+
+
+def synthesize(text, voice=None, engine=None):
+    """Whole clip as bytes"""
+    return b"".join(stream(text, voice, engine))
@@ -1,10 +1,15 @@
 # tts.py - USING EDGE TTS
 import asyncio
+import os
+import random
 import threading
 import time
 import pygame
 from io import BytesIO
 import edge_tts
+from echomind import metrics
+from voice import synth
+from voice.tts_cache import get_cache
 
 # Initialize pygame mixer
 pygame.mixer.init()
@@ -15,6 +20,19 @@ _lock = threading.Lock()
 _last_speech_end_time = 0
 _current_loop = None
 
+# Said often and always the same: synthesized once, then played from disk
+SYSTEM_PHRASES = [
+    "Playing on YouTube.",
+    "Opening browser.",
+    "Goodbye Boss. See you next time.",
+    "Goodbye!",
+    "I couldn't open that application.",
+]
+
+# Short acknowledgements played while the LLM is still working (ECHOMIND_TTS_FILLER=1)
+FILLER_ENABLED = os.environ.get("ECHOMIND_TTS_FILLER", "0") == "1"
+FILLERS = ["Hmm.", "Let me think.", "One moment.", "Okay."]
+
 def is_speaking():
     """Check if TTS is speaking"""
     with _lock:
@@ -25,9 +43,10 @@ def get_last_speech_end_time():
     with _lock:
         return _last_speech_end_time
 
-async def _async_speak(text, voice="en-US-AriaNeural"):
+async def _async_speak(text, voice="en-US-AriaNeural", requested=None, cache=False):
     """Async function to generate and play speech"""
     global _is_speaking, _last_speech_end_time
+    requested = requested or time.perf_counter()
     
     # Set speaking flag
     with _lock:
@@ -36,21 +55,20 @@ async def _async_speak(text, voice="en-US-AriaNeural"):
     try:
         print(f"🗣️  Speaking: '{text[:50]}...'" if len(text) > 50 else f"🗣️  Speaking: '{text}'")
         
-        # Create TTS instance
-        communicate = edge_tts.Communicate(text, voice)
-        
-        # Generate audio
-        audio_data = BytesIO()
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                audio_data.write(chunk["data"])
-        
-        # Reset buffer position
-        audio_data.seek(0)
+        # Fixed phrases come from the on-disk cache once said before
+        audio = get_cache().get(text, voice, "edge") if cache else None
+        if audio is None:
+            audio_data = BytesIO()
+            async for chunk in synth.astream(text, voice, "edge"):
+                audio_data.write(chunk)
+            audio = audio_data.getvalue()
+            if cache:
+                get_cache().put(text, audio, voice, "edge")
         
         # Load and play with pygame
-        pygame.mixer.music.load(audio_data)
+        pygame.mixer.music.load(BytesIO(audio))
         pygame.mixer.music.play()
+        metrics.TTS_FIRST_AUDIO_SECONDS.observe(time.perf_counter() - requested, "edge")
         
         # Wait for playback to finish
         while pygame.mixer.music.get_busy():
@@ -69,17 +87,17 @@ async def _async_speak(text, voice="en-US-AriaNeural"):
             _is_speaking = False
             _last_speech_end_time = time.time()
 
-def _run_async_speak(text):
+def _run_async_speak(text, requested=None, cache=False):
     """Run async speak in a new event loop"""
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     try:
-        loop.run_until_complete(_async_speak(text))
+        loop.run_until_complete(_async_speak(text, requested=requested, cache=cache))
     finally:
         loop.close()
 
-def speak(text: str, voice="en-US-AriaNeural"):
-    """Blocking TTS using Edge TTS"""
+def speak(text: str, voice="en-US-AriaNeural", cache=False):
+    """Blocking TTS using Edge TTS; cache=True for fixed phrases"""
     if not text or not isinstance(text, str):
         return
     
@@ -95,7 +113,7 @@ def speak(text: str, voice="en-US-AriaNeural"):
     # Run in a thread to avoid blocking
     thread = threading.Thread(
         target=_run_async_speak,
-        args=(text,),
+        args=(text, time.perf_counter(), cache),
         daemon=True
     )
     thread.start()
@@ -103,6 +121,33 @@ def speak(text: str, voice="en-US-AriaNeural"):
     # Wait a moment for speech to start
     time.sleep(0.2)
 
+def speak_filler():
+    """
+    Start a short acknowledgement, only if one is already cached (so it
+    plays at once). Returns whether anything is playing; call
+    wait_until_finished() before speaking the real answer.
+    """
+    global _is_speaking
+    if not FILLER_ENABLED or is_speaking():
+        return False
+    cached = [f for f in FILLERS if os.path.exists(get_cache().path(f, "en-US-AriaNeural", "edge"))]
+    if not cached:
+        return False
+    # Set now, so a wait_until_finished() right after cannot miss it
+    with _lock:
+        _is_speaking = True
+    threading.Thread(
+        target=_run_async_speak,
+        args=(random.choice(cached), time.perf_counter(), True),
+        daemon=True
+    ).start()
+    return True
+
+def warm_phrases(extra=()):
+    """Pre-synthesize the system phrases (and fillers) in the background"""
+    phrases = SYSTEM_PHRASES + list(extra) + (FILLERS if FILLER_ENABLED else [])
+    return get_cache().warm(phrases, "en-US-AriaNeural", "edge")
+
 def wait_until_finished(timeout=30):
     """Wait for TTS to finish speaking"""
     start = time.time()
@@ -123,10 +168,4 @@ def list_voices():
     asyncio.run(_list_voices())
 
 # Optional: Test different voices
-AVAILABLE_VOICES = [
-    "en-US-AriaNeural",      # Female, expressive
-    "en-US-GuyNeural",       # Male, clear
-    "en-US-JennyNeural",     # Female, friendly
-    "en-GB-SoniaNeural",     # British female
-    "en-GB-RyanNeural",      # British male
-]
\ No newline at end of file
+AVAILABLE_VOICES = list(synth.EDGE_VOICES)
\ No newline at end of file
@@ -0,0 +1,135 @@
+# voice/tts_cache.py - Synthesized audio on disk, keyed by (text, voice, engine)
+#
+# Fixed phrases ("Opening browser.", "Goodbye Boss...") sound the same every
+# time, so they are synthesized once and replayed from tts_cache/. The file
+# name is a hash of engine, voice and text; the extension follows the
+# engine's format. Oldest files are evicted past ECHOMIND_TTS_CACHE_MB.
+import hashlib
+import os
+import threading
+
+from voice import synth
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CACHE_DIR = os.environ.get("ECHOMIND_TTS_CACHE_DIR", os.path.join(REPO_ROOT, "tts_cache"))
+MAX_BYTES = int(float(os.environ.get("ECHOMIND_TTS_CACHE_MB", "100")) * 1024 * 1024)
+
+EXTENSIONS = {"edge": ".mp3", "piper": ".wav"}
+
+
+class TTSCache:
+    """Content-addressed audio files; safe to share between threads and processes"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text, voice=None, engine=None):
+        engine = engine or synth.DEFAULT_ENGINE
+        voice = voice or synth.default_voice(engine)
+        return hashlib.sha256(f"{engine}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def path(self, text, voice=None, engine=None):
+        engine = engine or synth.DEFAULT_ENGINE
+        return os.path.join(self.directory, self.key(text, voice, engine) + EXTENSIONS.get(engine, ".bin"))
+
+    def get(self, text, voice=None, engine=None):
+        """Cached audio bytes, or None"""
+        try:
+            with open(self.path(text, voice, engine), "rb") as f:
+                audio = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return audio
+
+    def put(self, text, audio, voice=None, engine=None):
+        if not audio:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(text, voice, engine)
+        # Write then rename, so a reader never sees half a file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+        self.prune()
+
+    def synthesize(self, text, voice=None, engine=None):
+        """Audio for the text, from disk when it has been synthesized before"""
+        audio = self.get(text, voice, engine)
+        if audio is None:
+            audio = synth.synthesize(text, voice, engine)
+            self.put(text, audio, voice, engine)
+        return audio
+
+    def stream(self, text, voice=None, engine=None):
+        """Like synthesize(), but yields chunks as the engine produces them"""
+        audio = self.get(text, voice, engine)
+        if audio is not None:
+            yield audio
+            return
+        chunks = []
+        for chunk in synth.stream(text, voice, engine):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete clips are kept
+        self.put(text, b"".join(chunks), voice, engine)
+
+    def warm(self, phrases, voice=None, engine=None):
+        """Synthesize whatever is missing in a background thread"""
+        def run():
+            for phrase in phrases:
+                if os.path.exists(self.path(phrase, voice, engine)):
+                    continue
+                try:
+                    self.put(phrase, synth.synthesize(phrase, voice, engine), voice, engine)
+                except Exception as e:
+                    print(f"⚠️ Could not pre-synthesize '{phrase}': {e}")
+                    return
+
+        thread = threading.Thread(target=run, name="tts-cache-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def prune(self):
+        """Drop the least recently written files until under max_bytes"""
+        with self._lock:
+            try:
+                entries = [e for e in os.scandir(self.directory) if e.is_file() and not e.name.endswith(".tmp")]
+            except OSError:
+                return
+            stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+            total = sum(size for _, size, _ in stats)
+            for _, size, path in sorted(stats):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide cache over CACHE_DIR"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache()
+        return _cache
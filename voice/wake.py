@@ -0,0 +1,323 @@
+# voice/wake.py - Wake-word spotting so Whisper only runs on addressed speech
+#
+#   python -m voice.wake enroll            # say the wake word 3 times
+#   python -m voice.wake enroll --count 5 --name echo
+#   python -m voice.wake test              # print detections and distances
+#
+# Template matching on MFCCs: each enrolled recording of the wake word is
+# turned into a sequence of MFCC frames, and live audio is compared with
+# them by subsequence DTW. Features are computed incrementally, 20 ms at a
+# time, and the DTW only runs when the recent audio is louder than a noise
+# gate, so a quiet room costs almost nothing and a TV costs a few ms every
+# CHECK_SECONDS instead of a Whisper pass every 5 s.
+#
+# Enrolled WAVs live in ECHOMIND_WAKE_DIR (default wake/). With none there,
+# or ECHOMIND_WAKE=0, voice/stt.py listens without a wake word as before.
+import argparse
+import glob
+import os
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENABLED = os.environ.get("ECHOMIND_WAKE", "1") != "0"
+WAKE_DIR = os.environ.get("ECHOMIND_WAKE_DIR", os.path.join(REPO_ROOT, "wake"))
+# Match distance below which the wake word counts as heard; empty: derived
+# from how far the enrolled templates are from each other
+THRESHOLD = os.environ.get("ECHOMIND_WAKE_THRESHOLD", "")
+THRESHOLD_MARGIN = 1.3
+SINGLE_TEMPLATE_THRESHOLD = 5.0  # nothing to calibrate against with one recording
+GATE_RMS = float(os.environ.get("ECHOMIND_WAKE_GATE", "0.01"))
+
+SAMPLE_RATE = 16000
+FRAME_LEN = 400  # 25 ms
+HOP = 320  # 20 ms
+NFFT = 512
+MEL_BANDS = 26
+CEPSTRA = 12  # c1..c12; c0 (loudness) is left out
+CHECK_SECONDS = 0.1
+# A detection must be heard again from scratch after a gap longer than this
+RESUME_SECONDS = 1.0
+
+
+# ---- FEATURES ----
+
+def _mel_filterbank(samplerate, nfft, bands, low=20.0, high=7600.0):
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    edges = to_hz(np.linspace(to_mel(low), to_mel(min(high, samplerate / 2)), bands + 2))
+    bins = np.fft.rfftfreq(nfft, 1.0 / samplerate)
+    bank = np.zeros((bands, len(bins)), dtype=np.float32)
+    for i in range(bands):
+        left, centre, right = edges[i], edges[i + 1], edges[i + 2]
+        rising = (bins - left) / (centre - left)
+        falling = (right - bins) / (right - centre)
+        bank[i] = np.clip(np.minimum(rising, falling), 0.0, None)
+    return bank
+
+
+def _dct_matrix(bands, count):
+    n = np.arange(bands)
+    k = np.arange(1, count + 1)[:, None]
+    return (np.cos(np.pi * k * (2 * n + 1) / (2 * bands)) * np.sqrt(2.0 / bands)).astype(np.float32)
+
+
+_WINDOW = np.hamming(FRAME_LEN).astype(np.float32)
+_MEL = _mel_filterbank(SAMPLE_RATE, NFFT, MEL_BANDS)
+_DCT = _dct_matrix(MEL_BANDS, CEPSTRA)
+
+
+def frames(audio):
+    """Overlapping FRAME_LEN frames every HOP samples, as a strided view"""
+    if len(audio) < FRAME_LEN:
+        return np.zeros((0, FRAME_LEN), dtype=np.float32)
+    return np.lib.stride_tricks.sliding_window_view(audio, FRAME_LEN)[::HOP]
+
+
+def mfcc(audio):
+    """(frames, CEPSTRA) MFCCs and the RMS of each frame"""
+    framed = frames(np.asarray(audio, dtype=np.float32))
+    if not len(framed):
+        return np.zeros((0, CEPSTRA), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    rms = np.sqrt(np.einsum('ij,ij->i', framed, framed) / FRAME_LEN)
+    emphasised = np.empty_like(framed)
+    emphasised[:, 0] = framed[:, 0]
+    emphasised[:, 1:] = framed[:, 1:] - 0.97 * framed[:, :-1]
+    spectrum = np.abs(np.fft.rfft(emphasised * _WINDOW, NFFT)) ** 2
+    energies = np.log(spectrum.astype(np.float32) @ _MEL.T + 1e-10)
+    return energies @ _DCT.T, rms
+
+
+def dtw_distance(template, window):
+    """
+    Best match of the whole template anywhere inside the window (free start
+    and end), per template frame. Steps (1,0), (1,1) and (1,2) let the word
+    be spoken up to twice as fast or arbitrarily slower.
+    """
+    if not len(template) or not len(window):
+        return float('inf')
+    # Frame-to-frame Euclidean distances without a (T, L, d) temporary
+    cost = (np.einsum('ij,ij->i', template, template)[:, None]
+            + np.einsum('ij,ij->i', window, window)[None, :]
+            - 2.0 * template @ window.T)
+    cost = np.sqrt(np.maximum(cost, 0.0))
+    total = cost[0].copy()
+    for row in cost[1:]:
+        best = total.copy()
+        np.minimum(best[1:], total[:-1], out=best[1:])
+        np.minimum(best[2:], total[:-2], out=best[2:])
+        total = row + best
+    return float(total.min()) / len(template)
+
+
+# ---- TEMPLATES ----
+
+def trim(audio, floor=0.1, pad=0.1):
+    """Cut leading and trailing silence: keep frames above `floor` x the loudest"""
+    _, rms = mfcc(audio)
+    if not len(rms) or rms.max() <= 0:
+        return audio
+    loud = np.flatnonzero(rms >= floor * rms.max())
+    margin = int(pad * SAMPLE_RATE)
+    start = max(0, loud[0] * HOP - margin)
+    end = min(len(audio), loud[-1] * HOP + FRAME_LEN + margin)
+    return audio[start:end]
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as w:
+        if w.getsampwidth() != 2 or w.getnchannels() != 1 or w.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path}: expected 16-bit mono {SAMPLE_RATE} Hz")
+        frames_ = w.readframes(w.getnframes())
+    return np.frombuffer(frames_, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def write_wav(path, audio):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm.tobytes())
+
+
+def template_paths(directory=WAKE_DIR):
+    return sorted(glob.glob(os.path.join(directory, "*.wav")))
+
+
+# ---- SPOTTER ----
+
+class WakeWordSpotter:
+    """Incremental MFCCs of the live audio, DTW against the templates when it is loud"""
+
+    def __init__(self, templates, threshold=None):
+        """`templates`: mono float32 16 kHz clips of the wake word, already trimmed"""
+        # c0 is dropped, so loudness does not matter; the templates are recorded
+        # on the same microphone, so no cepstral mean normalisation either
+        self.templates = [mfcc(t)[0] for t in templates]
+        self.templates = [t for t in self.templates if len(t)]
+        if not self.templates:
+            raise ValueError("no usable wake word templates")
+        if threshold is None:
+            threshold = self.calibrate()
+        self.threshold = threshold
+        longest = max(len(t) for t in self.templates)
+        # Room for the longest template spoken slowly, plus some context
+        self.window_frames = int(longest * 1.5) + 5
+        self.check_frames = max(1, int(CHECK_SECONDS * SAMPLE_RATE / HOP))
+        self.position = 0
+        self.last_distance = None
+        self.checks = 0
+        self.detections = 0
+        self.reset()
+
+    @classmethod
+    def from_dir(cls, directory=WAKE_DIR):
+        paths = template_paths(directory)
+        if not paths:
+            return None
+        threshold = float(THRESHOLD) if THRESHOLD else None
+        return cls([trim(read_wav(p)) for p in paths], threshold)
+
+    def calibrate(self):
+        """Threshold from the spread between templates of the same word"""
+        if len(self.templates) < 2:
+            return SINGLE_TEMPLATE_THRESHOLD
+        distances = []
+        for i, template in enumerate(self.templates):
+            others = [dtw_distance(template, o) for j, o in enumerate(self.templates) if j != i]
+            distances.append(min(others))
+        return max(distances) * THRESHOLD_MARGIN
+
+    def reset(self):
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._features = deque(maxlen=self.window_frames)
+        self._loud = deque(maxlen=self.window_frames)
+        self._since_check = 0
+
+    def feed(self, block):
+        """Process new samples; True when the wake word ends in them"""
+        audio = np.concatenate((self._tail, block)) if len(self._tail) else np.asarray(block, dtype=np.float32)
+        count = 0 if len(audio) < FRAME_LEN else (len(audio) - FRAME_LEN) // HOP + 1
+        if not count:
+            self._tail = audio.copy()
+            return False
+        features, rms = mfcc(audio[:(count - 1) * HOP + FRAME_LEN])
+        # Keep what the next frame still needs (copied: `block` may be a ring view)
+        self._tail = audio[count * HOP:].copy()
+        self._features.extend(features)
+        self._loud.extend(rms > GATE_RMS)
+        self._since_check += count
+
+        if self._since_check < self.check_frames:
+            return False
+        self._since_check = 0
+        if not any(self._loud):
+            return False
+        self.checks += 1
+        window = np.array(self._features)
+        self.last_distance = min(dtw_distance(t, window) for t in self.templates)
+        if self.last_distance < self.threshold:
+            self.detections += 1
+            self.reset()
+            return True
+        return False
+
+    def listen(self, capture, timeout=None):
+        """
+        Follow an AudioCapture until the wake word is heard. Returns the
+        capture position just after it, or None on timeout. Consecutive
+        calls carry on where the last one stopped, so nothing said between
+        them is missed.
+        """
+        position = self.position
+        if capture.written - position > RESUME_SECONDS * capture.samplerate:
+            position = capture.written
+            self.reset()
+        step = int(CHECK_SECONDS * capture.samplerate)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            end = capture.written
+            if end > position:
+                if capture.overwritten(position):
+                    position = end - capture.capacity
+                heard = self.feed(capture.window(position, end))
+                position = end
+                if heard:
+                    self.position = position
+                    return position
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                self.position = position
+                return None
+            capture.wait_until(position + step, remaining)
+
+
+def load_spotter():
+    """Spotter for the enrolled wake word, or None to listen to everything"""
+    if not ENABLED:
+        return None
+    try:
+        return WakeWordSpotter.from_dir()
+    except Exception as e:
+        print(f"⚠️ Wake word disabled: {e}")
+        return None
+
+
+# ---- CLI ----
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll or try out the wake word")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enroll = sub.add_parser("enroll", help="record the wake word a few times")
+    enroll.add_argument('--count', type=int, default=3)
+    enroll.add_argument('--seconds', type=float, default=2.0)
+    enroll.add_argument('--name', default="wake")
+    sub.add_parser("test", help="print a line every time the wake word is heard")
+    args = parser.parse_args()
+
+    from voice.capture import get_capture
+    capture = get_capture()
+
+    if args.command == "enroll":
+        os.makedirs(WAKE_DIR, exist_ok=True)
+        for i in range(1, args.count + 1):
+            input(f"Press Enter, then say the wake word ({i}/{args.count})...")
+            recording = capture.record(args.seconds)
+            if recording is None:
+                print("⚠️ No audio from the microphone; check the input device and try again")
+                capture.stop()
+                return
+            audio = trim(np.array(recording))
+            path = os.path.join(WAKE_DIR, f"{args.name}_{int(time.time())}_{i}.wav")
+            write_wav(path, audio)
+            print(f"💾 {os.path.relpath(path, REPO_ROOT)} ({len(audio) / SAMPLE_RATE:.2f}s)")
+        spotter = WakeWordSpotter.from_dir()
+        print(f"✅ {len(spotter.templates)} templates, threshold {spotter.threshold:.2f}")
+        return
+
+    spotter = WakeWordSpotter.from_dir()
+    if spotter is None:
+        print(f"No templates in {WAKE_DIR}; run: python -m voice.wake enroll")
+        return
+    print(f"👂 Listening for the wake word (threshold {spotter.threshold:.2f}), Ctrl+C to stop")
+    try:
+        while True:
+            if spotter.listen(capture, timeout=1.0) is not None:
+                print(f"✅ heard it (distance {spotter.last_distance:.2f})")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.stop()
+
+
+if __name__ == '__main__':
+    main()
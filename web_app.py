@@ -3,15 +3,26 @@ import os
 import time
 import threading
 import json
+import hashlib
 import secrets
 import re
 import random
 import sys
+from concurrent.futures import TimeoutError as FutureTimeout
 from datetime import datetime
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from flask import Flask, render_template, request, jsonify, send_from_directory, session, redirect, url_for, send_file
+from flask import Flask, render_template, request, jsonify, send_from_directory, session, redirect, url_for, send_file, Response, stream_with_context, g
+from web_ui.store import open_store, load_secret_key
+from web_ui.cache import CachedStore, TTLCache, WriteBehind
+from web_ui.security import password_hasher, HasherBusy
+from web_ui.summarizer import ConversationSummarizer
+from web_ui.voice_session import VoiceSession, STTPool
+from brain.intents import route_intent, HELP_TEXT
+from brain.memory import migrate as migrate_memory, merge as merge_memory, update_memory, recall, format_memories
+from echomind import metrics
+from voice import synth
+from voice.tts_cache import TTSCache
 
 # Optional imports for file processing - with error handling
 try:
@@ -42,30 +53,105 @@ except ImportError:
     TESSERACT_SUPPORT = False
     print("⚠️ pytesseract not installed. OCR disabled.")
 
+try:
+    from flask_sock import Sock
+    WEBSOCKET_SUPPORT = True
+except ImportError:
+    WEBSOCKET_SUPPORT = False
+    print("⚠️ flask-sock not installed. Server-side voice sessions disabled.")
+
+# Password-hashing pool workers re-import this file as __mp_main__ under spawn.
+# They only run web_ui.security, so every startup side effect below (directories,
+# signing key, store and its migrations, engine probes, background threads)
+# happens in the server process only.
+HASH_WORKER = __name__ == '__mp_main__'
+
+TTS_ENGINES = synth.available_engines() if not HASH_WORKER else []
+if not TTS_ENGINES and not HASH_WORKER:
+    print("⚠️ No TTS engine (edge-tts or piper). Voice replies use the browser's voice.")
+
 app = Flask(__name__, 
             static_folder='web_ui/static',
             template_folder='web_ui/templates')
 
+# Create directories
+if not HASH_WORKER:
+    os.makedirs('uploads', exist_ok=True)
+    os.makedirs('user_data', exist_ok=True)
+    os.makedirs('user_data/files', exist_ok=True)
+    # The signing key must survive restarts and be identical in every worker,
+    # otherwise sessions are invalidated
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or load_secret_key('user_data/secret_key')
+
 # Configuration
-app.config['SECRET_KEY'] = secrets.token_hex(32)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx'}
-
-# Create directories
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs('user_data', exist_ok=True)
-os.makedirs('user_data/files', exist_ok=True)
+app.config['STATE_STORE'] = os.environ.get('ECHOMIND_STORE', 'json://user_data')
+app.config['CACHE_MAX_BYTES'] = int(os.environ.get('ECHOMIND_CACHE_MB', '64')) * 1024 * 1024
+app.config['CACHE_IDLE_SECONDS'] = int(os.environ.get('ECHOMIND_CACHE_IDLE', '900'))
+app.config['SESSION_USER_TTL'] = 30  # seconds a logged-in user's record is served from memory
+app.config['LOGIN_LIMIT_PER_IP'] = (20, 60)  # (attempts, seconds)
+app.config['LOGIN_LIMIT_PER_ACCOUNT'] = (5, 300)  # (failed attempts, seconds)
+app.config['REGISTER_LIMIT_PER_IP'] = (5, 3600)  # (attempts, seconds)
+app.config['LLM_SLOTS'] = int(os.environ.get('ECHOMIND_LLM_SLOTS', '1'))  # concurrent generations across all workers
+app.config['LLM_LEASE_TTL'] = 300  # seconds before a crashed worker's slot is reclaimed
+app.config['CHAT_DEADLINE'] = float(os.environ.get('ECHOMIND_CHAT_DEADLINE', '60'))  # seconds before falling back
+app.config['CANCEL_POLL_INTERVAL'] = 0.5  # seconds between cancel checks / keep-alive bytes
+app.config['PROMPT_RECENT_TURNS'] = int(os.environ.get('ECHOMIND_PROMPT_TURNS', '2'))  # verbatim turns; older ones are summarized
+app.config['SUMMARY_MAX_WORDS'] = 150
+app.config['MEMORY_DURABILITY'] = os.environ.get('ECHOMIND_MEMORY_DURABILITY', 'batched')  # every | batched | shutdown
+app.config['MEMORY_FLUSH_INTERVAL'] = float(os.environ.get('ECHOMIND_MEMORY_FLUSH', '2'))  # seconds, batched mode
+app.config['TTS_SLOTS'] = int(os.environ.get('ECHOMIND_TTS_SLOTS', '2'))  # concurrent syntheses across all workers
+app.config['TTS_LEASE_TTL'] = 60
+app.config['TTS_MAX_CHARS'] = 2000
+app.config['TTS_CACHE_DIR'] = os.environ.get('ECHOMIND_TTS_CACHE_DIR', 'user_data/tts_cache')
+app.config['TTS_CACHE_MAX_BYTES'] = int(os.environ.get('ECHOMIND_TTS_CACHE_MB', '200')) * 1024 * 1024
+app.config['TTS_MAX_AGE'] = 7 * 24 * 3600  # seconds browsers may reuse synthesized audio
+app.config['STT_SLOTS'] = int(os.environ.get('ECHOMIND_STT_SLOTS', '2'))  # concurrent transcriptions per worker
+
+if not HASH_WORKER:
+    # Shared state (users, conversations, files, file contents, memory, busy flag)
+    # lives in the store so several worker processes can serve the same users.
+    # Only a bounded working set of per-user documents is kept in memory.
+    store = CachedStore(
+        open_store(app.config['STATE_STORE']),
+        kinds=['conversations', 'summaries', 'files', 'file', 'file_contents', 'memory'],
+        max_bytes=app.config['CACHE_MAX_BYTES'],
+        idle_seconds=app.config['CACHE_IDLE_SECONDS']
+    )
+
+    # user_id -> user record for logged-in sessions
+    session_users = TTLCache(ttl=app.config['SESSION_USER_TTL'])
+
+    # User memory is written on every chat turn; buffer those writes and
+    # flush them in the background, merging with other workers' copies
+    user_memory = WriteBehind(
+        store, 'memory',
+        mode=app.config['MEMORY_DURABILITY'],
+        interval=app.config['MEMORY_FLUSH_INTERVAL'],
+        merge=merge_memory
+    )
+
+    # Background job folding older turns into a per-user summary
+    summarizer = ConversationSummarizer(
+        store,
+        keep_turns=app.config['PROMPT_RECENT_TURNS'],
+        max_words=app.config['SUMMARY_MAX_WORDS'],
+        slots=app.config['LLM_SLOTS'],
+        lease_ttl=app.config['LLM_LEASE_TTL']
+    )
+
+    # Synthesized replies by hash of (engine, voice, text), shared by all workers
+    tts_cache = TTSCache(app.config['TTS_CACHE_DIR'], app.config['TTS_CACHE_MAX_BYTES'])
+
+    # Whisper models for /ws/voice, loaded once per worker and shared by all sessions
+    stt_pool = STTPool(app.config['STT_SLOTS'])
 
 # Global state
-users = {}
-conversations = {}
-user_files = {}
-file_contents = {}  # Store extracted text content
 ai_modules_loaded = False
 llm = None
 brain_modules = {}
-is_processing = False
 
 def load_ai_modules():
     """Load AI modules"""
@@ -75,14 +161,14 @@ def load_ai_modules():
         
         # Try to import brain modules
         try:
-            from brain.local_llm import LocalLLM
+            from brain.router import ModelRouter
             from brain.prompts import JARVIS_SYSTEM_PROMPT
             from brain.memory import load_memory, update_memory, save_memory
             from brain.mood import get_mood
             from brain.planner import plan_action
             
             brain_modules = {
-                'LocalLLM': LocalLLM,
+                'ModelRouter': ModelRouter,
                 'JARVIS_SYSTEM_PROMPT': JARVIS_SYSTEM_PROMPT,
                 'load_memory': load_memory,
                 'update_memory': update_memory,
@@ -105,12 +191,16 @@ def load_ai_modules():
         
         # Initialize LLM
         try:
-            if 'LocalLLM' in brain_modules:
-                llm = brain_modules['LocalLLM'](model_name="phi3")
+            if 'ModelRouter' in brain_modules:
+                # Small model first, larger one for hard queries (ECHOMIND_SMALL_MODEL / ECHOMIND_LARGE_MODEL)
+                llm = brain_modules['ModelRouter']()
                 ai_modules_loaded = True
                 print("✅ AI modules loaded successfully")
+                # Load the model now instead of on the first user's request
+                llm.start_keeper()
+                summarizer.start(llm)
             else:
-                print("⚠️ LocalLLM not available")
+                print("⚠️ ModelRouter not available")
                 ai_modules_loaded = False
         except Exception as e:
             print(f"❌ Error initializing AI: {e}")
@@ -123,21 +213,21 @@ def load_ai_modules():
 # Load AI in background
 ai_thread = threading.Thread(target=load_ai_modules)
 ai_thread.daemon = True
-ai_thread.start()
+if not HASH_WORKER:
+    ai_thread.start()
 
 # Authentication
-def load_users():
-    try:
-        with open('user_data/users.json', 'r') as f:
-            return json.load(f)
-    except:
-        return {}
+def save_user(user):
+    store.put('users', user['id'], user)
+    session_users.pop(user['id'])
 
-def save_users():
-    with open('user_data/users.json', 'w') as f:
-        json.dump(users, f, indent=2)
+def claim_username(username, user_id):
+    """Reserve the username in the index; False if someone else owns it"""
+    return store.update('usernames', username, lambda owner: owner or user_id) == user_id
 
-users = load_users()
+def find_user_by_username(username):
+    user_id = store.get('usernames', username)
+    return store.get('users', user_id) if user_id else None
 
 def login_required(f):
     @wraps(f)
@@ -149,28 +239,56 @@ def login_required(f):
 
 def get_current_user():
     if 'user_id' in session:
-        return users.get(session['user_id'])
+        user_id = session['user_id']
+        user = session_users.get(user_id)
+        if user is None:
+            user = store.get('users', user_id)
+            if user:
+                session_users.set(user_id, user)
+        return user
     return None
 
+def over_limit(scope, ident, limit, record=True):
+    """Fixed-window rate limit shared by all workers; record=False only checks"""
+    max_count, window = limit
+    name = hashlib.sha1(f"{scope}:{ident}".encode()).hexdigest()
+    count = store.incr(name, window, 1 if record else 0)
+    return count > max_count if record else count >= max_count
+
 def get_user_conversation(user_id):
-    if user_id not in conversations:
-        # Try to load from file
-        conv_file = f'user_data/{user_id}_conversations.json'
-        if os.path.exists(conv_file):
-            try:
-                with open(conv_file, 'r') as f:
-                    conversations[user_id] = json.load(f)
-            except:
-                conversations[user_id] = []
-        else:
-            conversations[user_id] = []
-    return conversations[user_id]
+    return store.get('conversations', user_id, [])
+
+def save_user_conversation(user_id, history):
+    store.put('conversations', user_id, history[-100:])  # Keep last 100
+
+def get_user_files(user_id):
+    return store.get('files', user_id, [])
+
+def get_user_file(user_id, file_id):
+    """Single file record from the (user_id, file_id) index"""
+    if not re.fullmatch(r'[a-f0-9]+', file_id):
+        return None
+    return store.get('file', f"{user_id}_{file_id}")
+
+def get_file_text(content_id):
+    content = store.get('file_contents', content_id)
+    return content['text'] if content else None
 
-def save_user_conversation(user_id):
-    conv_file = f'user_data/{user_id}_conversations.json'
-    if user_id in conversations:
-        with open(conv_file, 'w') as f:
-            json.dump(conversations[user_id][-100:], f, indent=2)  # Keep last 100
+INDEX_VERSION = 1
+
+def build_indexes():
+    """Backfill the username and file indexes for data saved before they existed"""
+    if store.get('meta', 'indexes') == INDEX_VERSION:
+        return
+    print("🔄 Building user and file indexes...")
+    for user_id, user in store.items('users'):
+        claim_username(user['username'], user_id)
+        for file in get_user_files(user_id):
+            store.put('file', f"{user_id}_{file['id']}", file)
+    store.put('meta', 'indexes', INDEX_VERSION)
+
+if not HASH_WORKER:
+    build_indexes()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
@@ -180,10 +298,10 @@ def extract_text_from_file(filepath, filename, file_type):
     """Extract text content from various file types"""
     text_content = ""
     summary = ""
+    started = time.perf_counter()
+    file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
     
     try:
-        file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-        
         # Text files
         if file_type == 'text/plain' or file_ext == 'txt':
             with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
@@ -224,8 +342,73 @@ def extract_text_from_file(filepath, filename, file_type):
         text_content = f"[Error extracting content: {str(e)}]"
         summary = f"Error processing file"
     
+    metrics.EXTRACTION_SECONDS.observe(time.perf_counter() - started, file_ext or 'none')
     return text_content, summary
 
+# LLM generation with deadlines and cancellation
+class GenerationCancelled(Exception):
+    pass
+
+class GenerationTimeout(Exception):
+    pass
+
+# Chat and voice share a scope, so either supersedes the other; file
+# questions have their own and run alongside the chat
+GENERATION_SCOPES = ('chat', 'file')
+
+def generation_key(user_id, scope='chat'):
+    return user_id if scope == 'chat' else f"{user_id}:{scope}"
+
+def start_generation(user_id, scope='chat'):
+    """Register a new generation for the user; any older one in the same scope notices and stops"""
+    generation = secrets.token_hex(8)
+    store.put('generations', generation_key(user_id, scope), generation)
+    return generation
+
+def acquire_slot(name, slots, ttl, wait=0):
+    """Take one of `slots` leases on `name`, waiting up to `wait` seconds for one to free up"""
+    give_up = time.time() + wait
+    while True:
+        lease = store.acquire_lease(name, slots, ttl)
+        if lease is not None or time.time() >= give_up:
+            return lease
+        time.sleep(0.1)
+
+def acquire_llm_lease(wait=0):
+    """Take an LLM slot, waiting up to `wait` seconds for one to free up"""
+    return acquire_slot('llm', app.config['LLM_SLOTS'], app.config['LLM_LEASE_TTL'], wait)
+
+def wait_for_generation(user_id, generation, prompt, query=None, scope='chat'):
+    """Run the prompt on the async LLM path, yielding a keep-alive byte while waiting.
+    
+    Use with `yield from` inside a streamed response: when the client disconnects
+    the server closes the generator and the Ollama request is cancelled.
+    """
+    future = llm.submit(prompt, query, session=user_id)
+    started = time.time()
+    try:
+        while True:
+            try:
+                return future.result(timeout=app.config['CANCEL_POLL_INTERVAL'])
+            except FutureTimeout:
+                pass
+            
+            if time.time() - started > app.config['CHAT_DEADLINE']:
+                raise GenerationTimeout()
+            
+            # Cancelled via /api/chat/cancel or superseded by a newer message
+            if store.get('generations', generation_key(user_id, scope)) != generation:
+                raise GenerationCancelled()
+            
+            yield b' '  # JSON allows leading whitespace
+    finally:
+        future.cancel()
+
+def stream_json(body):
+    """Streamed JSON response for generators built on wait_for_generation"""
+    return Response(stream_with_context(body), mimetype='application/json',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
 # Routes
 @app.route('/')
 def index():
@@ -240,11 +423,11 @@ def dashboard():
     
     # Get current user data
     user_id = session['user_id']
-    user_data = users.get(user_id, {})
+    user_data = store.get('users', user_id, {})
     
     # Get user stats
     user_conversations = get_user_conversation(user_id)
-    user_files_list = user_files.get(user_id, [])
+    user_files_list = get_user_files(user_id)
     
     return render_template('dashboard.html', 
                          current_user=user_data,
@@ -264,7 +447,7 @@ def upload():
         return redirect(url_for('login'))
     
     user_id = session['user_id']
-    user_data = users.get(user_id, {})
+    user_data = store.get('users', user_id, {})
     
     return render_template('upload.html', current_user=user_data)
 
@@ -281,7 +464,7 @@ def voice():
         return redirect(url_for('login'))
     
     user_id = session['user_id']
-    user_data = users.get(user_id, {})
+    user_data = store.get('users', user_id, {})
     
     return render_template('voice.html', current_user=user_data)
 
@@ -293,13 +476,24 @@ def login():
         username = data.get('username', '').strip()
         password = data.get('password', '').strip()
         
-        user = next((u for u in users.values() if u['username'] == username), None)
+        # Refuse before doing any KDF work
+        if (over_limit('login_ip', request.remote_addr, app.config['LOGIN_LIMIT_PER_IP']) or
+                over_limit('login_user', username, app.config['LOGIN_LIMIT_PER_ACCOUNT'], record=False)):
+            return jsonify({'success': False, 'message': 'Too many attempts, try again later'}), 429
+        
+        user = find_user_by_username(username)
+        
+        try:
+            valid = user is not None and password_hasher.verify(user['password'], password)
+        except HasherBusy:
+            return jsonify({'success': False, 'message': 'Server busy, try again'}), 503
         
-        if user and check_password_hash(user['password'], password):
+        if valid:
             session['user_id'] = user['id']
             session['username'] = user['username']
             return jsonify({'success': True, 'message': 'Login successful'})
         
+        over_limit('login_user', username, app.config['LOGIN_LIMIT_PER_ACCOUNT'])
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
     
     return render_template('login.html')
@@ -312,6 +506,9 @@ def register():
         password = data.get('password', '').strip()
         email = data.get('email', '').strip()
         
+        if over_limit('register_ip', request.remote_addr, app.config['REGISTER_LIMIT_PER_IP']):
+            return jsonify({'success': False, 'message': 'Too many attempts, try again later'}), 429
+        
         if not username or not password:
             return jsonify({'success': False, 'message': 'Username and password required'}), 400
         
@@ -321,20 +518,28 @@ def register():
         if len(password) < 6:
             return jsonify({'success': False, 'message': 'Password must be at least 6 characters'}), 400
         
-        if any(u['username'] == username for u in users.values()):
+        if find_user_by_username(username):
             return jsonify({'success': False, 'message': 'Username exists'}), 400
         
+        try:
+            password_hash = password_hasher.hash(password)
+        except HasherBusy:
+            return jsonify({'success': False, 'message': 'Server busy, try again'}), 503
+        
         user_id = secrets.token_hex(16)
-        users[user_id] = {
+        if not claim_username(username, user_id):
+            return jsonify({'success': False, 'message': 'Username exists'}), 400
+        
+        user = {
             'id': user_id,
             'username': username,
-            'password': generate_password_hash(password),
+            'password': password_hash,
             'email': email,
             'created_at': datetime.now().isoformat(),
             'preferences': {}
         }
         
-        save_users()
+        save_user(user)
         session['user_id'] = user_id
         session['username'] = username
         
@@ -344,9 +549,6 @@ def register():
 
 @app.route('/logout')
 def logout():
-    # Save conversations before logout
-    if 'user_id' in session:
-        save_user_conversation(session['user_id'])
     session.clear()
     return redirect(url_for('index'))
 
@@ -355,18 +557,7 @@ def logout():
 @login_required
 def get_files():
     user_id = session['user_id']
-    if user_id not in user_files:
-        # Try to load from file
-        files_file = f'user_data/{user_id}_files.json'
-        if os.path.exists(files_file):
-            try:
-                with open(files_file, 'r') as f:
-                    user_files[user_id] = json.load(f)
-            except:
-                user_files[user_id] = []
-        else:
-            user_files[user_id] = []
-    return jsonify(user_files[user_id])
+    return jsonify(get_user_files(user_id))
 
 @app.route('/api/files/upload', methods=['POST'])
 @login_required
@@ -382,10 +573,6 @@ def upload_file():
     uploaded_files = request.files.getlist('files')
     uploaded = []
     
-    # Initialize user files if needed
-    if user_id not in user_files:
-        user_files[user_id] = []
-    
     for file in uploaded_files:
         if file.filename == '':
             continue
@@ -407,11 +594,11 @@ def upload_file():
             
             # Store content for AI reference
             content_id = secrets.token_hex(8)
-            file_contents[content_id] = {
+            store.put('file_contents', content_id, {
                 'text': text_content,
                 'filename': filename,
                 'user_id': user_id
-            }
+            })
             
             file_info = {
                 'id': file_id,
@@ -425,15 +612,14 @@ def upload_file():
                 'summary': summary
             }
             
-            user_files[user_id].append(file_info)
+            store.put('file', f"{user_id}_{file_id}", file_info)
             uploaded.append(file_info)
             
             print(f"✅ File uploaded: {filename} ({len(text_content)} chars extracted)")
     
-    # Save to disk
-    files_file = f'user_data/{user_id}_files.json'
-    with open(files_file, 'w') as f:
-        json.dump(user_files[user_id], f, indent=2)
+    # Save to store
+    if uploaded:
+        store.update('files', user_id, lambda files: files + uploaded, default=[])
     
     return jsonify({'success': True, 'files': uploaded})
 
@@ -442,10 +628,9 @@ def upload_file():
 def get_file(file_id):
     user_id = session['user_id']
     
-    if user_id in user_files:
-        for file in user_files[user_id]:
-            if file['id'] == file_id:
-                return jsonify(file)
+    file = get_user_file(user_id, file_id)
+    if file:
+        return jsonify(file)
     
     return jsonify({'error': 'File not found'}), 404
 
@@ -454,32 +639,32 @@ def get_file(file_id):
 def get_file_content(file_id):
     user_id = session['user_id']
     
-    if user_id in user_files:
-        for file in user_files[user_id]:
-            if file['id'] == file_id:
-                # Return stored content if available
-                if 'content_id' in file and file['content_id'] in file_contents:
-                    return jsonify({
-                        'text': file_contents[file['content_id']]['text'],
-                        'filename': file['original_filename'],
-                        'summary': file.get('summary', '')
-                    })
-                
-                # Fallback to reading from file
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], file['saved_filename'])
-                if os.path.exists(filepath):
-                    try:
-                        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read(5000)
-                        return jsonify({
-                            'text': content,
-                            'filename': file['original_filename'],
-                            'summary': file.get('summary', '')
-                        })
-                    except:
-                        pass
-                
-                return jsonify({'text': 'Content not available', 'filename': file['original_filename']})
+    file = get_user_file(user_id, file_id)
+    if file:
+        # Return stored content if available
+        text = get_file_text(file['content_id']) if 'content_id' in file else None
+        if text is not None:
+            return jsonify({
+                'text': text,
+                'filename': file['original_filename'],
+                'summary': file.get('summary', '')
+            })
+        
+        # Fallback to reading from file
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file['saved_filename'])
+        if os.path.exists(filepath):
+            try:
+                with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read(5000)
+                return jsonify({
+                    'text': content,
+                    'filename': file['original_filename'],
+                    'summary': file.get('summary', '')
+                })
+            except:
+                pass
+        
+        return jsonify({'text': 'Content not available', 'filename': file['original_filename']})
     
     return jsonify({'error': 'File not found'}), 404
 
@@ -495,21 +680,15 @@ def ask_about_file(file_id):
         return jsonify({'error': 'No question provided'}), 400
     
     # Find the file
-    file_info = None
-    if user_id in user_files:
-        for file in user_files[user_id]:
-            if file['id'] == file_id:
-                file_info = file
-                break
+    file_info = get_user_file(user_id, file_id)
     
     if not file_info:
         return jsonify({'error': 'File not found'}), 404
     
     # Get file content
-    file_content = ""
-    if 'content_id' in file_info and file_info['content_id'] in file_contents:
-        file_content = file_contents[file_info['content_id']]['text']
-    else:
+    file_content = get_file_text(file_info['content_id']) if 'content_id' in file_info else None
+    if file_content is None:
+        file_content = ""
         # Try to read from file
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], file_info['saved_filename'])
         if os.path.exists(filepath):
@@ -521,8 +700,7 @@ def ask_about_file(file_id):
     
     # Use AI to answer question
     if ai_modules_loaded and llm:
-        try:
-            prompt = f"""Based on the following file content, answer the user's question.
+        prompt = f"""Based on the following file content, answer the user's question.
 
 File: {file_info['original_filename']}
 File Type: {file_info['file_type']}
@@ -534,12 +712,32 @@ File Content:
 Question: {question}
 
 Answer concisely based only on the file content. If the answer cannot be found in the file, say so. Be helpful and informative."""
-            
-            answer = llm.generate(prompt)
-            return jsonify({'answer': answer})
-        except Exception as e:
-            print(f"AI error: {e}")
-            return jsonify({'answer': f"I couldn't process your question. Error: {str(e)}"})
+        
+        summarizer.mark_demand()
+        generation = start_generation(user_id, 'file')
+        with metrics.QUEUE_WAIT_SECONDS.time():
+            lease = acquire_llm_lease(wait=app.config['CANCEL_POLL_INTERVAL'] * 2)
+        if lease is None:
+            return jsonify({'error': 'AI is busy'}), 429
+        
+        def answer_stream():
+            try:
+                answer = yield from wait_for_generation(user_id, generation, prompt, question, 'file')
+            except GenerationCancelled:
+                yield json.dumps({'answer': '', 'cancelled': True})
+                return
+            except GenerationTimeout:
+                print(f"⏱️ File question exceeded {app.config['CHAT_DEADLINE']}s, using fallback")
+                answer = generate_simple_answer(question, file_content, file_info)
+            except Exception as e:
+                print(f"AI error: {e}")
+                answer = f"I couldn't process your question. Error: {str(e)}"
+            yield json.dumps({'answer': answer})
+        
+        # The stream owns the LLM slot and frees it when the response closes
+        stream = stream_json(answer_stream())
+        stream.call_on_close(lambda: store.release_lease('llm', lease))
+        return stream
     else:
         # Simple keyword matching fallback
         answer = generate_simple_answer(question, file_content, file_info)
@@ -579,117 +777,157 @@ def generate_simple_answer(question, content, file_info):
 def delete_file(file_id):
     user_id = session['user_id']
     
-    if user_id in user_files:
-        for i, file in enumerate(user_files[user_id]):
-            if file['id'] == file_id:
-                # Remove from disk
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], file['saved_filename'])
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                
-                # Remove content from memory
-                if 'content_id' in file and file['content_id'] in file_contents:
-                    del file_contents[file['content_id']]
-                
-                # Remove from list
-                user_files[user_id].pop(i)
-                
-                # Save to disk
-                files_file = f'user_data/{user_id}_files.json'
-                with open(files_file, 'w') as f:
-                    json.dump(user_files[user_id], f, indent=2)
-                
-                return jsonify({'success': True})
+    file = get_user_file(user_id, file_id)
+    if not file:
+        return jsonify({'error': 'File not found'}), 404
     
-    return jsonify({'error': 'File not found'}), 404
+    # Remove from list and index
+    store.update('files', user_id, lambda files: [f for f in files if f['id'] != file_id], default=[])
+    store.delete('file', f"{user_id}_{file_id}")
+    
+    # Remove from disk
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], file['saved_filename'])
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    
+    # Remove extracted content
+    if 'content_id' in file:
+        store.delete('file_contents', file['content_id'])
+    
+    return jsonify({'success': True})
+
+def build_chat_prompt(user_id, username, user_input, query):
+    """The chat prompt: system prompt, summary, recent turns, relevant memories"""
+    # Running summary of older turns plus the last few verbatim,
+    # so the prompt stays the same size however long the chat gets
+    history = get_user_conversation(user_id)
+    recent_turns = app.config['PROMPT_RECENT_TURNS']
+    recent_history = history[-recent_turns:] if history and recent_turns else []
+    summary = summarizer.get(user_id)
+    
+    # Format history
+    history_text = ""
+    for msg in recent_history:
+        history_text += f"User: {msg['user']}\nAssistant: {msg['assistant']}\n"
+    
+    # Only the few memories relevant to this message
+    memories = format_memories(recall(get_user_memory(user_id), query))
+    
+    # Prepare prompt
+    system_prompt = brain_modules.get('JARVIS_SYSTEM_PROMPT', 'You are EchoMind, a helpful AI assistant.')
+    
+    prompt = f"""{system_prompt}
+
+User: {username}
+Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M')}
+
+Earlier in this conversation: {summary or 'Nothing yet.'}
+
+Recent Conversation:
+{history_text}
+
+What you know about the user: {memories}
+
+User says: {user_input}
+
+Assistant:"""
+    return prompt
 
 # Chat API
 @app.route('/api/chat', methods=['POST'])
 @login_required
 def api_chat():
-    global is_processing
     user_id = session['user_id']
     username = session.get('username', 'User')
     
-    if is_processing:
+    data = request.json
+    user_input = data.get('message', '').strip()
+    
+    if not user_input:
+        return jsonify({'error': 'Empty message'}), 400
+    
+    # Time, date, help and greetings are answered straight from the intent
+    # table - no LLM slot, no prompt building
+    plan = route_intent(user_input, username)
+    if plan['agent'] == 'answer':
+        print(f"👤 [{username}]: {user_input} -> {plan['intent']}")
+        add_to_history(user_id, user_input, plan['response'])
+        return jsonify({
+            'response': plan['response'],
+            'type': 'text',
+            'intent': plan['intent'],
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    print(f"👤 [{username}]: {user_input}")
+    
+    # Check for special commands
+    if user_input.lower() in {"exit", "quit", "stop", "goodbye"}:
+        response = "Goodbye! See you next time."
+        add_to_history(user_id, user_input, response)
+        return jsonify({'response': response, 'type': 'text'})
+    
+    # Smart fallback responses
+    if not (ai_modules_loaded and llm):
+        response = generate_smart_response(user_input)
+        add_to_history(user_id, user_input, response)
+        return jsonify({
+            'response': response,
+            'type': 'text',
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    # A new message supersedes whatever this user is still waiting on,
+    # so give the older request a moment to hand back its slot.
+    # Background summaries yield their slot too.
+    summarizer.mark_demand()
+    generation = start_generation(user_id)
+    with metrics.QUEUE_WAIT_SECONDS.time():
+        lease = acquire_llm_lease(wait=app.config['CANCEL_POLL_INTERVAL'] * 2)
+    if lease is None:
         return jsonify({'error': 'AI is busy'}), 429
     
+    streaming = False
     try:
-        is_processing = True
-        data = request.json
-        user_input = data.get('message', '').strip()
-        
-        if not user_input:
-            return jsonify({'error': 'Empty message'}), 400
-        
-        print(f"👤 [{username}]: {user_input}")
-        
-        # Check for special commands
-        if user_input.lower() in {"exit", "quit", "stop", "goodbye"}:
-            response = "Goodbye! See you next time."
-            add_to_history(user_id, user_input, response)
-            return jsonify({'response': response, 'type': 'text'})
-        
         # Check for file references
+        build_started = time.perf_counter()
         file_context = ""
         file_pattern = r'\[file:([a-f0-9]+)\]'
         file_matches = re.findall(file_pattern, user_input)
         
         for file_id in file_matches:
             # Find the file
-            for file in user_files.get(user_id, []):
-                if file['id'] == file_id:
-                    file_context += f"\n\n[Referenced File: {file['original_filename']}]\n"
-                    file_context += f"File Summary: {file.get('summary', 'No summary')}\n"
-                    
-                    # Add content if available
-                    if 'content_id' in file and file['content_id'] in file_contents:
-                        content = file_contents[file['content_id']]['text']
-                        if content:
-                            file_context += f"File Content Preview:\n{content[:500]}...\n"
-                    break
+            file = get_user_file(user_id, file_id)
+            if file:
+                file_context += f"\n\n[Referenced File: {file['original_filename']}]\n"
+                file_context += f"File Summary: {file.get('summary', 'No summary')}\n"
+                
+                # Add content if available
+                content = get_file_text(file['content_id']) if 'content_id' in file else None
+                if content:
+                    file_context += f"File Content Preview:\n{content[:500]}...\n"
         
+        # The router judges difficulty from the user's own words
+        query = user_input
         if file_context:
             user_input += f"\n\nUser has referenced these files:{file_context}"
         
-        # Use AI if available
-        if ai_modules_loaded and llm:
+        prompt = build_chat_prompt(user_id, username, user_input, query)
+        metrics.PROMPT_BUILD_SECONDS.observe(time.perf_counter() - build_started)
+        
+        def chat_stream():
             try:
-                # Get conversation history
-                history = get_user_conversation(user_id)
-                recent_history = history[-5:] if history else []
-                
-                # Format history
-                history_text = ""
-                for msg in recent_history:
-                    history_text += f"User: {msg['user']}\nAssistant: {msg['assistant']}\n"
-                
-                # Get user memory
-                memory = get_user_memory(user_id)
-                
-                # Prepare prompt
-                system_prompt = brain_modules.get('JARVIS_SYSTEM_PROMPT', 'You are EchoMind, a helpful AI assistant.')
-                
-                prompt = f"""{system_prompt}
-
-User: {username}
-Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-
-Recent Conversation:
-{history_text}
-
-User Memory: {json.dumps(memory)}
-
-User says: {user_input}
-
-Assistant:"""
-                
-                # Generate response
-                response = llm.generate(prompt)
-                
-                # Update memory (simple version)
-                update_user_memory(user_id, user_input, response)
+                response = yield from wait_for_generation(user_id, generation, prompt, query)
                 
+                # Remember things from the user's own words, not the attached files
+                update_user_memory(user_id, query, response)
+            except GenerationCancelled:
+                print(f"🛑 [{username}]: generation cancelled")
+                yield json.dumps({'response': '', 'cancelled': True})
+                return
+            except GenerationTimeout:
+                print(f"⏱️ [{username}]: LLM exceeded {app.config['CHAT_DEADLINE']}s, using fallback")
+                response = generate_smart_response(user_input)
             except Exception as e:
                 print(f"AI error: {e}")
                 response = random.choice([
@@ -698,23 +936,37 @@ Assistant:"""
                     "I'm working on your question.",
                     "Thanks for asking! Let me formulate a response."
                 ])
-        else:
-            # Smart fallback responses
-            response = generate_smart_response(user_input)
-        
-        add_to_history(user_id, user_input, response)
+            
+            add_to_history(user_id, user_input, response)
+            summarizer.schedule(user_id)
+            
+            yield json.dumps({
+                'response': response,
+                'type': 'text',
+                'timestamp': datetime.now().isoformat()
+            })
         
-        return jsonify({
-            'response': response,
-            'type': 'text',
-            'timestamp': datetime.now().isoformat()
-        })
+        # The stream now owns the LLM slot and frees it when the response closes
+        streaming = True
+        stream = stream_json(chat_stream())
+        stream.call_on_close(lambda: store.release_lease('llm', lease))
+        return stream
         
     except Exception as e:
         print(f"Chat error: {e}")
         return jsonify({'error': str(e)}), 500
     finally:
-        is_processing = False
+        if not streaming:
+            store.release_lease('llm', lease)
+
+@app.route('/api/chat/cancel', methods=['POST'])
+@login_required
+def cancel_chat():
+    """Stop the user's running generations, whichever worker is serving them"""
+    user_id = session['user_id']
+    for scope in GENERATION_SCOPES:
+        store.delete('generations', generation_key(user_id, scope))
+    return jsonify({'success': True})
 
 def generate_smart_response(user_input):
     """Generate smart fallback responses without AI"""
@@ -730,14 +982,7 @@ def generate_smart_response(user_input):
     
     # Help
     if 'help' in user_input_lower or 'what can you do' in user_input_lower:
-        return """I can help you with:
-• Answering questions
-• Opening websites (try: open youtube)
-• Playing videos (try: play music)
-• Opening applications (try: open notepad)
-• Uploading and analyzing files
-• Voice conversations
-• Remembering our conversations"""
+        return HELP_TEXT
     
     # File related
     if 'file' in user_input_lower or 'upload' in user_input_lower:
@@ -758,22 +1003,14 @@ def generate_smart_response(user_input):
 
 def add_to_history(user_id, user_input, response):
     """Add to conversation history"""
-    if user_id not in conversations:
-        conversations[user_id] = get_user_conversation(user_id)
-    
-    conversations[user_id].append({
+    entry = {
         'user': user_input,
         'assistant': response,
         'timestamp': datetime.now().isoformat()
-    })
+    }
     
     # Keep only last 100 messages
-    if len(conversations[user_id]) > 100:
-        conversations[user_id] = conversations[user_id][-100:]
-    
-    # Save periodically (every 5 messages)
-    if len(conversations[user_id]) % 5 == 0:
-        save_user_conversation(user_id)
+    store.update('conversations', user_id, lambda history: (history + [entry])[-100:], default=[])
 
 @app.route('/api/conversation', methods=['GET'])
 @login_required
@@ -785,38 +1022,29 @@ def get_conversation():
 @login_required
 def clear_conversation():
     user_id = session['user_id']
-    if user_id in conversations:
-        conversations[user_id] = []
-        save_user_conversation(user_id)
+    save_user_conversation(user_id, [])
+    summarizer.clear(user_id)
     return jsonify({'success': True})
 
 def get_user_memory(user_id):
     """Get user memory"""
-    memory_file = f'user_data/{user_id}_memory.json'
-    if os.path.exists(memory_file):
-        try:
-            with open(memory_file, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return {"interests": [], "last_topics": [], "preferences": {}}
+    return migrate_memory(user_memory.get(user_id))
 
 def save_user_memory(user_id, memory):
     """Save user memory"""
-    memory_file = f'user_data/{user_id}_memory.json'
-    with open(memory_file, 'w') as f:
-        json.dump(memory, f, indent=2)
+    user_memory.put(user_id, memory)
 
 def update_user_memory(user_id, user_input, response):
-    """Simple memory update"""
-    memory = get_user_memory(user_id)
-    
-    # Track topics (simple keyword extraction)
-    keywords = [word for word in user_input.lower().split() if len(word) > 4]
-    memory['last_topics'] = keywords[:5]
+    """Remember facts, preferences and topics from the user's message"""
+    def _update(memory):
+        upgraded = "items" not in (memory or {})
+        memory = migrate_memory(memory)
+        # Most messages only reinforce topics; don't dirty the key for that
+        if update_memory(memory, user_input) or upgraded:
+            return memory
+        return None
     
-    # Save
-    save_user_memory(user_id, memory)
+    user_memory.update(user_id, _update)
 
 # Voice API routes
 @app.route('/api/voice/status', methods=['GET'])
@@ -842,20 +1070,84 @@ def process_voice():
     # This endpoint just forwards to chat API
     # The actual processing happens in the browser with Web Speech API
     return jsonify({'success': True, 'command': command})
-@app.route('/api/voice/synthesize', methods=['POST'])
+
+@app.route('/api/voice/synthesize', methods=['GET', 'POST'])
 @login_required
 def synthesize_speech():
-    """Get text to be spoken by browser"""
-    data = request.json
-    text = data.get('text', '')
+    """Speak text with the server's TTS engine.
+    
+    Audio is streamed as the engine produces it, then kept in the TTS cache,
+    so repeated texts are served from disk. GET (?text=&voice=&engine=) lets
+    an <audio> element play it directly and the browser cache it by ETag.
+    """
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    text = (data.get('text') or '').strip()
+    engine = data.get('engine') or synth.DEFAULT_ENGINE
+    voice = data.get('voice') or synth.default_voice(engine)
     
+    # The voice becomes an engine argument (a model path for piper), so only known ones pass
+    if voice not in synth.voices(engine):
+        return jsonify({'error': 'Unknown voice'}), 400
     if not text:
         return jsonify({'error': 'No text provided'}), 400
+    if len(text) > app.config['TTS_MAX_CHARS']:
+        return jsonify({'error': f"Text longer than {app.config['TTS_MAX_CHARS']} characters"}), 400
+    if engine not in TTS_ENGINES:
+        return jsonify({'error': f'TTS engine {engine!r} is not available', 'engines': TTS_ENGINES}), 503
     
-    return jsonify({
-        'success': True,
-        'text': text
-    })
+    # The key is a hash of everything that shapes the audio, so it is also a strong ETag
+    key = tts_cache.key(text, voice, engine)
+    headers = {
+        'ETag': f'"{key}"',
+        'Cache-Control': f"private, max-age={app.config['TTS_MAX_AGE']}",
+    }
+    if key in request.if_none_match:
+        return Response(status=304, headers=headers)
+    
+    audio = tts_cache.get(text, voice, engine)
+    if audio is not None:
+        return Response(audio, mimetype=synth.MIMETYPES[engine], headers=headers)
+    
+    lease = acquire_slot('tts', app.config['TTS_SLOTS'], app.config['TTS_LEASE_TTL'],
+                         wait=app.config['CANCEL_POLL_INTERVAL'] * 2)
+    if lease is None:
+        return jsonify({'error': 'Voice synthesis is busy'}), 429, {'Retry-After': '1'}
+    
+    # Wait for the first chunk before answering, so a failing engine is a 502
+    requested = time.perf_counter()
+    produced = synth.stream(text, voice, engine)
+    try:
+        first = next(produced)
+    except Exception as e:
+        store.release_lease('tts', lease)
+        print(f"TTS error: {e}")
+        return jsonify({'error': 'Speech synthesis failed'}), 502
+    metrics.TTS_FIRST_AUDIO_SECONDS.observe(time.perf_counter() - requested, engine)
+    
+    def audio_stream():
+        chunks = [first]
+        finished = False
+        try:
+            yield first
+            for chunk in produced:
+                chunks.append(chunk)
+                yield chunk
+            finished = True
+        except Exception as e:
+            # Headers are already out; the client gets a truncated clip
+            print(f"TTS error: {e}")
+        finally:
+            produced.close()
+        # Only a clip the engine finished cleanly is cached and served again
+        if finished:
+            tts_cache.put(text, b"".join(chunks), voice, engine)
+    
+    # No Content-Length: sent chunked, audio starts playing before synthesis ends.
+    # The stream owns the TTS slot and frees it when the response closes.
+    headers['X-Accel-Buffering'] = 'no'
+    stream = Response(stream_with_context(audio_stream()), mimetype=synth.MIMETYPES[engine], headers=headers)
+    stream.call_on_close(lambda: store.release_lease('tts', lease))
+    return stream
 
 # Status API
 @app.route('/api/status', methods=['GET'])
@@ -865,7 +1157,13 @@ def get_status():
         'authenticated': user is not None,
         'username': user['username'] if user else None,
         'ai_loaded': ai_modules_loaded,
-        'users_count': len(users),
+        'ai_ready': bool(llm) and llm.readiness()['ready'],
+        'llm_readiness': llm.readiness() if llm else None,
+        'users_count': len(store.keys('users')),
+        'cache': store.stats(),
+        'llm': llm.stats() if llm else None,
+        'summarizer': summarizer.stats(),
+        'memory_writes': user_memory.stats(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -886,25 +1184,143 @@ def update_profile():
     user_id = session['user_id']
     data = request.json
     
-    if user_id in users:
+    def _update(user):
         # Update allowed fields
         if 'email' in data:
-            users[user_id]['email'] = data['email'].strip()
+            user['email'] = data['email'].strip()
         
         if 'preferences' in data:
-            users[user_id]['preferences'] = data['preferences']
+            user['preferences'] = data['preferences']
         
-        save_users()
+        return user
+    
+    if store.get('users', user_id):
+        store.update('users', user_id, _update)
+        session_users.pop(user_id)
         return jsonify({'success': True})
     
     return jsonify({'error': 'User not found'}), 404
 
+# Duplex voice sessions: PCM in, transcript / reply / audio out (see web_ui/voice_session.py)
+def voice_reply(user_id, username, text, cancelled):
+    """The assistant's answer to a voice session transcript; None if `cancelled` was set"""
+    print(f"🎙️ [{username}]: {text}")
+    plan = route_intent(text, username)
+    if plan['agent'] == 'answer':
+        add_to_history(user_id, text, plan['response'])
+        return plan['response']
+    
+    if not (ai_modules_loaded and llm):
+        response = generate_smart_response(text)
+        add_to_history(user_id, text, response)
+        return response
+    
+    summarizer.mark_demand()
+    generation = start_generation(user_id)
+    with metrics.QUEUE_WAIT_SECONDS.time():
+        lease = acquire_llm_lease(wait=app.config['CANCEL_POLL_INTERVAL'] * 2)
+    if lease is None:
+        return "I'm busy with someone else right now. Ask me again in a moment."
+    
+    waiting = None
+    try:
+        prompt = build_chat_prompt(user_id, username, text, text)
+        waiting = wait_for_generation(user_id, generation, prompt, text)
+        # Drive the keep-alive generator; each step is one poll interval
+        while True:
+            next(waiting)
+            if cancelled.is_set():
+                return None
+    except StopIteration as done:
+        response = done.value
+    except GenerationCancelled:
+        return None
+    except GenerationTimeout:
+        print(f"⏱️ [{username}]: LLM exceeded {app.config['CHAT_DEADLINE']}s, using fallback")
+        response = generate_smart_response(text)
+    except Exception as e:
+        print(f"AI error: {e}")
+        response = random.choice([
+            "I'm processing that request. Give me a moment.",
+            "Interesting! Let me think about that.",
+            "I'm working on your question.",
+            "Thanks for asking! Let me formulate a response."
+        ])
+    finally:
+        if waiting is not None:
+            waiting.close()
+        store.release_lease('llm', lease)
+    
+    update_user_memory(user_id, text, response)
+    add_to_history(user_id, text, response)
+    summarizer.schedule(user_id)
+    return response
+
+def voice_speech(sentence):
+    """Audio chunks for one sentence of a voice session reply, within the TTS slot limit"""
+    # A voice reply is worth waiting a little for, unlike a one-off request
+    lease = acquire_slot('tts', app.config['TTS_SLOTS'], app.config['TTS_LEASE_TTL'], wait=10)
+    if lease is None:
+        print("⚠️ No TTS slot for a voice session sentence, skipped")
+        return
+    try:
+        yield from tts_cache.stream(sentence, None, TTS_ENGINES[0])
+    finally:
+        store.release_lease('tts', lease)
+
+if WEBSOCKET_SUPPORT and not HASH_WORKER:
+    sock = Sock(app)
+    
+    @sock.route('/ws/voice')
+    def voice_socket(ws):
+        """One duplex voice session per connection"""
+        user = get_current_user()
+        if not user:
+            ws.close(reason=1008, message='Login required')
+            return
+        if not TTS_ENGINES:
+            ws.send(json.dumps({'type': 'error', 'error': 'No TTS engine on the server'}))
+            ws.close()
+            return
+        
+        user_id, username = session['user_id'], session.get('username', 'User')
+        stt_pool.warm()
+        voice_session = VoiceSession(
+            send=ws.send,
+            respond=lambda text, cancelled: voice_reply(user_id, username, text, cancelled),
+            speak=voice_speech,
+            stt=stt_pool,
+            mimetype=synth.MIMETYPES[TTS_ENGINES[0]]
+        )
+        voice_session.start()
+        try:
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+                if isinstance(message, bytes):
+                    voice_session.feed(message)
+                    continue
+                try:
+                    control = json.loads(message)
+                except ValueError:
+                    continue  # not a control frame, ignore it
+                if isinstance(control, dict) and control.get('type') == 'stop':
+                    voice_session.interrupt()
+        except Exception as e:
+            # ConnectionClosed when the tab goes away
+            print(f"🎙️ [{username}]: voice session ended ({type(e).__name__})")
+        finally:
+            voice_session.close()
+
 @app.route('/api/voice/supported', methods=['GET'])
 def check_voice_support():
     """Check if voice features are supported"""
     return jsonify({
         'web_speech_api': True,
-        'browser_supported': True
+        'browser_supported': True,
+        'server_tts': TTS_ENGINES,
+        'voice_sessions': WEBSOCKET_SUPPORT and bool(TTS_ENGINES)
     })
 
 # Serve static files
@@ -932,6 +1348,26 @@ def before_request():
         if 'user_id' not in session:
             print(f"⚠️ {request.path}: No session, redirecting to login")
 
+# Metrics: request latency per route and the /metrics endpoint, only when enabled
+if metrics.ENABLED:
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            # Rule, not path, so per-file URLs share one series
+            labels = (request.url_rule.rule if request.url_rule else 'unmatched', request.method, response.status_code)
+            # Streamed chat replies are only done once the body has been sent
+            response.call_on_close(lambda: metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, *labels))
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 def main():
     """Start the server"""
     print("=" * 50)
@@ -0,0 +1,341 @@
+# web_ui/cache.py - Memory-bounded LRU cache in front of the state store
+import atexit
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from echomind import metrics
+from web_ui import store as store_module
+from web_ui.store import StateStore, ShardedLock
+
+# Rough per-entry bookkeeping cost on top of the JSON size
+ENTRY_OVERHEAD = 200
+
+
+class CachedStore(StateStore):
+    """Keeps recently used documents in memory under a byte budget.
+
+    Least recently used and idle entries are dropped and reloaded lazily from
+    the backing store on next access. With a shared backend every hit is
+    checked against the stored version so other workers' writes are seen.
+    """
+
+    def __init__(self, backend, kinds, max_bytes=64 * 1024 * 1024, idle_seconds=900):
+        self.backend = backend
+        self.shared = backend.shared
+        self.kinds = set(kinds)
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+
+        # (kind, key) -> [value, size, version, last_used], oldest first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._kind_bytes = {kind: 0 for kind in self.kinds}
+        self._lock = threading.Lock()
+        self._key_locks = ShardedLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---- cache bookkeeping ----
+
+    def _drop(self, cache_key):
+        # Caller holds self._lock
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+            self._kind_bytes[cache_key[0]] -= entry[1]
+
+    def _evict(self, now):
+        # Caller holds self._lock
+        idle_before = now - self.idle_seconds
+        while self._entries:
+            cache_key, entry = next(iter(self._entries.items()))
+            if self._bytes <= self.max_bytes and entry[3] >= idle_before:
+                break
+            self._drop(cache_key)
+            self.evictions += 1
+
+    def _remember(self, kind, key, value, version):
+        size = len(json.dumps(value)) + ENTRY_OVERHEAD
+        now = time.time()
+        with self._lock:
+            self._drop((kind, key))
+            if size <= self.max_bytes:
+                self._entries[(kind, key)] = [value, size, version, now]
+                self._bytes += size
+                self._kind_bytes[kind] += size
+            self._evict(now)
+
+    def _forget(self, kind, key):
+        with self._lock:
+            self._drop((kind, key))
+
+    def stats(self):
+        """Memory-usage gauges for /api/status"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'bytes_by_kind': dict(self._kind_bytes),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    # ---- StateStore ----
+
+    def get(self, kind, key, default=None):
+        if kind not in self.kinds:
+            return self.backend.get(kind, key, default)
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None:
+                entry[3] = now
+                self._entries.move_to_end((kind, key))
+            self._evict(now)
+
+        if entry is not None and self.shared and self.backend.version(kind, key) != entry[2]:
+            entry = None
+
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            value = entry[0]
+        else:
+            with self._key_locks(kind, key):
+                value, version = self.backend.get_versioned(kind, key)
+                self._remember(kind, key, value, version)
+            with self._lock:
+                self.misses += 1
+
+        return copy.deepcopy(value) if value is not None else default
+
+    def put(self, kind, key, value):
+        with self._key_locks(kind, key):
+            self.backend.put(kind, key, value)
+            if kind in self.kinds:
+                self._written(kind, key, copy.deepcopy(value))
+
+    def put_many(self, kind, items):
+        self.backend.put_many(kind, items)
+        if kind in self.kinds:
+            with self._lock:
+                for key, _ in items:
+                    self._drop((kind, key))
+
+    def update(self, kind, key, fn, default=None):
+        with self._key_locks(kind, key):
+            value = self.backend.update(kind, key, fn, default)
+            if kind in self.kinds:
+                self._written(kind, key, copy.deepcopy(value))
+            return value
+
+    def delete(self, kind, key):
+        with self._key_locks(kind, key):
+            self.backend.delete(kind, key)
+            if kind in self.kinds:
+                self._written(kind, key, None)
+
+    def _written(self, kind, key, value):
+        if self.shared:
+            # The new version is only known to the backend; reload on next read
+            self._forget(kind, key)
+        else:
+            self._remember(kind, key, value, None)
+
+    def keys(self, kind):
+        return self.backend.keys(kind)
+
+    def items(self, kind):
+        return self.backend.items(kind)
+
+    def get_versioned(self, kind, key):
+        return self.backend.get_versioned(kind, key)
+
+    def version(self, kind, key):
+        return self.backend.version(kind, key)
+
+    def acquire_lease(self, name, slots=1, ttl=300):
+        return self.backend.acquire_lease(name, slots, ttl)
+
+    def release_lease(self, name, token):
+        self.backend.release_lease(name, token)
+
+    def incr(self, name, window, amount=1):
+        return self.backend.incr(name, window, amount)
+
+
+class TTLCache:
+    """Small LRU of values that expire `ttl` seconds after they were stored"""
+
+    def __init__(self, max_entries=10000, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class WriteBehind:
+    """Buffers writes to one kind and flushes them to the store in the background.
+
+    Durability modes:
+      every    - write through on each put (old behaviour)
+      batched  - dirty keys are flushed every `interval` seconds; repeated
+                 writes to a key in between become one store write
+      shutdown - flushed only when the process exits (or flush() is called)
+
+    Only dirty values are held here; clean reads go to the store (and its
+    cache). With `merge`, a flush combines our value with what is stored, so
+    other workers' writes to the same key are not lost.
+    """
+
+    MODES = ('every', 'batched', 'shutdown')
+
+    def __init__(self, store, kind, mode='batched', interval=2.0, merge=None):
+        if mode not in self.MODES:
+            raise ValueError(f"durability mode must be one of {', '.join(self.MODES)}")
+        self.store = store
+        self.kind = kind
+        self.mode = mode
+        self.interval = interval
+        self.merge = merge
+
+        self._dirty = {}     # key -> value waiting to be written
+        self._flushing = {}  # key -> value being written right now
+        self._lock = threading.Lock()
+        self._key_locks = ShardedLock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._started = False
+
+        self.puts = 0
+        self.writes = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.errors = 0
+        self._latency = []  # recent flush durations, seconds
+
+    def _start(self):
+        # Lazily, so importing processes that never write start nothing
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        atexit.register(self.flush)
+        if self.mode == 'batched':
+            self._thread = threading.Thread(target=self._run, name=f"flush-{self.kind}", daemon=True)
+            self._thread.start()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._dirty:
+                return copy.deepcopy(self._dirty[key])
+            if key in self._flushing:
+                return copy.deepcopy(self._flushing[key])
+        return self.store.get(self.kind, key, default)
+
+    def put(self, key, value):
+        self._start()
+        with self._lock:
+            self._dirty[key] = copy.deepcopy(value)
+            self.puts += 1
+        if self.mode == 'every':
+            self.flush()
+
+    def update(self, key, fn, default=None):
+        """Buffer fn(current value); fn returns None when there is nothing to write"""
+        with self._key_locks(key):
+            value = fn(self.get(key, default))
+            if value is not None:
+                self.put(key, value)
+            return value
+
+    def flush(self):
+        """Write every dirty key now"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._flushing, self._dirty = self._dirty, {}
+            started = time.perf_counter()
+            # Only this thread's writes: the flush runs here, other requests elsewhere
+            syncs_before = store_module.thread_syncs()
+
+            for key, value in list(self._flushing.items()):
+                try:
+                    if self.merge is not None:
+                        self.store.update(self.kind, key, lambda current: self.merge(current, value))
+                    else:
+                        self.store.put(self.kind, key, value)
+                    self.writes += 1
+                except Exception as e:
+                    print(f"⚠️ Could not flush {self.kind} {key}: {e}")
+                    self.errors += 1
+                    with self._lock:
+                        self._dirty.setdefault(key, value)  # retry next time unless rewritten
+
+            elapsed = time.perf_counter() - started
+            syncs = store_module.thread_syncs() - syncs_before
+            with self._lock:
+                self._flushing = {}
+                self.flushes += 1
+                self.fsyncs += syncs
+                self._latency.append(elapsed)
+                del self._latency[:-1000]
+            metrics.FLUSH_SECONDS.observe(elapsed, self.kind)
+            metrics.FLUSH_SYNCS.inc(syncs, self.kind)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Flush error ({self.kind}): {e}")
+
+    def stats(self):
+        """Write counters and flush latency for /api/status"""
+        with self._lock:
+            latency = sorted(self._latency)
+            pick = lambda pct: round(latency[min(len(latency) - 1, int(pct / 100 * len(latency)))] * 1000, 2) if latency else 0.0
+            return {
+                'mode': self.mode,
+                'dirty': len(self._dirty),
+                'puts': self.puts,
+                'writes': self.writes,
+                'coalesced': self.puts - self.writes - len(self._dirty) - len(self._flushing),
+                'flushes': self.flushes,
+                'fsyncs': self.fsyncs,
+                'errors': self.errors,
+                'flush_ms_p50': pick(50),
+                'flush_ms_p99': pick(99),
+            }
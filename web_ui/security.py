@@ -0,0 +1,80 @@
+# web_ui/security.py - Password hashing off the request threads
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+# Empty means Werkzeug's default. Existing hashes verify whatever this is.
+PASSWORD_METHOD = os.environ.get('ECHOMIND_PASSWORD_METHOD', '')
+HASH_WORKERS = int(os.environ.get('ECHOMIND_HASH_WORKERS', '2'))
+HASH_QUEUE = int(os.environ.get('ECHOMIND_HASH_QUEUE', '32'))
+
+
+class HasherBusy(Exception):
+    """More KDF jobs are waiting than the queue allows"""
+
+
+def _generate(password, method):
+    if method:
+        return generate_password_hash(password, method=method)
+    return generate_password_hash(password)
+
+
+def _check(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+class PasswordHasher:
+    """Runs the deliberately slow KDFs in a small process pool.
+
+    At most `workers` hashes run at once and at most `queue` more wait; past
+    that callers get HasherBusy instead of piling up request threads.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue=HASH_QUEUE, method=PASSWORD_METHOD, wait=5):
+        self.workers = workers
+        self.method = method
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: never fork a process that already runs server threads
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            raise HasherBusy()
+        try:
+            return self._get_pool().submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool next time and do this one here
+            print("⚠️ Password hashing pool crashed, restarting it")
+            with self._pool_lock:
+                self._pool = None
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_generate, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(_check, pwhash, password)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,417 @@
+# web_ui/store.py - Pluggable state store shared by web workers
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from urllib.parse import quote, unquote
+
+
+class StateStore:
+    """JSON documents addressed by (kind, key)"""
+
+    # True when several worker processes can use the store at the same time
+    shared = False
+
+    def get(self, kind, key, default=None):
+        raise NotImplementedError
+
+    def put(self, kind, key, value):
+        raise NotImplementedError
+
+    def delete(self, kind, key):
+        raise NotImplementedError
+
+    def keys(self, kind):
+        raise NotImplementedError
+
+    def items(self, kind):
+        for key in self.keys(kind):
+            value = self.get(kind, key)
+            if value is not None:
+                yield key, value
+
+    def update(self, kind, key, fn, default=None):
+        """Atomic read-modify-write: fn gets the current value and returns the new one"""
+        raise NotImplementedError
+
+    def acquire_lease(self, name, slots=1, ttl=300):
+        """Take one of `slots` leases on `name`. Returns a token, or None if all are taken"""
+        raise NotImplementedError
+
+    def release_lease(self, name, token):
+        raise NotImplementedError
+
+    def incr(self, name, window, amount=1):
+        """Add to a counter that resets `window` seconds after it was created; returns the new count"""
+        raise NotImplementedError
+
+    def get_versioned(self, kind, key):
+        """(value, version) - version changes on every write, None if the store has no versions"""
+        return self.get(kind, key), None
+
+    def version(self, kind, key):
+        return None
+
+    def put_many(self, kind, items):
+        """Bulk put of (key, value) pairs"""
+        for key, value in items:
+            self.put(kind, key, value)
+
+    def import_from(self, other, kinds):
+        """Copy every document of the given kinds from another store"""
+        count = 0
+        for kind in kinds:
+            items = list(other.items(kind))
+            self.put_many(kind, items)
+            count += len(items)
+        return count
+
+
+class ShardedLock:
+    """Fixed pool of locks picked by key hash, so unrelated keys rarely wait on each other"""
+
+    def __init__(self, shards=64):
+        self._locks = [threading.RLock() for _ in range(shards)]
+
+    def __call__(self, *key):
+        return self._locks[hash(key) % len(self._locks)]
+
+
+# Durable writes made by each thread: fsyncs for JSON files, commits for SQLite
+_syncs = threading.local()
+
+
+def _synced():
+    _syncs.count = getattr(_syncs, 'count', 0) + 1
+
+
+def thread_syncs():
+    """Durable writes made so far by the calling thread, so a caller can count its own"""
+    return getattr(_syncs, 'count', 0)
+
+
+def atomic_write_json(path, value):
+    """Write to a temp file next to `path` and rename it over the original"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+            _synced()
+        os.replace(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class JSONFileStore(StateStore):
+    """The original user_data/ layout - one process only"""
+
+    DOCUMENTS = {
+        'users': os.path.join('users', '{key}.json'),
+        'usernames': os.path.join('usernames', '{key}.json'),
+        'conversations': '{key}_conversations.json',
+        'files': '{key}_files.json',
+        'file': os.path.join('records', '{key}.json'),
+        'memory': '{key}_memory.json',
+        'file_contents': os.path.join('files', '{key}.json'),
+    }
+    # Whole-kind files of older versions, split into DOCUMENTS on open
+    LEGACY_COLLECTIONS = {
+        'users': 'users.json',
+        'usernames': 'usernames.json',
+    }
+
+    def __init__(self, root='user_data', migrate=True):
+        """migrate=False opens the directory as it is, e.g. as an import source:
+        nothing is created or renamed and legacy collections are read in place"""
+        self.root = root
+        # Writers lock only their own (kind, key); readers never lock because
+        # files are replaced atomically
+        self._locks = ShardedLock()
+        self._lease_lock = threading.Lock()
+        self._leases = {}
+        self._counters = {}
+        self._legacy = {}
+        if not migrate:
+            for kind, name in self.LEGACY_COLLECTIONS.items():
+                collection = self._read(os.path.join(root, name), {})
+                self._legacy[kind] = collection if isinstance(collection, dict) else {}
+            return
+        for template in self.DOCUMENTS.values():
+            os.makedirs(os.path.join(root, os.path.dirname(template)), exist_ok=True)
+        self._split_legacy_collections()
+
+    def _split_legacy_collections(self):
+        for kind, name in self.LEGACY_COLLECTIONS.items():
+            path = os.path.join(self.root, name)
+            if not os.path.exists(path):
+                continue
+            collection = self._read(path, None)
+            if not isinstance(collection, dict):
+                print(f"⚠️ Could not read {path}, left in place")
+                continue
+            for key, value in collection.items():
+                # A per-key file is newer than the legacy copy
+                if not os.path.exists(self._path(kind, key)):
+                    atomic_write_json(self._path(kind, key), value)
+            os.replace(path, path + '.migrated')
+            print(f"✓ Split {name} into {len(collection)} {kind} records")
+
+    def _template(self, kind):
+        return self.DOCUMENTS.get(kind, '{key}_' + kind + '.json')
+
+    def _path(self, kind, key):
+        # Usernames can hold any character; ids and hex keys are left as they are
+        return os.path.join(self.root, self._template(kind).format(key=quote(key, safe='')))
+
+    def _read(self, path, default):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except:
+            return default
+
+    def get(self, kind, key, default=None):
+        legacy = self._legacy.get(kind)
+        if legacy and not os.path.exists(self._path(kind, key)):
+            # A per-key file is newer than the legacy copy
+            return legacy.get(key, default)
+        return self._read(self._path(kind, key), default)
+
+    def put(self, kind, key, value):
+        with self._locks(kind, key):
+            atomic_write_json(self._path(kind, key), value)
+
+    def delete(self, kind, key):
+        with self._locks(kind, key):
+            path = self._path(kind, key)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def keys(self, kind):
+        prefix, suffix = self._template(kind).split('{key}')
+        directory = os.path.join(self.root, os.path.dirname(prefix))
+        prefix = os.path.basename(prefix)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            names = []
+        keys = [
+            unquote(name[len(prefix):len(name) - len(suffix)])
+            for name in names
+            if name.startswith(prefix) and name.endswith(suffix) and len(name) > len(prefix) + len(suffix)
+        ]
+        legacy = self._legacy.get(kind)
+        if legacy:
+            keys += legacy.keys() - set(keys)
+        return keys
+
+    def update(self, kind, key, fn, default=None):
+        with self._locks(kind, key):
+            value = fn(self.get(kind, key, default))
+            self.put(kind, key, value)
+            return value
+
+    def acquire_lease(self, name, slots=1, ttl=300):
+        now = time.time()
+        with self._lease_lock:
+            leases = self._leases.setdefault(name, {})
+            for token, expires in list(leases.items()):
+                if expires < now:
+                    del leases[token]
+            if len(leases) >= slots:
+                return None
+            token = secrets.token_hex(8)
+            leases[token] = now + ttl
+            return token
+
+    def release_lease(self, name, token):
+        with self._lease_lock:
+            self._leases.get(name, {}).pop(token, None)
+
+    def incr(self, name, window, amount=1):
+        now = time.time()
+        with self._lease_lock:
+            if len(self._counters) > 10000:
+                self._counters = {k: c for k, c in self._counters.items() if c[1] >= now}
+            counter = self._counters.get(name)
+            if counter is None or counter[1] < now:
+                counter = self._counters[name] = [0, now + window]
+            counter[0] += amount
+            return counter[0]
+
+
+class SQLiteStore(StateStore):
+    """Single SQLite file in WAL mode - safe for several worker processes"""
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS state ('
+            'kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, '
+            'version INTEGER NOT NULL DEFAULT 1, PRIMARY KEY (kind, key))'
+        )
+        try:
+            conn.execute('ALTER TABLE state ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+        except sqlite3.OperationalError:
+            pass  # already there
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            'token TEXT PRIMARY KEY, name TEXT NOT NULL, expires REAL NOT NULL)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS counters ('
+            'name TEXT PRIMARY KEY, count INTEGER NOT NULL, expires REAL NOT NULL)'
+        )
+
+    def _conn(self):
+        # One connection per thread, reopened after fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self, fn):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(conn)
+        except:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        _synced()
+        return result
+
+    def get(self, kind, key, default=None):
+        row = self._conn().execute(
+            'SELECT value FROM state WHERE kind = ? AND key = ?', (kind, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def get_versioned(self, kind, key):
+        row = self._conn().execute(
+            'SELECT value, version FROM state WHERE kind = ? AND key = ?', (kind, key)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, 0)
+
+    def version(self, kind, key):
+        row = self._conn().execute(
+            'SELECT version FROM state WHERE kind = ? AND key = ?', (kind, key)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def put(self, kind, key, value, conn=None):
+        # Without a transaction's conn the statement commits on its own
+        if conn is None:
+            _synced()
+        (conn or self._conn()).execute(
+            # Random rather than incrementing so a delete + re-insert never repeats a version
+            'INSERT INTO state (kind, key, value, version) VALUES (?, ?, ?, random()) '
+            'ON CONFLICT (kind, key) DO UPDATE SET value = excluded.value, version = excluded.version',
+            (kind, key, json.dumps(value))
+        )
+
+    def put_many(self, kind, items):
+        def _put_many(conn):
+            for key, value in items:
+                self.put(kind, key, value, conn)
+        self._transaction(_put_many)
+
+    def delete(self, kind, key):
+        self._conn().execute('DELETE FROM state WHERE kind = ? AND key = ?', (kind, key))
+        _synced()
+
+    def keys(self, kind):
+        rows = self._conn().execute('SELECT key FROM state WHERE kind = ?', (kind,))
+        return [row[0] for row in rows]
+
+    def items(self, kind):
+        rows = self._conn().execute('SELECT key, value FROM state WHERE kind = ?', (kind,))
+        for key, value in rows.fetchall():
+            yield key, json.loads(value)
+
+    def update(self, kind, key, fn, default=None):
+        def _update(conn):
+            row = conn.execute(
+                'SELECT value FROM state WHERE kind = ? AND key = ?', (kind, key)
+            ).fetchone()
+            value = fn(json.loads(row[0]) if row else default)
+            self.put(kind, key, value, conn)
+            return value
+        return self._transaction(_update)
+
+    def acquire_lease(self, name, slots=1, ttl=300):
+        def _acquire(conn):
+            now = time.time()
+            conn.execute('DELETE FROM leases WHERE expires < ?', (now,))
+            taken = conn.execute('SELECT COUNT(*) FROM leases WHERE name = ?', (name,)).fetchone()[0]
+            if taken >= slots:
+                return None
+            token = secrets.token_hex(8)
+            conn.execute(
+                'INSERT INTO leases (token, name, expires) VALUES (?, ?, ?)',
+                (token, name, now + ttl)
+            )
+            return token
+        return self._transaction(_acquire)
+
+    def release_lease(self, name, token):
+        self._conn().execute('DELETE FROM leases WHERE token = ? AND name = ?', (token, name))
+
+    def incr(self, name, window, amount=1):
+        def _incr(conn):
+            now = time.time()
+            conn.execute('DELETE FROM counters WHERE name = ? AND expires < ?', (name, now))
+            conn.execute(
+                'INSERT INTO counters (name, count, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET count = count + excluded.count',
+                (name, amount, now + window)
+            )
+            return conn.execute('SELECT count FROM counters WHERE name = ?', (name,)).fetchone()[0]
+        return self._transaction(_incr)
+
+
+def open_store(url):
+    """Build a store from a URL: json://<dir> or sqlite:///<path>"""
+    if not url or url.startswith('json://'):
+        return JSONFileStore(url[len('json://'):] if url else 'user_data')
+    if url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported state store URL: {url}")
+
+
+def load_secret_key(path):
+    """Return the persisted session signing key, creating it on first use"""
+    for _ in range(50):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(path, 'r') as f:
+                key = f.read().strip()
+            if key:
+                return key
+            # Another worker created the file and is still writing it
+            time.sleep(0.05)
+            continue
+        key = secrets.token_hex(32)
+        with os.fdopen(fd, 'w') as f:
+            f.write(key)
+        return key
+    raise RuntimeError(f"Secret key file {path} is empty")
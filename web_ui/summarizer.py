@@ -0,0 +1,175 @@
+# web_ui/summarizer.py - Rolling per-user conversation summaries
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from brain.prompts import SUMMARY_PROMPT
+
+# Stop folding once an assistant reply gets this long; the gist is enough
+TURN_CHARS = 600
+
+
+class ConversationSummarizer:
+    """Folds the oldest turns of a conversation into a running summary.
+
+    The summary lives next to the conversation (kind 'summaries', same key).
+    Jobs only run while no one is waiting for the LLM: each one takes an LLM
+    slot without waiting for it, and gives it back - cancelling the
+    generation - as soon as any worker marks user demand.
+
+    Demand is a timestamp in memory. With a shared store it is also written
+    to meta 'llm_demand', but only while some worker has a summary running,
+    so a chat message costs no extra write the rest of the time.
+    """
+
+    def __init__(self, store, keep_turns=2, batch=8, max_words=150,
+                 idle_seconds=2.0, slots=1, lease_ttl=300, poll=0.25):
+        self.store = store
+        self.keep_turns = keep_turns
+        self.batch = batch
+        self.max_words = max_words
+        self.idle_seconds = idle_seconds
+        self.slots = slots
+        self.lease_ttl = lease_ttl
+        self.poll = poll
+        self.llm = None
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._demand = 0
+
+        self.folded = 0
+        self.preempted = 0
+
+    # ---- called from request threads ----
+
+    def start(self, llm):
+        self.llm = llm
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="summarizer", daemon=True)
+            self._thread.start()
+
+    def schedule(self, user_id):
+        """Queue a fold for the user after a new turn (deduplicated)"""
+        with self._cond:
+            if user_id not in self._pending:
+                self._pending.append(user_id)
+                self._cond.notify()
+
+    def mark_demand(self):
+        """A user request wants the LLM; background jobs back off"""
+        self._demand = now = time.time()
+        # Other workers only need telling while one of them is summarizing
+        if self.store.shared and (self.store.get('meta', 'summary_running') or 0) > now:
+            self.store.put('meta', 'llm_demand', now)
+
+    def get(self, user_id):
+        summary = self.store.get('summaries', user_id)
+        return summary['text'] if summary else ""
+
+    def clear(self, user_id):
+        self.store.delete('summaries', user_id)
+
+    def unfolded(self, history, summary):
+        """Turns older than the last keep_turns that the summary does not cover yet"""
+        until = summary['until'] if summary else ""
+        older = history[:-self.keep_turns] if self.keep_turns else history
+        return [turn for turn in older if turn.get('timestamp', '') > until]
+
+    # ---- background ----
+
+    def _last_demand(self):
+        if not self.store.shared:
+            return self._demand
+        return max(self._demand, self.store.get('meta', 'llm_demand') or 0)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                user_id = self._pending[0]
+
+            # Idle priority: wait for a quiet moment and a free slot
+            if time.time() - self._last_demand() < self.idle_seconds:
+                time.sleep(self.idle_seconds)
+                continue
+            lease = self.store.acquire_lease('llm', self.slots, self.lease_ttl)
+            if lease is None:
+                time.sleep(self.idle_seconds)
+                continue
+
+            try:
+                done = self._fold(user_id)
+            except Exception as e:
+                print(f"⚠️ Summary failed for {user_id}: {e}")
+                done = True
+            finally:
+                self.store.release_lease('llm', lease)
+
+            if done:
+                with self._cond:
+                    if self._pending and self._pending[0] == user_id:
+                        self._pending.pop(0)
+
+    def _fold(self, user_id):
+        """Fold one batch; False if the user should stay queued"""
+        if self.llm is None:
+            return True
+        history = self.store.get('conversations', user_id, [])
+        summary = self.store.get('summaries', user_id)
+        turns = self.unfolded(history, summary)[:self.batch]
+        if not turns:
+            return True
+
+        turns_text = ""
+        for turn in turns:
+            turns_text += f"User: {turn['user']}\nAssistant: {turn['assistant'][:TURN_CHARS]}\n"
+        prompt = SUMMARY_PROMPT.format(
+            summary=summary['text'] if summary else "(nothing yet)",
+            turns=turns_text.strip(),
+            max_words=self.max_words,
+        ).strip()
+
+        started = time.time()
+        if self.store.shared:
+            self.store.put('meta', 'summary_running', started + self.lease_ttl)
+        future = self.llm.submit(prompt, "summary", session=user_id)
+        try:
+            while True:
+                try:
+                    text = future.result(timeout=self.poll).strip()
+                    break
+                except FutureTimeout:
+                    pass
+                if self._last_demand() > started:
+                    self.preempted += 1
+                    return False
+        finally:
+            future.cancel()
+            if self.store.shared:
+                self.store.delete('meta', 'summary_running')
+
+        until = turns[-1]['timestamp']
+        previous = summary['until'] if summary else None
+
+        # Conversation cleared meanwhile
+        if not any(turn.get('timestamp') == until for turn in self.store.get('conversations', user_id, [])):
+            return True
+
+        def _update(current):
+            # Someone else folded meanwhile: keep theirs
+            if (current['until'] if current else None) != previous:
+                return current
+            return {'text': text, 'until': until, 'updated': time.time()}
+
+        self.store.update('summaries', user_id, _update)
+        self.folded += len(turns)
+        # More to fold: stay queued for the next quiet moment
+        return len(self.unfolded(history, {'until': until})) == 0
+
+    def stats(self):
+        with self._cond:
+            queued = len(self._pending)
+        return {'queued': queued, 'folded_turns': self.folded, 'preempted': self.preempted}
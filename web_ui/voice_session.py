@@ -0,0 +1,254 @@
+# web_ui/voice_session.py - Server-side voice turns over a WebSocket
+#
+# Protocol (one socket per browser tab, /ws/voice):
+#   client -> server  binary  16-bit little-endian mono PCM at 16 kHz, any block size
+#                     text    {"type": "stop"} cuts the current reply short
+#   server -> client  text    {"type": "ready" | "speech_start" | "speech_end" | "transcript" |
+#                              "response" | "audio_start" | "audio_end" | "idle" | "error", ...}
+#                     binary  audio of the sentence announced by the last audio_start
+#
+# Each session cuts the stream into utterances with an energy VAD, transcribes
+# them on the process-wide Whisper models (STTPool), asks the LLM and speaks
+# the reply sentence by sentence, so the first sentence plays while the next
+# is synthesized. Talking over the reply cancels it.
+import json
+import os
+import queue
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME = 480  # 30 ms
+SPEECH_RMS = 0.01  # never treat quieter frames as speech
+NOISE_FACTOR = 3.0  # speech must also be this much louder than the room
+START_FRAMES = 3  # 90 ms of speech opens an utterance
+END_SILENCE = float(os.environ.get("ECHOMIND_VAD_SILENCE", "0.7"))  # seconds of quiet that close it
+PRE_ROLL = 0.3  # seconds kept from before the VAD fired
+MAX_UTTERANCE = 15.0  # seconds; longer speech is cut and transcribed in pieces
+
+STT_SLOTS = int(os.environ.get("ECHOMIND_STT_SLOTS", "2"))  # concurrent transcriptions per process
+
+# A new sentence starts with a capital or digit, so "5 p.m. today" stays whole
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'])")
+
+
+def sentences(text):
+    """Split a reply where it can be spoken in pieces"""
+    return [part.strip() for part in _SENTENCE_END.split(text) if part.strip()]
+
+
+class EnergyVAD:
+    """Frame-level speech detection against an adaptive noise floor"""
+
+    def __init__(self, end_silence=END_SILENCE):
+        self.end_frames = max(1, int(end_silence * SAMPLE_RATE / FRAME))
+        self.noise = SPEECH_RMS / NOISE_FACTOR
+        self.speaking = False
+        self._run = 0
+        self._silence = 0
+
+    def update(self, rms):
+        """Feed one frame's RMS; returns 'start', 'end' or None"""
+        loud = rms > max(SPEECH_RMS, self.noise * NOISE_FACTOR)
+        if not self.speaking:
+            if not loud:
+                self.noise = 0.95 * self.noise + 0.05 * rms
+            self._run = self._run + 1 if loud else 0
+            if self._run >= START_FRAMES:
+                self.speaking, self._silence = True, 0
+                return 'start'
+            return None
+        self._silence = 0 if loud else self._silence + 1
+        if self._silence >= self.end_frames:
+            self.speaking, self._run = False, 0
+            return 'end'
+        return None
+
+
+class STTPool:
+    """One set of Whisper models per process, shared by every session.
+
+    The models are loaded once (in the background on first use) with
+    `slots` CTranslate2 workers, and at most `slots` transcriptions run at
+    a time; other sessions queue for a free one.
+    """
+
+    def __init__(self, slots=STT_SLOTS):
+        self.slots = slots
+        self._router = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(slots)
+        self._loading = None
+
+    def _load(self):
+        with self._lock:
+            if self._router is None and self._error is None:
+                try:
+                    from voice.stt_router import STTRouter
+                    self._router = STTRouter(num_workers=self.slots)
+                except Exception as e:
+                    self._error = e
+                    print(f"⚠️ Server-side speech recognition unavailable: {e}")
+        return self._router
+
+    def warm(self):
+        """Start loading the models without waiting for them"""
+        with self._lock:
+            if self._loading is None and self._router is None:
+                self._loading = threading.Thread(target=self._load, name="stt-load", daemon=True)
+                self._loading.start()
+
+    def transcribe(self, audio):
+        router = self._load()
+        if router is None:
+            raise RuntimeError(f"speech recognition unavailable: {self._error}")
+        with self._semaphore:
+            return router.transcribe(audio)
+
+    def stats(self):
+        return self._router.stats() if self._router is not None else None
+
+
+class VoiceSession:
+    """One browser's duplex voice conversation.
+
+    `send(message)` writes a str (JSON event) or bytes (audio) to the socket.
+    `respond(text, cancelled)` returns the reply to a transcript, or None if
+    the `cancelled` event was set while it waited. `speak(sentence)` yields
+    audio chunks of `mimetype`.
+    """
+
+    def __init__(self, send, respond, speak, stt, mimetype="audio/mpeg"):
+        self._send = send
+        self.respond = respond
+        self.speak = speak
+        self.stt = stt
+        self.mimetype = mimetype
+
+        self._send_lock = threading.Lock()
+        self._buffer = bytearray()
+        self._vad = EnergyVAD()
+        self._pre_roll = deque(maxlen=max(1, int(PRE_ROLL * SAMPLE_RATE / FRAME)))
+        self._utterance = []
+        self._max_frames = int(MAX_UTTERANCE * SAMPLE_RATE / FRAME)
+
+        self._turns = queue.Queue()
+        self._cancel = threading.Event()
+        self._closed = False
+        self._busy = False
+        self._thread = threading.Thread(target=self._run, name="voice-session", daemon=True)
+
+        self.turns = 0
+        self.interrupted = 0
+
+    # ---- socket side ----
+
+    def send(self, message):
+        if self._closed:
+            return
+        if isinstance(message, dict):
+            message = json.dumps(message)
+        with self._send_lock:
+            self._send(message)
+
+    def start(self):
+        self._thread.start()
+        self.send({'type': 'ready', 'sample_rate': SAMPLE_RATE, 'mimetype': self.mimetype})
+
+    def feed(self, data):
+        """Raw PCM from the client, in whatever block size it arrived"""
+        self._buffer += data
+        usable = len(self._buffer) // (FRAME * 2) * (FRAME * 2)
+        if not usable:
+            return
+        frames = np.frombuffer(bytes(self._buffer[:usable]), dtype='<i2').astype(np.float32) / 32768.0
+        del self._buffer[:usable]
+        for frame in frames.reshape(-1, FRAME):
+            self._frame(frame)
+
+    def _frame(self, frame):
+        rms = float(np.sqrt(np.dot(frame, frame) / FRAME))
+        event = self._vad.update(rms)
+        if event == 'start':
+            # Talking over the reply: stop it
+            self.interrupt()
+            self._utterance = list(self._pre_roll)
+            self.send({'type': 'speech_start'})
+        if self._vad.speaking or event == 'end':
+            self._utterance.append(frame)
+            if event == 'end' or len(self._utterance) >= self._max_frames:
+                self._finish_utterance()
+        else:
+            self._pre_roll.append(frame)
+
+    def _finish_utterance(self):
+        audio = np.concatenate(self._utterance)
+        self._utterance = []
+        self.send({'type': 'speech_end', 'seconds': round(len(audio) / SAMPLE_RATE, 2)})
+        self._turns.put(audio)
+
+    def interrupt(self):
+        """Cancel the reply being prepared or spoken"""
+        if self._busy and not self._cancel.is_set():
+            self.interrupted += 1
+        self._cancel.set()
+
+    def close(self):
+        self._closed = True
+        self._cancel.set()
+        self._turns.put(None)
+
+    # ---- worker ----
+
+    def _run(self):
+        while True:
+            audio = self._turns.get()
+            if audio is None:
+                return
+            # Only the newest utterance matters if several queued up
+            while not self._turns.empty():
+                newer = self._turns.get()
+                if newer is None:
+                    return
+                audio = newer
+            self._cancel.clear()
+            self._busy = True
+            try:
+                self._turn(audio)
+            except Exception as e:
+                print(f"Voice session error: {e}")
+                self.send({'type': 'error', 'error': str(e)})
+            finally:
+                self._busy = False
+
+    def _turn(self, audio):
+        text = self.stt.transcribe(audio).strip()
+        if len(text) < 2:
+            self.send({'type': 'idle'})
+            return
+        self.turns += 1
+        self.send({'type': 'transcript', 'text': text})
+
+        reply = self.respond(text, self._cancel)
+        if reply is None or self._cancel.is_set():
+            return
+        self.send({'type': 'response', 'text': reply})
+
+        for sentence in sentences(reply):
+            if self._cancel.is_set():
+                return
+            self.send({'type': 'audio_start', 'mimetype': self.mimetype, 'text': sentence})
+            chunks = self.speak(sentence)
+            try:
+                for chunk in chunks:
+                    if self._cancel.is_set():
+                        break
+                    self.send(chunk)
+            finally:
+                chunks.close()
+            self.send({'type': 'audio_end'})
+        self.send({'type': 'idle'})